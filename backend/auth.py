@@ -1,4 +1,5 @@
 import os
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -6,10 +7,15 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from pwdlib import PasswordHash
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 
-from database import get_db
+from auth_cache import token_cache, user_cache, user_columns
+from database import get_async_db
 from db_models import User
+from executors import BoundedExecutor, PoolSaturated
 from schemas import TokenData
 
 # Configuration - SECRET_KEY must be set in production
@@ -28,6 +34,23 @@ password_hash = PasswordHash.recommended()
 # Bearer token security
 security = HTTPBearer()
 
+# Argon2 hashing is CPU- and memory-heavy (pwdlib's recommended settings use
+# 64 MiB per hash), so it runs on its own pool, sized so that concurrent
+# hashes fit both the cores and PASSWORD_HASH_MEMORY_MB
+ARGON2_MEMORY_MB = 64
+PASSWORD_HASH_MEMORY_MB = int(os.getenv("PASSWORD_HASH_MEMORY_MB", "256"))
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+PASSWORD_HASH_WORKERS = int(os.getenv(
+    "PASSWORD_HASH_WORKERS",
+    str(min(_CPUS, max(1, PASSWORD_HASH_MEMORY_MB // ARGON2_MEMORY_MB)))
+))
+password_executor = BoundedExecutor(
+    "password-hash",
+    max_workers=PASSWORD_HASH_WORKERS,
+    max_queue=int(os.getenv("PASSWORD_HASH_QUEUE", "32")),
+    retry_after=int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -39,6 +62,35 @@ def get_password_hash(password: str) -> str:
     return password_hash.hash(password)
 
 
+async def _run_password_hashing(fn, *args):
+    try:
+        return await password_executor.run(fn, *args)
+    except PoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins right now, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool.
+
+    Raises:
+        HTTPException: 503 with Retry-After when the pool is saturated
+    """
+    return await _run_password_hashing(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash on the hashing pool.
+
+    Raises:
+        HTTPException: 503 with Retry-After when the pool is saturated
+    """
+    return await _run_password_hashing(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -52,7 +104,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 def decode_token(token: str) -> TokenData:
-    """Decode and validate a JWT token."""
+    """Decode and validate a JWT token.
+
+    Verified tokens are remembered (see auth_cache.py) until they expire,
+    so repeat requests skip the signature check.
+    """
+    cached = token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at is None or time.time() < expires_at:
+            return TokenData(user_id=user_id)
+        token_cache.invalidate(token)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
@@ -61,6 +124,7 @@ def decode_token(token: str) -> TokenData:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             )
+        token_cache.put(token, (user_id, payload.get("exp")))
         return TokenData(user_id=user_id)
     except JWTError:
         raise HTTPException(
@@ -69,15 +133,40 @@ def decode_token(token: str) -> TokenData:
         )
 
 
+async def load_user(db: AsyncSession, user_id: str) -> Optional[User]:
+    """Get a user by id, from the user cache when possible.
+
+    A cached user is attached to ``db`` as if it had been loaded there, so
+    routes can change it and commit as usual. The commit invalidates the
+    cache entry (see auth_cache.py).
+    """
+    key = identity_key(User, user_id)
+    if key in db.identity_map:
+        return db.identity_map[key]
+
+    columns = user_cache.get(user_id)
+    if columns is not None:
+        user = User(**columns)
+        make_transient_to_detached(user)
+        db.add(user)
+        return user
+
+    generation = user_cache.generation
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    if user is not None:
+        user_cache.put(user_id, user_columns(user), generation)
+    return user
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Get the current authenticated user."""
     token = credentials.credentials
     token_data = decode_token(token)
 
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = await load_user(db, token_data.user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db_models import User
+from metrics import REGISTRY
+
+# Users kept between requests, and for how long (0 turns the cache off).
+# The TTL bounds how stale another worker's copy can get, since invalidation
+# only reaches the process that made the change.
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+# Verified JWTs kept (0 turns the cache off)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class LRUCache:
+    """Thread-safe LRU with an optional per-entry TTL and hit/miss counts.
+
+    Every ``invalidate`` bumps ``generation``. A caller that loads a value
+    reads the generation first and passes it to ``put``. If anything was
+    invalidated in between, the load may have raced a change, so it isn't
+    stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# user id -> User column values
+user_cache = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# token -> (user id, expiry as a unix timestamp)
+token_cache = LRUCache(TOKEN_CACHE_SIZE)
+
+_USER_COLUMNS = [column.key for column in User.__table__.columns]
+
+
+def user_columns(user: User) -> Dict:
+    """The column values of a loaded User, as stored in user_cache."""
+    return {key: getattr(user, key) for key in _USER_COLUMNS}
+
+
+def _changed_user_ids(session: Session):
+    return {
+        obj.id for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_flushed_users(session: Session, flush_context) -> None:
+    # Drop now, so this process stops serving the old row, and again after
+    # commit, in case a concurrent miss cached the old row in between
+    changed = _changed_user_ids(session)
+    for user_id in changed:
+        user_cache.invalidate(user_id)
+    session.info.setdefault("changed_user_ids", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_users(session: Session) -> None:
+    session.info.pop("changed_user_ids", None)
+
+
+REGISTRY.counter("auth_user_cache_hits_total", "get_current_user lookups served from the user cache.",
+                 lambda: user_cache.hits)
+REGISTRY.counter("auth_user_cache_misses_total", "get_current_user lookups that queried the database.",
+                 lambda: user_cache.misses)
+REGISTRY.counter("auth_token_cache_hits_total", "Bearer tokens served from the verified-token cache.",
+                 lambda: token_cache.hits)
+REGISTRY.counter("auth_token_cache_misses_total", "Bearer tokens verified with a JWT decode.",
+                 lambda: token_cache.misses)
+REGISTRY.gauge("auth_user_cache_entries", "Users in the user cache.", lambda: len(user_cache))
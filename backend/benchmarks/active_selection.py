@@ -0,0 +1,171 @@
+"""Offline simulation: ratings needed to reach the full-calibration ideal vector.
+
+Usage (from backend/):
+    python -m benchmarks.active_selection --users 50
+    python -m benchmarks.active_selection --data-dir /app/data   # real catalog features
+
+Each simulated user has a hidden taste direction in feature space and
+rates an image 1-5 by where its (noisy) affinity falls among the pool's
+(10/20/35/20/15% per star, so about a third of the images are liked).
+The reference is the ideal vector the user would get from rating every
+image. The liked centroid, CalibrationStats.ideal_vector, is tracked after
+each rating for three strategies:
+
+- ``filename``: the current order, sorted by filename
+- ``random``: a uniform random order
+- ``active``: ActiveSelector, ``--batch`` picks per round-trip
+
+Quality is the cosine between the centered ideal vectors. The report gives
+the mean quality over users at a few rating counts, and the ratings and
+round-trips after which the mean quality reaches ``--target``. The filename and random orders
+are paged ``--page`` images per round-trip, as /api/calibration/images
+serves them.
+
+Without ``--data-dir`` the pool is synthetic. Non-negative features are
+grouped into clusters of near-duplicates, and each cluster is stored as
+runs of consecutive filenames, the way photo shoots are named.
+"""
+import argparse
+import json
+import math
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.active_selection import ActiveSelector
+from services.candidate_scoring import CandidateSet
+
+STAR_SHARES = (0.10, 0.20, 0.35, 0.20, 0.15)
+
+
+def synthetic_pool(args, rng: np.random.Generator) -> CandidateSet:
+    sizes = rng.zipf(1.6, size=args.clusters).clip(1, args.images // 4)
+    sizes = np.maximum(1, (sizes / sizes.sum() * args.images).astype(int))
+    prototypes = rng.gamma(0.5, 1.0, size=(args.clusters, args.dim))
+    runs = []
+    for cluster, size in enumerate(sizes):
+        members = np.maximum(prototypes[cluster] + args.spread * rng.standard_normal((size, args.dim)), 0)
+        runs += [members[start:start + 5] for start in range(0, size, 5)]
+    order = rng.permutation(len(runs))
+    features = np.concatenate([runs[i] for i in order]).astype(np.float32)
+    ids = [f"img_{i:06d}" for i in range(len(features))]
+    return CandidateSet(ids, features)
+
+
+def catalog_pool(data_dir: str) -> CandidateSet:
+    from services.visual_service import VisualService
+
+    service = VisualService(data_dir=data_dir)
+    return service.calibration_candidates()
+
+
+class SimulatedUser:
+    def __init__(self, unit: np.ndarray, noise: float, rng: np.random.Generator):
+        taste = rng.standard_normal(unit.shape[1])
+        affinity = unit @ (taste / np.linalg.norm(taste))
+        affinity += noise * affinity.std() * rng.standard_normal(len(affinity))
+        edges = np.quantile(affinity, np.cumsum(STAR_SHARES)[:-1])
+        self.ratings = (np.searchsorted(edges, affinity) + 1).astype(np.int64)
+
+
+def ideal_quality(features: np.ndarray, center: np.ndarray, ratings: np.ndarray, order: List[int],
+                  reference: np.ndarray) -> np.ndarray:
+    """Cosine to the reference after each rating in ``order`` (NaN until one is liked)."""
+    liked = ratings[order] >= 4
+    sums = np.cumsum(np.where(liked[:, None], features[order], 0.0), axis=0)
+    counts = np.cumsum(liked)
+    quality = np.full(len(order), np.nan)
+    have = counts > 0
+    ideal = sums[have] / counts[have][:, None] - center
+    quality[have] = ideal @ reference / (np.linalg.norm(ideal, axis=1) * np.linalg.norm(reference) + 1e-12)
+    return quality
+
+
+def active_order(selector: ActiveSelector, ratings: np.ndarray, budget: int, batch: int, seed: int) -> List[int]:
+    rows = {image_id: row for row, image_id in enumerate(selector.ids.tolist())}
+    rated: Dict[str, int] = {}
+    order: List[int] = []
+    while len(order) < budget:
+        picks = selector.select(rated, count=min(batch, budget - len(order)), seed=seed).picks
+        if not picks:
+            break
+        for pick in picks:
+            row = rows[pick.id]
+            rated[pick.id] = int(ratings[row])
+            order.append(row)
+    return order
+
+
+def needed(quality: np.ndarray, target: float) -> Optional[int]:
+    reached = np.flatnonzero(quality >= target)
+    return int(reached[0]) + 1 if len(reached) else None
+
+
+def main(args) -> Dict:
+    rng = np.random.default_rng(args.seed)
+    pool = catalog_pool(args.data_dir) if args.data_dir else synthetic_pool(args, rng)
+    features = np.asarray(pool.features, dtype=np.float64)
+    center = features.mean(axis=0)
+
+    start = time.perf_counter()
+    selector = ActiveSelector(pool)
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    budget = min(args.budget, len(pool))
+    batches = {"filename": args.page, "random": args.page, "active": args.batch}
+    curves: Dict[str, List[np.ndarray]] = {name: [] for name in batches}
+    select_ms: List[float] = []
+    for user_index in range(args.users):
+        user = SimulatedUser(selector.unit, args.rating_noise, rng)
+        liked = user.ratings >= 4
+        reference = features[liked].mean(axis=0) - center
+
+        orders = {
+            "filename": list(np.argsort(pool.ids, kind="stable")[:budget]),
+            "random": list(rng.permutation(len(pool))[:budget])
+        }
+        start = time.perf_counter()
+        orders["active"] = active_order(selector, user.ratings, budget, args.batch, seed=user_index)
+        select_ms.append((time.perf_counter() - start) * 1000 / math.ceil(budget / args.batch))
+        for name, order in orders.items():
+            curves[name].append(ideal_quality(features, center, user.ratings, order, reference))
+
+    checkpoints = [c for c in (10, 20, 40, 80, 160) if c <= budget]
+    report = {
+        "images": len(pool),
+        "users": args.users,
+        "target": args.target,
+        "selector_setup_ms": round(setup_ms, 1),
+        "select_ms_per_round_trip": round(float(np.median(select_ms)), 2),
+        "strategies": {}
+    }
+    for name, runs in curves.items():
+        quality = np.nan_to_num(np.stack([np.pad(run, (0, budget - len(run)), mode="edge" if len(run) else "constant") for run in runs]))
+        mean_quality = quality.mean(axis=0)
+        ratings = needed(mean_quality, args.target)
+        report["strategies"][name] = {
+            "quality_at": {str(c): round(float(mean_quality[c - 1]), 3) for c in checkpoints},
+            "users_reaching_target": f"{sum(needed(run, args.target) is not None for run in quality)}/{len(runs)}",
+            "ratings_to_target": ratings,
+            "round_trips_to_target": math.ceil(ratings / batches[name]) if ratings else None
+        }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="Use this deployment's calibration images instead of a synthetic pool")
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--clusters", type=int, default=60)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--spread", type=float, default=0.3, help="Within-cluster noise (synthetic pool)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=160, help="Most ratings per user")
+    parser.add_argument("--batch", type=int, default=10, help="Active picks per round-trip")
+    parser.add_argument("--page", type=int, default=20, help="Images per round-trip for the fixed orders")
+    parser.add_argument("--rating-noise", type=float, default=0.5)
+    parser.add_argument("--target", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,159 @@
+"""Peak memory and time of the admin user listing, by mode, as the table grows.
+
+Usage (from backend/):
+    DATA_DIR=/tmp/bench PRELOAD_MODELS=false python -m benchmarks.admin_users --users 10000 50000
+
+Tops the users table up to each ``--users`` count with throwaway users.
+Then it lists every user three ways:
+
+- ``load_all``: every User loaded and rendered as one JSON list (the
+  endpoint before pagination)
+- ``pages``: walking ``next_cursor`` with ``limit=1000``
+- ``ndjson``: one ``format=ndjson`` stream, discarded as it arrives
+
+Requests go straight to the ASGI app, because httpx's ASGITransport
+buffers whole response bodies. Each mode runs once for time and once
+under tracemalloc for peak Python memory, since tracing slows it down.
+The ``pages`` and ``ndjson`` peaks should stay flat as the table grows.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+import uuid
+from typing import Dict
+from urllib.parse import urlencode
+
+import httpx
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+
+
+def top_up(count: int) -> None:
+    from database import SessionLocal
+    from db_models import User
+
+    db = SessionLocal()
+    try:
+        missing = count - db.scalar(select(func.count()).select_from(User))
+        for start in range(0, max(missing, 0), 5000):
+            db.add_all([
+                User(email=f"{tag}@example.com", username=f"b{tag}", password_hash="-")
+                for tag in (uuid.uuid4().hex[:12] for _ in range(min(5000, missing - start)))
+            ])
+            db.commit()
+    finally:
+        db.close()
+
+
+async def get(app, path: str, params: Dict, headers: Dict, on_chunk) -> None:
+    """GET through the ASGI app, handing each body chunk to ``on_chunk``."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 1), "root_path": "",
+        "path": path, "raw_path": path.encode(), "query_string": urlencode(params).encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    }
+
+    requested, done = False, asyncio.Event()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # Streaming responses listen for a disconnect until they finish
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path} returned {message['status']}")
+        if message["type"] == "http.response.body":
+            on_chunk(message.get("body", b""))
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+
+
+async def load_all(app, headers) -> int:
+    # The old handler, outside the app so it doesn't need its own route
+    from database import AsyncSessionLocal
+    from db_models import User
+
+    async with AsyncSessionLocal() as db:
+        users = (await db.scalars(select(User))).all()
+        body = JSONResponse({"total": len(users), "users": [
+            {"id": u.id, "username": u.username, "email": u.email,
+             "psychometric_complete": u.psychometric_complete,
+             "calibration_complete": u.calibration_complete, "created_at": str(u.created_at)}
+            for u in users
+        ]}).body
+    return len(json.loads(body)["users"])
+
+
+async def pages(app, headers) -> int:
+    listed, cursor = 0, None
+    while True:
+        body = []
+        params = {"limit": 1000, **({"cursor": cursor} if cursor else {})}
+        await get(app, "/api/admin/users", params, headers, body.append)
+        page = json.loads(b"".join(body))
+        listed += page["count"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return listed
+
+
+async def ndjson(app, headers) -> int:
+    lines = 0
+
+    def count(chunk: bytes) -> None:
+        nonlocal lines
+        lines += chunk.count(b"\n")
+
+    await get(app, "/api/admin/users", {"format": "ndjson"}, headers, count)
+    return lines
+
+
+async def measure(mode, app, headers) -> Dict:
+    start = time.perf_counter()
+    listed = await mode(app, headers)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    await mode(app, headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"listed": listed, "seconds": round(elapsed, 2), "peak_mb": round(peak / 2 ** 20, 1)}
+
+
+async def main(args) -> Dict:
+    from database import init_db
+    from main import app
+
+    init_db()
+    report = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        tag = uuid.uuid4().hex[:10]
+        response = await client.post("/api/auth/register", json={
+            "email": f"{tag}@example.com", "password": "benchmark-pass", "username": f"b{tag}"
+        })
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        for count in sorted(args.users):
+            top_up(count)
+            report[count] = {mode.__name__: await measure(mode, app, headers)
+                             for mode in (load_all, pages, ndjson)}
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 50000], help="Table sizes to measure")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""Database queries per authenticated request, with and without the auth caches.
+
+Usage (from backend/):
+    DATA_DIR=/tmp/bench PRELOAD_MODELS=false python -m benchmarks.auth_cache --users 20 --requests 50
+
+Registers ``--users`` throwaway users. Each one then sends ``--requests``
+small authenticated requests, a mix of /api/auth/me, /api/psychometric/status
+and /api/calibration/vector, the way the frontend polls during
+calibration. Every SQL statement is counted with an engine event, first with
+the user and token caches turned off and then with them on. The report gives
+statements, users-table SELECTs and median latency per request, and the
+caches' hit rates.
+"""
+import argparse
+import json
+import statistics
+import time
+import uuid
+from typing import Dict, List
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import auth_cache
+from database import async_engine
+from main import app
+
+PATHS = ("/api/auth/me", "/api/psychometric/status", "/api/calibration/vector")
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = 0
+        self.user_selects = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            self.user_selects += 1
+
+
+def register(client: TestClient, count: int) -> List[Dict[str, str]]:
+    headers = []
+    for _ in range(count):
+        tag = uuid.uuid4().hex[:10]
+        response = client.post("/api/auth/register", json={
+            "email": f"{tag}@example.com", "password": "benchmark-pass", "username": f"b{tag}"
+        })
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+def run(client: TestClient, headers: List[Dict[str, str]], requests: int, cached: bool) -> Dict:
+    auth_cache.user_cache.maxsize = auth_cache.USER_CACHE_SIZE if cached else 0
+    auth_cache.token_cache.maxsize = auth_cache.TOKEN_CACHE_SIZE if cached else 0
+    for cache in (auth_cache.user_cache, auth_cache.token_cache):
+        cache.clear()
+        cache.hits = cache.misses = 0
+
+    counter = StatementCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    latencies = []
+    try:
+        for i in range(requests):
+            for user_headers in headers:
+                start = time.perf_counter()
+                client.get(PATHS[i % len(PATHS)], headers=user_headers)
+                latencies.append(time.perf_counter() - start)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    total = len(latencies)
+    return {
+        "requests": total,
+        "statements_per_request": round(counter.statements / total, 2),
+        "user_selects_per_request": round(counter.user_selects / total, 3),
+        "median_ms": round(statistics.median(latencies) * 1000, 2),
+        "user_cache": auth_cache.user_cache.stats(),
+        "token_cache": auth_cache.token_cache.stats()
+    }
+
+
+def main(args) -> Dict:
+    with TestClient(app) as client:
+        headers = register(client, args.users)
+        report = {
+            "users": args.users,
+            "uncached": run(client, headers, args.requests, cached=False),
+            "cached": run(client, headers, args.requests, cached=True)
+        }
+    before = report["uncached"]["statements_per_request"]
+    after = report["cached"]["statements_per_request"]
+    report["statement_reduction_pct"] = round(100 * (1 - after / before), 1) if before else 0.0
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per user")
+    main(parser.parse_args())
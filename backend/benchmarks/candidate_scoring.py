@@ -0,0 +1,111 @@
+"""Latency of ranking a large candidate set against users' preference weights.
+
+Usage (from backend/):
+    python -m benchmarks.candidate_scoring --candidates 1000000 --users 16
+
+Builds ``--candidates`` random unit-norm 512-dim feature rows and ranks them
+with CandidateScorer for one user at a time and for ``--users`` users in one
+pass, at each ``--chunk-rows`` value. Results are checked against a full
+``features @ weights`` argsort. For reference, the per-input generated-weight
+path (DynamicLearner.gen_forward, generator + bmm) is timed on a sample and
+extrapolated. With ``--mmap`` the set is saved to disk and memory-mapped,
+as saved candidate sets are served. Needs about 2 GB of RAM per 1M
+candidates (less with ``--mmap``).
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import torch
+
+from models.dynamic_maml import DynamicLearner
+from services.candidate_scoring import CandidateScorer, CandidateSet
+
+
+def random_features(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    features = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 65536):
+        block = rng.standard_normal((min(65536, n - start), dim), dtype=np.float32)
+        features[start:start + len(block)] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return features
+
+
+def timed(fn, repeats: int) -> float:
+    """Median wall time of ``fn`` in ms."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def run(candidates: CandidateSet, weights: np.ndarray, args) -> Dict:
+    truth = np.argsort(-(np.asarray(candidates.features) @ weights[0]), kind="stable")[:args.k]
+    results = {}
+    for chunk_rows in [int(c) for c in args.chunk_rows.split(",")]:
+        scorer = CandidateScorer(candidates, chunk_rows=chunk_rows)
+        top = scorer.top_k(weights[0], k=args.k)
+        assert [candidate_id for candidate_id, _ in top] == candidates.ids[truth].tolist(), "top-k mismatch"
+
+        single_ms = timed(lambda: scorer.top_k(weights[0], k=args.k), args.repeats)
+        batch_ms = timed(lambda: scorer.top_k_many(weights, k=args.k), args.repeats)
+        results[f"chunk_{chunk_rows}"] = {
+            "score_buffer_mb": round(chunk_rows * len(weights) * 4 / 2**20, 1),
+            "one_user_ms": round(single_ms, 1),
+            f"{len(weights)}_users_ms": round(batch_ms, 1),
+            "per_user_ms_batched": round(batch_ms / len(weights), 1),
+            "candidates_per_s_one_user": round(len(candidates) / single_ms * 1000)
+        }
+    return results
+
+
+def main(args) -> Dict:
+    torch.set_grad_enabled(False)
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    features = random_features(args.candidates, args.dim, rng)
+    ids = [f"cand-{i}" for i in range(args.candidates)]
+    weights = rng.standard_normal((args.users, args.dim), dtype=np.float32)
+    generate_s = time.perf_counter() - start
+
+    # Reference: gen_forward generates weights for every input before its bmm
+    learner = DynamicLearner(in_dim=args.dim).eval()
+    sample = torch.from_numpy(features[:min(args.candidates, 65536)])
+    gen_forward_ms = timed(lambda: learner.gen_forward(sample), 3) * args.candidates / len(sample)
+
+    report = {
+        "candidates": args.candidates,
+        "dim": args.dim,
+        "k": args.k,
+        "users": args.users,
+        "generate_s": round(generate_s, 1),
+        "gen_forward_estimate_ms": round(gen_forward_ms, 1)
+    }
+    if args.mmap:
+        with tempfile.TemporaryDirectory() as root:
+            CandidateSet(ids, features).save(Path(root))
+            del features
+            report["mmap"] = run(CandidateSet.load(Path(root)), weights, args)
+    else:
+        report["in_memory"] = run(CandidateSet(ids, features), weights, args)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chunk-rows", default="16384,65536,262144")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--mmap", action="store_true", help="Serve the set memory-mapped from disk")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,91 @@
+"""Demo-mode feature generation: per-image torch seeding vs one batched call.
+
+Usage (from backend/):
+    python -m benchmarks.demo_features --images 2000
+
+Times the previous generator, which ran ``torch.manual_seed(hash(id))`` and
+``randn`` once per image, against services.demo_features for the same ids.
+Then checks that the new vectors are identical in two fresh interpreters
+with different PYTHONHASHSEED values, and that generating them leaves
+NumPy's and torch's global RNG state unchanged.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from services.demo_features import demo_features
+
+DIGEST_PROBE = (
+    "import hashlib; from services.demo_features import demo_features; "
+    "ids = [f'unsplash_{{i}}' for i in range({n})]; "
+    "print(hashlib.sha256(demo_features(ids).tobytes()).hexdigest())"
+)
+
+
+def legacy_features(image_ids) -> torch.Tensor:
+    """The previous per-image generator (process-salted, global RNG)."""
+    features = []
+    for image_id in image_ids:
+        torch.manual_seed(hash(image_id) % (2**32))
+        features.append(F.normalize(torch.randn(512), dim=0))
+    return torch.stack(features)
+
+
+def timed(fn, repeats: int) -> float:
+    """Median wall time of ``fn`` in ms."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def digest_in_subprocess(n: int, hash_seed: str) -> str:
+    env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+    return subprocess.run(
+        [sys.executable, "-c", DIGEST_PROBE.format(n=n)],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout.strip()
+
+
+def main(args) -> Dict:
+    ids = [f"unsplash_{i}" for i in range(args.images)]
+
+    torch_state, numpy_state = torch.get_rng_state(), np.random.get_state()
+    features = demo_features(ids)
+    rng_untouched = (
+        torch.equal(torch_state, torch.get_rng_state())
+        and np.array_equal(numpy_state[1], np.random.get_state()[1])
+    )
+
+    legacy_ms = timed(lambda: legacy_features(ids), args.repeats)
+    batched_ms = timed(lambda: demo_features(ids), args.repeats)
+    digests = {seed: digest_in_subprocess(args.images, seed) for seed in ("1", "2")}
+
+    report = {
+        "images": args.images,
+        "legacy_ms": round(legacy_ms, 1),
+        "batched_ms": round(batched_ms, 1),
+        "speedup": round(legacy_ms / batched_ms, 1),
+        "unit_norm": bool(np.allclose(np.linalg.norm(features, axis=1), 1, atol=1e-5)),
+        "identical_across_processes": len(set(digests.values())) == 1,
+        "global_rng_untouched": rng_untouched
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    main(parser.parse_args())
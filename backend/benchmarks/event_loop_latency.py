@@ -0,0 +1,106 @@
+"""Light-endpoint latency while calibrations run concurrently.
+
+Usage (from backend/):
+    DATA_DIR=/tmp/bench python -m benchmarks.event_loop_latency --calibrations 8
+
+Registers a throwaway user, fires concurrent calibration submissions and
+meanwhile polls /api/health, reporting health latency percentiles with and
+without the calibration load. ``--inline`` runs calibration directly on the
+event loop (the behaviour before the calibration pool) for comparison.
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+import uuid
+from typing import List
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def poll_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> List[float]:
+    """Poll on a fixed schedule, measuring from the *scheduled* send time so a
+    blocked event loop shows up as latency rather than as missing samples."""
+    latencies = []
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        await client.get("/api/health")
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        scheduled = max(scheduled + interval, time.perf_counter() - interval)
+    return latencies
+
+
+def report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label:<22} n={len(latencies):<5} p50={statistics.median(latencies):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms max={max(latencies):7.2f}ms"
+    )
+
+
+async def main(args) -> None:
+    from database import init_db
+    from main import app
+    from routers import calibration
+    from services import VisualService
+
+    init_db()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # Keep every calibration CPU-bound: no cached features
+    service = VisualService(data_dir=calibration.DATA_DIR, use_feature_store=False)
+    images = service.get_calibration_images(count=args.images)
+    ratings = {img["id"]: (i % 5) + 1 for i, img in enumerate(images)}
+
+    if args.inline:
+        async def run_inline(fn, *a, **kw):
+            return fn(*a, **kw)
+        calibration.calibration_executor.run = run_inline
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        name = f"bench_{uuid.uuid4().hex[:8]}"
+        resp = await client.post("/api/auth/register", json={
+            "email": f"{name}@example.com", "username": name, "password": "benchmark-pass"
+        })
+        headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+        # Idle baseline
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        report("health (idle)", await poller)
+
+        # Under calibration load
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval))
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            client.post("/api/calibration/submit", json={"ratings": ratings}, headers=headers)
+            for _ in range(args.calibrations)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        report("health (calibrating)", await poller)
+
+        codes = {}
+        for r in results:
+            codes[r.status_code] = codes.get(r.status_code, 0) + 1
+        mode = "inline" if args.inline else "pool"
+        print(f"{args.calibrations} calibrations ({mode}) of {len(ratings)} images in {elapsed:.2f}s, status codes {codes}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibrations", type=int, default=8)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between health polls")
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    parser.add_argument("--inline", action="store_true", help="Calibrate on the event loop (old behaviour)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,85 @@
+"""Latency of listing calibration images: directory glob vs ImageCatalog.
+
+Usage (from backend/):
+    python -m benchmarks.image_catalog --images 20000
+
+Writes ``--images`` small JPEGs into a temporary calibration directory, then
+times what ``/api/calibration/images`` did before the catalog (glob, sort,
+random sample) against a catalog page and a gender-stratified sample, plus
+the catalog's cold scan, its restart from the persisted index and the
+rescan after one image is added.
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+from PIL import Image
+
+from services.image_catalog import ImageCatalog
+
+
+def timed(fn, repeats: int) -> float:
+    """Median wall time of ``fn`` in ms."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def glob_sample(calibration_dir: Path, count: int):
+    images = sorted(calibration_dir.glob("*.[jp][pn][g]"))
+    return random.sample(images, min(count, len(images)))
+
+
+def main(args) -> Dict:
+    with tempfile.TemporaryDirectory() as root:
+        calibration_dir = Path(root) / "global_calibration"
+        calibration_dir.mkdir()
+        tile = Image.new("RGB", (32, 40), (128, 96, 64))
+        for i in range(args.images):
+            tile.save(calibration_dir / f"{('male', 'female')[i % 2]}_{i}.jpg")
+
+        catalog = ImageCatalog(calibration_dir)
+        start = time.perf_counter()
+        catalog.refresh()
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        restarted = ImageCatalog(calibration_dir)
+        start = time.perf_counter()
+        restarted.refresh()
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        tile.save(calibration_dir / "male_new.jpg")
+        start = time.perf_counter()
+        catalog.refresh()
+        rescan_ms = (time.perf_counter() - start) * 1000
+
+        report = {
+            "images": len(catalog),
+            "count": args.count,
+            "catalog_cold_scan_ms": round(cold_ms, 1),
+            "catalog_restart_from_index_ms": round(warm_ms, 1),
+            "catalog_rescan_one_added_ms": round(rescan_ms, 1),
+            "glob_sort_sample_ms": round(timed(lambda: glob_sample(calibration_dir, args.count), args.repeats), 3),
+            "catalog_page_ms": round(timed(lambda: catalog.page(args.images // 2, args.count), args.repeats), 3),
+            "catalog_stratified_sample_ms": round(
+                timed(lambda: catalog.sample(args.count, stratify="gender"), args.repeats), 3
+            )
+        }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20000)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,80 @@
+"""Bytes and latency of calibration images: originals vs derivatives.
+
+Usage (from backend/):
+    python -m benchmarks.image_serving --data-dir /app/data --width 640
+
+Fetches every image in ``global_calibration/`` through the calibration
+router three ways (original, cold derivative, warm derivative) and reports
+total bytes, per-request latency, and the 304 path for revalidation.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+
+def timed_get(client, url: str, headers: Dict = None):
+    start = time.perf_counter()
+    response = client.get(url, headers=headers or {})
+    return response, (time.perf_counter() - start) * 1000
+
+
+def summarize(bytes_total: int, latencies: List[float]) -> Dict:
+    arr = np.asarray(latencies)
+    return {
+        "total_kb": round(bytes_total / 1024, 1),
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2)
+    }
+
+
+def main(args) -> Dict:
+    # The router reads DATA_DIR at import time
+    os.environ["DATA_DIR"] = args.data_dir
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers import calibration
+
+    shutil.rmtree(Path(args.data_dir) / "derivatives", ignore_errors=True)
+    names = sorted(p.name for p in (Path(args.data_dir) / "global_calibration").glob("*.[jp][pn][g]"))
+    if not names:
+        raise SystemExit(f"No images in {args.data_dir}/global_calibration")
+
+    app = FastAPI()
+    app.include_router(calibration.router)
+    client = TestClient(app)
+    accept = {"accept": "image/webp,image/*" if args.format == "webp" else "image/jpeg"}
+
+    report = {"images": len(names), "width": args.width, "format": args.format}
+    for label, query in (("original", ""), ("derivative_cold", f"?w={args.width}"), ("derivative_warm", f"?w={args.width}")):
+        total, latencies = 0, []
+        for name in names:
+            response, ms = timed_get(client, f"/api/calibration/images/{name}{query}", accept)
+            total += len(response.content)
+            latencies.append(ms)
+        report[label] = summarize(total, latencies)
+
+    latencies = []
+    for name in names:
+        etag = client.get(f"/api/calibration/images/{name}?w={args.width}", headers=accept).headers["etag"]
+        response, ms = timed_get(client, f"/api/calibration/images/{name}?w={args.width}", {**accept, "if-none-match": etag})
+        assert response.status_code == 304
+        latencies.append(ms)
+    report["revalidate_304"] = summarize(0, latencies)
+    report["bytes_reduction"] = round(report["original"]["total_kb"] / max(report["derivative_warm"]["total_kb"], 1e-9), 1)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--format", choices=["webp", "jpeg"], default="webp")
+    main(parser.parse_args())
@@ -0,0 +1,173 @@
+"""Incremental calibration: exactness property check and update cost.
+
+Usage (from backend/):
+    python -m benchmarks.incremental_calibration --cases 200 --ratings 1000 --changes 5
+    python -m benchmarks.incremental_calibration --data-dir /app/data
+
+Property check: for ``--cases`` random rating histories (adds, re-rates and
+removals, with features spanning many binary exponents, including zeros and
+subnormals), CalibrationStats updated step by step must derive bit-identical
+aggregated and ideal vectors and the same confidence as stats built once from
+the final ratings, also after a to_dict / from_dict round trip.
+
+Cost: time to apply ``--changes`` rating changes to stats over ``--ratings``
+images, against rebuilding the stats from all ratings.
+
+With ``--data-dir``, also checks VisualService end to end on that data
+directory's calibration images: calibrate_user, then update_calibration with
+a few changes, must save the same vectors as calibrate_user over the merged
+ratings.
+"""
+import argparse
+import json
+import time
+from typing import Dict
+
+import numpy as np
+
+from services.calibration_stats import CalibrationStats
+
+
+def random_features(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit-scale features (int64 fast path) or ones spanning wide exponents
+    with subnormals (arbitrary-precision path), with some exact zeros."""
+    features = rng.standard_normal((n, dim)).astype(np.float32)
+    features[rng.random((n, dim)) < 0.01] = 0.0
+    if rng.random() < 0.5:
+        features *= np.exp2(rng.integers(-30, 30, size=(n, 1))).astype(np.float32)
+        features[rng.random((n, dim)) < 0.001] = np.float32(1e-42)
+    return features
+
+
+def derived(stats: CalibrationStats):
+    ideal = stats.ideal_vector()
+    return (
+        stats.aggregated().tobytes(),
+        None if ideal is None else ideal.tobytes(),
+        stats.confidence(),
+        len(stats)
+    )
+
+
+def property_check(cases: int, dim: int, rng: np.random.Generator) -> Dict:
+    steps = 0
+    for _ in range(cases):
+        n_images = int(rng.integers(1, 40))
+        features = random_features(n_images, dim, rng)
+        incremental = CalibrationStats(dim=dim)
+        final: Dict[str, int] = {}
+        for _ in range(int(rng.integers(1, 80))):
+            image = int(rng.integers(n_images))
+            image_id = f"img_{image}"
+            if image_id in final and rng.random() < 0.2:
+                incremental.remove(image_id, features[image])
+                del final[image_id]
+            else:
+                rating = int(rng.integers(1, 6))
+                incremental.add(image_id, rating, features[image])
+                final[image_id] = rating
+            steps += 1
+
+            full = CalibrationStats(dim=dim)
+            full.add_many(final, features[[int(image_id[4:]) for image_id in final]])
+            restored = CalibrationStats.from_dict(json.loads(json.dumps(incremental.to_dict())))
+            if not derived(incremental) == derived(full) == derived(restored):
+                raise RuntimeError(f"Incremental stats differ from a full rebuild after {steps} steps")
+    return {"cases": cases, "steps_checked": steps, "bit_identical": True}
+
+
+def update_cost(ratings: int, changes: int, dim: int, repeats: int, rng: np.random.Generator) -> Dict:
+    features = rng.standard_normal((ratings, dim)).astype(np.float32)
+    features /= np.linalg.norm(features, axis=1, keepdims=True)
+    values = rng.integers(1, 6, size=ratings)
+
+    def build() -> CalibrationStats:
+        stats = CalibrationStats(dim=dim)
+        stats.add_many({f"img_{i}": int(values[i]) for i in range(ratings)}, features)
+        return stats
+
+    full_s, update_s = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        stats = build()
+        stats.aggregated()
+        stats.ideal_vector()
+        full_s.append(time.perf_counter() - start)
+
+        changed = rng.choice(ratings, size=changes, replace=False)
+        start = time.perf_counter()
+        for i in changed:
+            stats.add(f"img_{i}", int(rng.integers(1, 6)), features[i])
+        stats.aggregated()
+        stats.ideal_vector()
+        update_s.append(time.perf_counter() - start)
+
+    full_ms = float(np.median(full_s)) * 1000
+    update_ms = float(np.median(update_s)) * 1000
+    return {
+        "ratings": ratings,
+        "changes": changes,
+        "full_rebuild_ms": round(full_ms, 2),
+        "incremental_ms": round(update_ms, 2),
+        "speedup": round(full_ms / update_ms, 1)
+    }
+
+
+def service_check(data_dir: str, rng: np.random.Generator) -> Dict:
+    from services import VisualService
+
+    service = VisualService(data_dir=data_dir)
+    images = sorted(p.stem for p in service.calibration_dir.iterdir() if p.suffix in (".jpg", ".png"))
+    if len(images) < 4:
+        raise SystemExit(f"Need at least 4 calibration images in {service.calibration_dir}")
+
+    ratings = {image_id: int(rng.integers(1, 6)) for image_id in images[: len(images) // 2]}
+    changes = {image_id: int(rng.integers(1, 6)) for image_id in rng.choice(images, size=4, replace=False)}
+
+    # Warm the feature store so both timings exclude backbone work
+    service.get_image_features(list(service.resolve_image_paths(images).values()))
+    service.calibrate_user("bench-incremental", ratings)
+    start = time.perf_counter()
+    updated = service.update_calibration("bench-incremental", changes)
+    update_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    recomputed = service.calibrate_user("bench-incremental", {**ratings, **changes})
+    full_ms = (time.perf_counter() - start) * 1000
+
+    sections = (("self_analysis", "embedding_vector"), ("preference_model", "ideal_vector"),
+                ("preference_model", "calibration_confidence"), ("meta", "images_rated"))
+    identical = all(updated[a][b] == recomputed[a][b] for a, b in sections)
+    if not identical:
+        raise RuntimeError("update_calibration differs from calibrate_user over the merged ratings")
+    return {
+        "images_rated": len({**ratings, **changes}),
+        "changes": len(changes),
+        "identical": identical,
+        "update_ms": round(update_ms, 2),
+        "full_ms": round(full_ms, 2)
+    }
+
+
+def main(args) -> Dict:
+    rng = np.random.default_rng(args.seed)
+    report = {
+        "property": property_check(args.cases, args.dim, rng),
+        "cost": update_cost(args.ratings, args.changes, args.dim, args.repeats, rng)
+    }
+    if args.data_dir:
+        report["service"] = service_check(args.data_dir, rng)
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--ratings", type=int, default=1000)
+    parser.add_argument("--changes", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--data-dir", help="Also check VisualService on this data directory")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,84 @@
+"""Compare the torch and ONNX Runtime inference engines.
+
+Usage (from backend/):
+    python -m services.model_artifacts --out /tmp/artifacts --onnx
+    python -m benchmarks.inference_engines --artifact-dir /tmp/artifacts
+
+Each engine is measured in a fresh process so resident memory numbers are
+not polluted by the other engine. Reports backbone latency per image at
+batch 1 and batch 32, learner (generator) latency per call, and RSS after
+loading and after inference.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+from typing import Dict
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(engine_name: str, artifact_dir: str, seconds: float, queue) -> None:
+    import torch
+
+    from services.inference_engines import OnnxEngine, TorchEngine
+    from services.model_artifacts import load_artifacts, load_manifest
+
+    baseline = rss_mb()
+    manifest = load_manifest(artifact_dir)
+    if engine_name == "onnx":
+        files = manifest["onnx_files"]
+        engine = OnnxEngine(Path(artifact_dir) / files["backbone"], Path(artifact_dir) / files["generator"])
+    else:
+        backbone, learner = load_artifacts(artifact_dir, manifest, torch.device("cpu"))
+        engine = TorchEngine(backbone, learner)
+    loaded = rss_mb()
+
+    result = {"engine": engine_name, "rss_load_mb": round(loaded - baseline, 1)}
+    for batch_size in (1, 32):
+        batch = torch.randn(batch_size, 3, 224, 224)
+        engine.backbone_forward(batch)
+        runs, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            engine.backbone_forward(batch)
+            runs += 1
+        result[f"backbone_ms_per_image_b{batch_size}"] = round(
+            (time.perf_counter() - start) * 1000 / (runs * batch_size), 3
+        )
+
+    aggregated = torch.randn(1, 512)
+    calls, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds / 2:
+        engine.user_weights(aggregated)
+        calls += 1
+    result["user_weights_us_per_call"] = round((time.perf_counter() - start) * 1e6 / calls, 1)
+    result["rss_after_inference_mb"] = round(rss_mb(), 1)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    queue.put(result)
+
+
+def main(args) -> None:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for engine_name in ("torch", "onnx"):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=measure, args=(engine_name, args.artifact_dir, args.seconds, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--artifact-dir", default="/app/artifacts")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Timing budget per measurement")
+    main(parser.parse_args())
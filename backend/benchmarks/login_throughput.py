@@ -0,0 +1,85 @@
+"""Sustainable logins per second on one worker, and what a login burst does to other requests.
+
+Usage (from backend/):
+    DATA_DIR=/tmp/bench PRELOAD_MODELS=false python -m benchmarks.login_throughput --logins 200
+    DATA_DIR=/tmp/bench PRELOAD_MODELS=false python -m benchmarks.login_throughput --logins 200 --inline
+
+Registers one user, then sends ``--logins`` logins with ``--concurrency`` in
+flight while /api/health is polled. ``--inline`` verifies passwords on the
+event loop, which was the behaviour before the hashing pool. Reports login
+throughput, login latency, /api/health latency and the status codes (503 =
+fast-failed by the pool).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+import uuid
+from typing import Dict
+
+import httpx
+
+from benchmarks.event_loop_latency import percentile, poll_health
+
+
+async def main(args) -> Dict:
+    import auth
+    from database import init_db
+    from main import app
+
+    init_db()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.inline:
+        async def run_inline(fn, *a, **kw):
+            return fn(*a, **kw)
+        auth.password_executor.run = run_inline
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        name = f"bench_{uuid.uuid4().hex[:8]}"
+        credentials = {"email": f"{name}@example.com", "password": "benchmark-pass"}
+        await client.post("/api/auth/register", json={**credentials, "username": name})
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, codes = [], {}
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/auth/login", json=credentials)
+                latencies.append((time.perf_counter() - start) * 1000)
+                codes[response.status_code] = codes.get(response.status_code, 0) + 1
+
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval))
+        start = time.perf_counter()
+        await asyncio.gather(*[login() for _ in range(args.logins)])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        health = await poller
+
+    report = {
+        "mode": "inline" if args.inline else f"pool ({auth.password_executor.max_workers} workers)",
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "status_codes": codes,
+        "successful_logins_per_s": round(codes.get(200, 0) / elapsed, 1),
+        "login_p50_ms": round(statistics.median(latencies), 1),
+        "login_p99_ms": round(percentile(latencies, 99), 1),
+        "health_p50_ms": round(statistics.median(health), 2),
+        "health_p99_ms": round(percentile(health, 99), 2),
+        "health_max_ms": round(max(health), 2)
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between health polls")
+    parser.add_argument("--inline", action="store_true", help="Verify on the event loop (old behaviour)")
+    asyncio.run(main(parser.parse_args()))
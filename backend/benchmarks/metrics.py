@@ -0,0 +1,87 @@
+"""Cost of the in-process metrics: per-request middleware overhead and scrape time.
+
+Usage (from backend/):
+    python -m benchmarks.metrics --requests 5000
+
+Serves a trivial JSON route from two FastAPI apps, one wrapped in
+MetricsMiddleware, and compares the median in-process (ASGI) request time.
+Then fills a histogram with ``--series`` label combinations and times
+Registry.render, which is what a /api/metrics scrape costs.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import Histogram, MetricsMiddleware, Registry
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def median_request_us(app: FastAPI, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(100):
+            await client.get(f"/items/{i}")
+        times = []
+        for i in range(requests):
+            start = time.perf_counter()
+            await client.get(f"/items/{i}")
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def render_ms(series: int) -> float:
+    registry = Registry()
+    histogram = registry.register(Histogram("bench_seconds", "Benchmark histogram.", ("route",)))
+    for i in range(series):
+        for value in (0.002, 0.03, 0.4):
+            histogram.labels(f"/route/{i}").observe(value)
+    start = time.perf_counter()
+    registry.render()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(args) -> Dict:
+    plain_us = asyncio.run(median_request_us(build_app(False), args.requests))
+    instrumented_us = asyncio.run(median_request_us(build_app(True), args.requests))
+
+    start = time.perf_counter()
+    histogram = Histogram("observe_seconds", "Observe cost.")
+    for _ in range(args.requests):
+        histogram.observe(0.01)
+    observe_us = (time.perf_counter() - start) * 1e6 / args.requests
+
+    report = {
+        "requests": args.requests,
+        "plain_request_us": round(plain_us, 1),
+        "instrumented_request_us": round(instrumented_us, 1),
+        "middleware_overhead_us": round(instrumented_us - plain_us, 1),
+        "observe_us": round(observe_us, 2),
+        "series": args.series,
+        "render_ms": round(render_ms(args.series), 2)
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--series", type=int, default=200, help="Label combinations to render")
+    main(parser.parse_args())
@@ -0,0 +1,98 @@
+"""Per-call latency of the learner generator: torch vs NumpyLearner.
+
+Usage (from backend/):
+    python -m benchmarks.numpy_learner --calls 2000
+
+Times DynamicLearner.get_user_weights (the calibrate_user hot path),
+get_batch_user_weights and gen_forward in torch (under no_grad, as
+TorchEngine runs them) and in NumPy, after checking that the outputs agree
+to ``--atol``. Also reports the import cost a learner-only worker pays:
+``services.numpy_learner`` (and the fact that it leaves torch unloaded)
+against ``torch``, each in a fresh interpreter.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Callable, Dict
+
+import numpy as np
+import torch
+
+from models import DynamicLearner
+from services.inference_engines import verify_numpy_learner
+from services.numpy_learner import NumpyLearner
+
+IMPORT_PROBE = (
+    "import sys, time; start = time.perf_counter(); import {module}; "
+    "elapsed = round((time.perf_counter() - start) * 1000, 1); "
+    "rss = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')][0]; "
+    "print(elapsed, int(rss) // 1024, 'torch' in sys.modules)"
+)
+
+
+def per_call_us(fn: Callable, calls: int) -> float:
+    for _ in range(min(100, calls)):
+        fn()
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e6
+
+
+def import_cost(module: str) -> Dict:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE.format(module=module)],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    return {"import_ms": float(out[0]), "max_rss_mb": int(out[1]), "torch_loaded": out[2] == "True"}
+
+
+def main(args) -> Dict:
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).eval()
+    fast = NumpyLearner.from_torch(learner)
+    report = {"equivalence": verify_numpy_learner(learner, fast, atol=args.atol), "per_call_us": {}}
+
+    rng = np.random.default_rng(args.seed)
+    for name, batch in (("user_weights", 1), ("batch_user_weights", 8), ("batch_user_weights", 256), ("gen_forward", 256)):
+        x = rng.standard_normal((batch, 512), dtype=np.float32)
+        xt = torch.from_numpy(x)
+        if name == "user_weights":
+            torch_fn, numpy_fn = learner.get_user_weights, fast.get_user_weights
+        elif name == "batch_user_weights":
+            torch_fn, numpy_fn = learner.get_batch_user_weights, fast.get_batch_user_weights
+        else:
+            torch_fn, numpy_fn = learner.gen_forward, fast.gen_forward
+
+        def run_torch():
+            with torch.no_grad():
+                return torch_fn(xt)
+
+        torch_us = per_call_us(run_torch, args.calls)
+        numpy_us = per_call_us(lambda: numpy_fn(x), args.calls)
+        report["per_call_us"][f"{name}[{batch}]"] = {
+            "torch": round(torch_us, 1),
+            "numpy": round(numpy_us, 1),
+            "speedup": round(torch_us / numpy_us, 2)
+        }
+
+    report["worker_import"] = {
+        "services.numpy_learner": import_cost("services.numpy_learner"),
+        "torch": import_cost("torch")
+    }
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
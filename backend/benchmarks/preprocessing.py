@@ -0,0 +1,93 @@
+"""Per-image preprocessing time: full decode vs draft decode vs tensor cache.
+
+Usage (from backend/):
+    python -m benchmarks.preprocessing --data-dir /app/data
+
+Times three paths over the calibration images:
+- full: Image.open().convert("RGB") + Resize/ToTensor/Normalize (old path)
+- draft: reduced-scale JPEG decode + the same resize/normalize
+- cached: Preprocessor with a warm on-disk tensor cache
+Also reports how far the draft path drifts from the full decode.
+
+The bundled calibration images are already 224x224, where draft decoding is
+a no-op; ``--upscale 1920`` benchmarks on upscaled JPEG copies to model
+full-size photo uploads.
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from services.preprocessing import Preprocessor, build_transform
+
+
+def timed(fn, repeats: int) -> float:
+    """Best-of-``repeats`` wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args) -> None:
+    calibration_dir = Path(args.data_dir) / "global_calibration"
+    paths = [str(p) for p in sorted(calibration_dir.glob("*.[jp][pn][g]"))[:args.images]]
+    if not paths:
+        raise SystemExit(f"No images in {calibration_dir}")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.upscale:
+            paths = upscaled_copies(paths, Path(work_dir), args.upscale)
+        run(paths, args.repeats)
+
+
+def upscaled_copies(paths, out_dir: Path, width: int):
+    copies = []
+    for path in paths:
+        img = Image.open(path).convert("RGB")
+        height = round(img.height * width / img.width)
+        copy_path = out_dir / f"{Path(path).stem}.jpg"
+        img.resize((width, height), Image.BICUBIC).save(copy_path, quality=90)
+        copies.append(str(copy_path))
+    return copies
+
+
+def run(paths, repeats: int) -> None:
+    transform = build_transform()
+
+    def full():
+        return torch.stack([transform(Image.open(p).convert("RGB")) for p in paths])
+
+    draft = Preprocessor(cache_dir=None)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cached = Preprocessor(cache_dir=Path(cache_dir))
+        cached(paths)  # warm the cache
+
+        results = {
+            "full": timed(full, repeats),
+            "draft": timed(lambda: draft(paths), repeats),
+            "cached": timed(lambda: cached(paths), repeats)
+        }
+        drift = (full() - draft(paths)).abs()
+
+    size = Image.open(paths[0]).size
+    print(f"{len(paths)} images ({size[0]}x{size[1]}), best of {repeats}")
+    for name, seconds in results.items():
+        speedup = results["full"] / seconds
+        print(f"  {name:<7} {seconds * 1000 / len(paths):8.2f} ms/image  ({speedup:5.1f}x)")
+    print(f"  draft vs full decode: mean abs diff {drift.mean():.4f}, max {drift.max():.4f} (normalized units)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--images", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--upscale", type=int, default=0, help="Benchmark on JPEG copies upscaled to this width")
+    main(parser.parse_args())
@@ -0,0 +1,107 @@
+"""Overhead of the profiling endpoints on a busy process.
+
+Usage (from backend/):
+    python -m benchmarks.profiling --threads 8 --seconds 3
+
+Runs ``--threads`` worker threads that alternate pure-Python work with a
+small torch forward, and compares their throughput without profiling,
+under the stack sampler (at a few intervals) and under a torch capture
+spanning the run. Also reports the cost of one stack sample and of the
+``profiled_calibration`` marker when no capture is running.
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import torch
+
+import profiling
+from profiling import capture_calibrations, profiled_calibration, sample_stacks
+
+
+def python_work(depth: int) -> int:
+    if depth == 0:
+        return sum(i * i for i in range(300))
+    return python_work(depth - 1)
+
+
+def run_workers(threads: int, seconds: float, profiler: Optional[Callable[[], None]] = None) -> float:
+    """Work items per second across all worker threads."""
+    model = torch.nn.Linear(256, 256)
+    stop = threading.Event()
+    counts = [0] * threads
+
+    def worker(index: int) -> None:
+        batch = torch.randn(8, 256)
+        while not stop.is_set():
+            with profiled_calibration("work"):
+                python_work(20)
+                with torch.no_grad():
+                    model(batch)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    profiler_thread = threading.Thread(target=profiler, daemon=True) if profiler else None
+    if profiler_thread:
+        profiler_thread.start()
+    start = time.perf_counter()
+    time.sleep(seconds)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    for thread in workers:
+        thread.join()
+    if profiler_thread:
+        profiler_thread.join()
+    return sum(counts) / elapsed
+
+
+def main(args) -> Dict:
+    torch.set_num_threads(1)
+    baseline = run_workers(args.threads, args.seconds)
+    report = {"threads": args.threads, "baseline_items_per_s": round(baseline, 1), "sampler": {}}
+
+    for interval_ms in (20.0, 10.0, 5.0):
+        result = {}
+
+        def sample(interval_ms=interval_ms, result=result):
+            result["profile"] = sample_stacks(args.seconds, interval_ms)
+
+        throughput = run_workers(args.threads, args.seconds, sample)
+        profile = result["profile"]
+        report["sampler"][f"{interval_ms:g}ms"] = {
+            "throughput_drop_pct": round(100 * (1 - throughput / baseline), 1),
+            "samples": profile.samples,
+            "us_per_sample": round(profile.sampler_ms * 1000 / max(profile.samples, 1), 1),
+            "sampler_share_pct": round(100 * profile.sampler_ms / 1000 / profile.seconds, 2)
+        }
+
+    # Torch capture with an unreachable calibration count, so it runs the whole time
+    limit = profiling.PROFILE_MAX_CALIBRATIONS
+    profiling.PROFILE_MAX_CALIBRATIONS = 10 ** 9
+    try:
+        throughput = run_workers(args.threads, args.seconds,
+                                 lambda: capture_calibrations(10 ** 9, timeout=args.seconds))
+    finally:
+        profiling.PROFILE_MAX_CALIBRATIONS = limit
+    report["torch_capture_throughput_drop_pct"] = round(100 * (1 - throughput / baseline), 1)
+
+    start = time.perf_counter()
+    for _ in range(args.marker_calls):
+        with profiled_calibration("marker"):
+            pass
+    report["idle_marker_us"] = round((time.perf_counter() - start) * 1e6 / args.marker_calls, 2)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--marker-calls", type=int, default=100000)
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+"""Accuracy-parity and performance report: INT8 vs FP32 backbone.
+
+Usage (from backend/):
+    python -m benchmarks.quantization_report --data-dir /app/data --users 200
+
+Compares, over the images in ``global_calibration/``:
+- per-image feature cosine similarity
+- per-user ``embedding_vector`` / ``ideal_vector`` cosine similarity for
+  simulated rating sets (aggregation mirrors VisualService.calibrate_user)
+- rank agreement (Spearman, top-10 overlap) of every image scored against
+  each user's embedding
+- throughput at batch 1 and batch 32, and serialized model size
+"""
+import argparse
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from PIL import Image
+
+from models import ResNetBackbone, DynamicLearner, quantize_backbone
+from services.preprocessing import build_transform, calibration_batches
+
+
+def extract(backbone: torch.nn.Module, images: torch.Tensor, batch_size: int = 32) -> torch.Tensor:
+    with torch.no_grad():
+        return torch.cat([backbone(images[i:i + batch_size]) for i in range(0, len(images), batch_size)])
+
+
+def user_vectors(learner: DynamicLearner, features: torch.Tensor, ratings: torch.Tensor):
+    """Embedding and ideal vector exactly as calibrate_user computes them."""
+    weights = (ratings - 1) / 4.0
+    aggregated = (features * weights.unsqueeze(1)).sum(dim=0, keepdim=True) / (weights.sum() + 1e-8)
+    with torch.no_grad():
+        embedding = learner.get_user_weights(aggregated)
+    liked = features[ratings >= 4]
+    ideal = liked.mean(dim=0) if len(liked) else None
+    return embedding, ideal
+
+
+def spearman(a: torch.Tensor, b: torch.Tensor) -> float:
+    rank_a = a.argsort().argsort().float()
+    rank_b = b.argsort().argsort().float()
+    return float(torch.corrcoef(torch.stack([rank_a, rank_b]))[0, 1])
+
+
+def throughput(backbone: torch.nn.Module, batch_size: int, seconds: float = 3.0) -> float:
+    x = torch.randn(batch_size, 3, 224, 224)
+    with torch.no_grad():
+        backbone(x)
+        done, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            backbone(x)
+            done += batch_size
+    return done / (time.perf_counter() - start)
+
+
+def serialized_mb(backbone: torch.nn.Module) -> float:
+    buffer = io.BytesIO()
+    with torch.no_grad():
+        torch.jit.save(torch.jit.freeze(torch.jit.trace(backbone, torch.zeros(1, 3, 224, 224))), buffer)
+    return buffer.tell() / 1e6
+
+
+def summarize(values: List[float]) -> Dict:
+    arr = np.asarray(values)
+    return {"mean": float(arr.mean()), "min": float(arr.min()), "p5": float(np.percentile(arr, 5))}
+
+
+def main(args) -> Dict:
+    calibration_dir = Path(args.data_dir) / "global_calibration"
+    paths = sorted(calibration_dir.glob("*.[jp][pn][g]"))[:args.images]
+    if len(paths) < args.images_per_user:
+        raise SystemExit(f"Need at least {args.images_per_user} images in {calibration_dir}")
+
+    transform = build_transform()
+    images = torch.stack([transform(Image.open(p).convert("RGB")) for p in paths])
+
+    fp32 = ResNetBackbone(pretrained=True)
+    if args.backbone_weights:
+        fp32.load_state_dict(torch.load(args.backbone_weights, map_location="cpu"))
+    fp32.eval()
+    int8 = quantize_backbone(fp32, calibration_batches(calibration_dir, transform, limit=args.calibration_images))
+
+    torch.manual_seed(0)
+    learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).eval()
+
+    feats_fp32 = extract(fp32, images)
+    feats_int8 = extract(int8, images)
+    feature_cos = F.cosine_similarity(feats_fp32, feats_int8).tolist()
+
+    rng = np.random.default_rng(args.seed)
+    embedding_cos, ideal_cos, rank_corr, top10 = [], [], [], []
+    for _ in range(args.users):
+        idx = torch.from_numpy(rng.choice(len(paths), size=args.images_per_user, replace=False))
+        ratings = torch.from_numpy(rng.integers(1, 6, size=args.images_per_user)).float()
+
+        emb_a, ideal_a = user_vectors(learner, feats_fp32[idx], ratings)
+        emb_b, ideal_b = user_vectors(learner, feats_int8[idx], ratings)
+        embedding_cos.append(float(F.cosine_similarity(emb_a, emb_b, dim=0)))
+        if ideal_a is not None:
+            ideal_cos.append(float(F.cosine_similarity(ideal_a, ideal_b, dim=0)))
+
+        scores_a = feats_fp32 @ emb_a
+        scores_b = feats_int8 @ emb_b
+        rank_corr.append(spearman(scores_a, scores_b))
+        k = min(10, len(paths))
+        overlap = set(scores_a.topk(k).indices.tolist()) & set(scores_b.topk(k).indices.tolist())
+        top10.append(len(overlap) / k)
+
+    report = {
+        "images": len(paths),
+        "users": args.users,
+        "quantized_engine": torch.backends.quantized.engine,
+        "feature_cosine": summarize(feature_cos),
+        "embedding_vector_cosine": summarize(embedding_cos),
+        "ideal_vector_cosine": summarize(ideal_cos) if ideal_cos else None,
+        "rank_spearman": summarize(rank_corr),
+        "top10_overlap": summarize(top10),
+        "throughput_img_per_s": {
+            "fp32_batch1": throughput(fp32, 1),
+            "int8_batch1": throughput(int8, 1),
+            "fp32_batch32": throughput(fp32, 32),
+            "int8_batch32": throughput(int8, 32)
+        },
+        "model_size_mb": {"fp32": serialized_mb(fp32), "int8": serialized_mb(int8)},
+        "torch_threads": torch.get_num_threads()
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--backbone-weights", default=None)
+    parser.add_argument("--images", type=int, default=500, help="Max images to evaluate")
+    parser.add_argument("--calibration-images", type=int, default=64, help="Images used to calibrate INT8 ranges")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--images-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Also write the report as JSON")
+    main(parser.parse_args())
@@ -0,0 +1,109 @@
+"""Rating writes per submission: one ORM row per rating vs the bulk upsert.
+
+Usage (from backend/):
+    DATA_DIR=/tmp/bench PRELOAD_MODELS=false python -m benchmarks.rating_writes --users 50 --submissions 5
+
+``--users`` throwaway users each submit ``--ratings`` ratings
+``--submissions`` times (resubmitting changes some of them). The first pass
+does what submit_calibration used to do: one CalibrationRating add per
+rating, flushed on commit as an executemany, into a scratch copy of the
+old table with no unique index. The second pass uses rating_upserts.
+Reports the INSERT statements the database ran per submission (an
+executemany runs one per row), time per submission, and the rows left in
+each table.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from typing import Dict
+
+from sqlalchemy import MetaData, event, func, select
+
+SCRATCH_TABLE = "calibration_ratings_append_bench"
+
+
+class InsertCounter:
+    def __init__(self):
+        self.statements = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT"):
+            self.statements += len(parameters) if executemany else 1
+
+
+def run(submit, users, args) -> Dict:
+    from database import SessionLocal, engine
+
+    rng = random.Random(0)
+    counter = InsertCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    start = time.perf_counter()
+    try:
+        for _ in range(args.submissions):
+            for user_id in users:
+                ratings = {f"img{i}": rng.randint(1, 5) for i in range(args.ratings)}
+                db = SessionLocal()
+                try:
+                    submit(db, user_id, ratings)
+                    db.commit()
+                finally:
+                    db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+    submissions = args.submissions * len(users)
+    return {
+        "inserts_per_submission": round(counter.statements / submissions, 2),
+        "ms_per_submission": round((time.perf_counter() - start) * 1000 / submissions, 2)
+    }
+
+
+def main(args) -> Dict:
+    from database import engine, init_db
+    from db_models import CalibrationRating, rating_upserts
+
+    init_db()
+    users = [f"bench-{uuid.uuid4().hex[:12]}" for _ in range(args.users)]
+
+    # The pre-upsert schema: no unique index, so every write is a new row
+    scratch = CalibrationRating.__table__.to_metadata(MetaData(), name=SCRATCH_TABLE)
+    scratch.indexes.clear()
+    scratch.drop(engine, checkfirst=True)
+    scratch.create(engine)
+
+    def append(db, user_id, ratings):
+        db.execute(scratch.insert(), [
+            {"user_id": user_id, "image_id": image_id, "rating": rating} for image_id, rating in ratings.items()
+        ])
+
+    def upsert(db, user_id, ratings):
+        rows = [{"user_id": user_id, "image_id": image_id, "rating": rating} for image_id, rating in ratings.items()]
+        for statement in rating_upserts(db.bind.dialect.name, rows):
+            db.execute(statement)
+
+    table = CalibrationRating.__table__
+    try:
+        report = {"database": engine.dialect.name, "users": args.users, "ratings": args.ratings,
+                  "submissions": args.submissions}
+        report["append"] = run(append, users, args)
+        report["upsert"] = run(upsert, users, args)
+        with engine.begin() as conn:
+            report["append"]["rows"] = conn.scalar(select(func.count()).select_from(scratch))
+            report["upsert"]["rows"] = conn.scalar(
+                select(func.count()).select_from(table).where(table.c.user_id.in_(users))
+            )
+            conn.execute(table.delete().where(table.c.user_id.in_(users)))
+    finally:
+        scratch.drop(engine)
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--ratings", type=int, default=10, help="Ratings per submission")
+    parser.add_argument("--submissions", type=int, default=5, help="Submissions per user")
+    main(parser.parse_args())
@@ -0,0 +1,140 @@
+"""Disk size and load latency of p1_visual_vector: legacy JSON vs VectorStore.
+
+Usage (from backend/):
+    python -m benchmarks.vector_storage --profiles 100000 --dir /tmp/vector_bench
+
+Writes ``--profiles`` synthetic profiles (512-dim float32 embedding and
+ideal vector, as calibrate_user produces) in both formats, then loads a
+random sample of users: legacy ``json.load``, VectorStore with a cold LRU,
+and VectorStore with a warm LRU. Every sampled load is checked to serialize
+to the same JSON as the legacy file. The OS page cache is not dropped, so
+"cold" means cold for the in-process LRU only.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from services.vector_store import LEGACY_FILE, VectorStore
+
+
+def make_profile(user_id: str, rng: np.random.Generator) -> Dict:
+    return {
+        "meta": {
+            "user_id": user_id,
+            "gender": "unspecified",
+            "preference_target": "unspecified",
+            "calibration_timestamp": "2026-01-01T00:00:00.000000Z",
+            "images_rated": 20
+        },
+        "self_analysis": {
+            "embedding_vector": rng.standard_normal(512, dtype=np.float32).tolist(),
+            "detected_traits": {
+                "facial_landmarks": ["placeholder"],
+                "style_presentation": ["placeholder"],
+                "vibe_tags": ["placeholder"]
+            }
+        },
+        "preference_model": {
+            "ideal_vector": rng.standard_normal(512, dtype=np.float32).tolist(),
+            "attraction_triggers": {
+                "mandatory_traits": ["placeholder_positive_trait"],
+                "negative_traits": ["placeholder_negative_trait"]
+            },
+            "calibration_confidence": 0.73
+        }
+    }
+
+
+def disk_usage(root: Path) -> Dict:
+    apparent, allocated, files = 0, 0, 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            stat = os.stat(os.path.join(dirpath, name))
+            apparent += stat.st_size
+            allocated += stat.st_blocks * 512
+            files += 1
+    return {"files": files, "apparent_mb": round(apparent / 1e6, 1), "allocated_mb": round(allocated / 1e6, 1)}
+
+
+def latency(fn, user_ids: List[str]) -> Dict:
+    samples = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        fn(user_id)
+        samples.append((time.perf_counter() - start) * 1e6)
+    arr = np.asarray(samples)
+    return {
+        "p50_us": round(float(np.percentile(arr, 50)), 1),
+        "p99_us": round(float(np.percentile(arr, 99)), 1),
+        "mean_us": round(float(arr.mean()), 1)
+    }
+
+
+def main(args) -> Dict:
+    root = Path(args.dir)
+    shutil.rmtree(root, ignore_errors=True)
+    legacy_dir, binary_dir = root / "legacy", root / "binary"
+    rng = np.random.default_rng(args.seed)
+    store = VectorStore(binary_dir)
+
+    write_legacy = write_binary = 0.0
+    user_ids = [f"user-{i:07d}" for i in range(args.profiles)]
+    for user_id in user_ids:
+        profile = make_profile(user_id, rng)
+
+        start = time.perf_counter()
+        user_dir = legacy_dir / user_id
+        user_dir.mkdir(parents=True)
+        with open(user_dir / LEGACY_FILE, "w") as f:
+            json.dump(profile, f, indent=2)
+        write_legacy += time.perf_counter() - start
+
+        start = time.perf_counter()
+        store.save(user_id, profile)
+        write_binary += time.perf_counter() - start
+
+    sample = [str(u) for u in rng.choice(user_ids, size=min(args.sample, len(user_ids)), replace=False)]
+
+    def load_legacy(user_id: str) -> Dict:
+        with open(legacy_dir / user_id / LEGACY_FILE) as f:
+            return json.load(f)
+
+    for user_id in sample:
+        assert json.dumps(store.load(user_id)) == json.dumps(load_legacy(user_id)), user_id
+    store.clear_cache()
+
+    report = {
+        "profiles": args.profiles,
+        "disk": {"legacy_json": disk_usage(legacy_dir), "binary": disk_usage(binary_dir)},
+        "write_us_per_profile": {
+            "legacy_json": round(write_legacy / args.profiles * 1e6, 1),
+            "binary": round(write_binary / args.profiles * 1e6, 1)
+        },
+        "load": {
+            "legacy_json": latency(load_legacy, sample),
+            "binary_cold_lru": latency(store.load, sample),
+            "binary_warm_lru": latency(store.load, sample)
+        },
+        "lru": store.stats()
+    }
+
+    print(json.dumps(report, indent=2))
+    if not args.keep:
+        shutil.rmtree(root, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=2000, help="Users to time loads for")
+    parser.add_argument("--dir", default="/tmp/vector_bench")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="Keep the generated profiles")
+    main(parser.parse_args())
@@ -1,8 +1,16 @@
 import os
+import ssl
+import time
+from typing import Optional, Tuple
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from metrics import DB_SESSION_SECONDS
+
 # Database configuration
 # Supports: SQLite (local dev) or Cloud SQL PostgreSQL (production)
 
@@ -10,10 +18,82 @@ DATA_DIR = os.getenv("DATA_DIR", "/app/data")
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 CLOUD_SQL_CONNECTION_NAME = os.getenv("CLOUD_SQL_CONNECTION_NAME", "")
 
+# PostgreSQL connection pool, per engine (sync and async each have one)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "2"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
 # Base class for models
 Base = declarative_base()
 
 
+def _pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True
+    }
+
+
+def _with_driver(url: str, driver: str) -> str:
+    """Swap the DBAPI driver of a SQLAlchemy URL (postgresql+pg8000:// -> postgresql+asyncpg://)."""
+    scheme, rest = url.split("://", 1)
+    return f"{scheme.split('+', 1)[0]}+{driver}://{rest}"
+
+
+# libpq connection parameters asyncpg has no keyword for; dropped from async URLs
+_LIBPQ_ONLY_PARAMS = {
+    "sslcompression", "sslcrl", "sslpassword", "gssencmode", "krbsrvname", "channel_binding",
+    "keepalives", "keepalives_idle", "keepalives_interval", "keepalives_count", "requirepeer", "options"
+}
+
+
+def _asyncpg_ssl(mode: str, rootcert: Optional[str] = None, cert: Optional[str] = None, key: Optional[str] = None):
+    """asyncpg's ``ssl`` connect argument for a libpq ``sslmode``."""
+    if mode == "disable":
+        return False
+    if not (rootcert or cert):
+        # asyncpg accepts the libpq mode names themselves
+        return mode
+    if mode in ("verify-ca", "verify-full") or rootcert:
+        context = ssl.create_default_context(cafile=rootcert)
+        context.check_hostname = mode == "verify-full"
+    else:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    if cert:
+        context.load_cert_chain(cert, key)
+    return context
+
+
+def _asyncpg_url(url: str) -> Tuple[str, dict]:
+    """Rewrite a PostgreSQL URL for asyncpg, returning it with its connect_args.
+
+    SQLAlchemy hands URL query parameters to asyncpg.connect as keywords,
+    and asyncpg rejects libpq ones like ``sslmode``: translate the SSL
+    settings and connect_timeout, and drop parameters asyncpg can't use.
+    """
+    parsed = make_url(_with_driver(url, "asyncpg"))
+    query = dict(parsed.query)
+    connect_args = {}
+    mode = query.pop("sslmode", None)
+    files = {name: query.pop(f"ssl{name}", None) for name in ("rootcert", "cert", "key")}
+    if mode or files["rootcert"] or files["cert"]:
+        connect_args["ssl"] = _asyncpg_ssl(mode or "prefer", **files)
+    if "connect_timeout" in query:
+        connect_args["timeout"] = float(query.pop("connect_timeout"))
+    if "application_name" in query:
+        connect_args["server_settings"] = {"application_name": query.pop("application_name")}
+    for name in _LIBPQ_ONLY_PARAMS.intersection(query):
+        print(f"Ignoring {name} in DATABASE_URL: not supported by asyncpg")
+        query.pop(name)
+    return parsed.set(query=query).render_as_string(hide_password=False), connect_args
+
+
 def get_engine():
     """Create database engine based on environment."""
 
@@ -26,37 +106,95 @@ def get_engine():
         db_name = os.getenv("DB_NAME", "harmonia")
 
         url = f"postgresql+pg8000://{db_user}:{db_pass}@/{db_name}?unix_sock={socket_path}/.s.PGSQL.5432"
-        return create_engine(url, pool_size=5, max_overflow=2, pool_pre_ping=True)
+        return create_engine(url, **_pool_options())
 
     # Option 2: Direct PostgreSQL URL
     if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
-        return create_engine(DATABASE_URL, pool_size=5, max_overflow=2, pool_pre_ping=True)
+        return create_engine(DATABASE_URL, **_pool_options())
 
     # Option 3: SQLite for local development (default)
     sqlite_url = DATABASE_URL or f"sqlite:///{DATA_DIR}/harmonia.db"
     return create_engine(sqlite_url, connect_args={"check_same_thread": False})
 
 
+def get_async_engine():
+    """Create the asyncio engine for the same database (asyncpg / aiosqlite)."""
+
+    # Option 1: Cloud SQL PostgreSQL via Unix socket (Cloud Run)
+    if CLOUD_SQL_CONNECTION_NAME:
+        socket_dir = f"/cloudsql/{CLOUD_SQL_CONNECTION_NAME}"
+        db_user = os.getenv("DB_USER", "postgres")
+        db_pass = os.getenv("DB_PASS", "")
+        db_name = os.getenv("DB_NAME", "harmonia")
+
+        url = f"postgresql+asyncpg://{db_user}:{db_pass}@/{db_name}?host={socket_dir}"
+        return create_async_engine(url, **_pool_options())
+
+    # Option 2: Direct PostgreSQL URL
+    if DATABASE_URL and DATABASE_URL.startswith("postgresql"):
+        url, connect_args = _asyncpg_url(DATABASE_URL)
+        return create_async_engine(url, connect_args=connect_args, **_pool_options())
+
+    # Option 3: SQLite for local development (default)
+    sqlite_url = DATABASE_URL or f"sqlite:///{DATA_DIR}/harmonia.db"
+    return create_async_engine(_with_driver(sqlite_url, "aiosqlite"))
+
+
 # Create engine
 engine = get_engine()
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions, used by the API routes. Objects stay loaded
+# after commit, because an expired attribute can't lazy-load outside an await.
+async_engine = get_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_db():
-    """Dependency for getting database session."""
+    """Dependency for getting a synchronous database session.
+
+    For sync code (scripts, background workers). Async routes use get_async_db.
+    """
+    start = time.perf_counter()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - start)
+
+
+async def get_async_db():
+    """Dependency for getting an asyncio database session."""
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        finally:
+            DB_SESSION_SECONDS.observe(time.perf_counter() - start)
 
 
 def init_db():
-    """Initialize database tables."""
+    """Initialize database tables.
+
+    Raises:
+        RuntimeError: If calibration_ratings still has the pre-upsert schema,
+            which every rating write would fail on
+    """
+    from migrations.compact_calibration_ratings import is_compacted
+    if not is_compacted(engine):
+        raise RuntimeError(
+            "calibration_ratings predates the one-row-per-image schema; run "
+            "`python -m migrations.compact_calibration_ratings` before starting the app"
+        )
+
     import db_models  # noqa - registers models with Base
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that exist; add indexes defined since
+    for index in db_models.User.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
     db_type = "Cloud SQL PostgreSQL" if CLOUD_SQL_CONNECTION_NAME else \
               "PostgreSQL" if DATABASE_URL and "postgresql" in DATABASE_URL else "SQLite"
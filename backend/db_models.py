@@ -1,6 +1,8 @@
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, DateTime, Boolean, Text, JSON
+from typing import Dict, List
+from sqlalchemy import Column, String, DateTime, Boolean, Text, JSON, SmallInteger, Index
+from sqlalchemy.sql.dml import Insert
 
 from database import Base
 
@@ -17,6 +19,10 @@ def utc_now():
 class User(Base):
     """User database model."""
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination of the admin user listing
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
     email = Column(String(255), unique=True, nullable=False, index=True)
@@ -47,11 +53,57 @@ class PsychometricResponse(Base):
 
 
 class CalibrationRating(Base):
-    """Store user's image calibration ratings."""
+    """Store user's image calibration ratings (one row per user and image)."""
     __tablename__ = "calibration_ratings"
+    __table_args__ = (
+        # Also serves lookups by user_id alone
+        Index("ix_calibration_ratings_user_image", "user_id", "image_id", unique=True),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_uuid)
-    user_id = Column(String(36), nullable=False, index=True)
+    user_id = Column(String(36), nullable=False)
     image_id = Column(String(100), nullable=False)
-    rating = Column(String(1), nullable=False)  # 1-5
+    rating = Column(SmallInteger, nullable=False)  # 1-5
     created_at = Column(DateTime(timezone=True), default=utc_now)
+
+
+# Rows per INSERT, keeping 5 bind parameters per row well under the
+# PostgreSQL (32767) and SQLite (32766) limits
+RATING_UPSERT_ROWS = 1000
+
+
+def rating_upserts(dialect_name: str, rows: List[Dict]) -> List[Insert]:
+    """Multi-row INSERT ... ON CONFLICT statements storing ratings.
+
+    A rating for an image the user already rated replaces the old one
+    (only if it changed), so resubmitting never adds rows.
+
+    Args:
+        dialect_name: ``session.bind.dialect.name`` ("postgresql" or "sqlite")
+        rows: ``{"user_id", "image_id", "rating"}`` dicts; for a repeated
+            (user_id, image_id) the last one wins
+
+    Returns:
+        One statement per RATING_UPSERT_ROWS rows (one for a normal submission)
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    # One statement can't touch the same row twice (PostgreSQL rejects it)
+    rows = list({(row["user_id"], row["image_id"]): row for row in rows}.values())
+    table = CalibrationRating.__table__
+    statements = []
+    for start in range(0, len(rows), RATING_UPSERT_ROWS):
+        now = utc_now()
+        stmt = insert(table).values([
+            {"id": generate_uuid(), "created_at": now, **row}
+            for row in rows[start:start + RATING_UPSERT_ROWS]
+        ])
+        statements.append(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.image_id],
+            set_={"rating": stmt.excluded.rating, "created_at": stmt.excluded.created_at},
+            where=table.c.rating != stmt.excluded.rating
+        ))
+    return statements
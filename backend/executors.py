@@ -0,0 +1,83 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class PoolSaturated(Exception):
+    """Raised when a bounded executor has no free worker or queue slot."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} pool is saturated")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """Thread pool for blocking work called from async routes.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more
+    wait for a worker. Beyond that, ``run`` fails fast with PoolSaturated
+    instead of letting latency pile up behind the pool.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on the pool without blocking the event loop.
+
+        Raises:
+            PoolSaturated: If all worker and queue slots are taken
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise PoolSaturated(self.name, self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+        # Release the slot when the job finishes, not when the awaiting
+        # request goes away, so abandoned jobs still count against capacity
+        try:
+            future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            # Never queued (e.g. the pool is shut down): give the slot back
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def stats(self) -> Dict:
+        """Snapshot of pool occupancy."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.max_workers),
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: measure event-loop lag and report what blocked the loop
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+# A loop that doesn't run for this long counts as blocked
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# How often the heartbeat task wakes up
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a heartbeat scheduled every LOOP_MONITOR_INTERVAL_MS."
+)
+EVENT_LOOP_BLOCK_SECONDS = REGISTRY.histogram(
+    "event_loop_block_duration_seconds",
+    "Event-loop stalls longer than LOOP_BLOCK_THRESHOLD_MS, by route and innermost app frame.",
+    ("route", "site")
+)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _task_stack(stack: List[traceback.FrameSummary]) -> List[traceback.FrameSummary]:
+    """The frames of the callback the loop is running (below the loop's own frames)."""
+    for index in range(len(stack) - 1, -1, -1):
+        frame = stack[index]
+        if frame.name == "_run" and frame.filename.replace("\\", "/").endswith("asyncio/events.py"):
+            return stack[index + 1:]
+    return stack
+
+
+def _app_site(stack: List[traceback.FrameSummary]) -> str:
+    """Innermost frame in this app's code (not the stdlib or site-packages)."""
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(_APP_DIR + os.sep) and "site-packages" not in path:
+            return f"{os.path.relpath(path, _APP_DIR)}:{frame.name}"
+    return "unknown"
+
+
+class LoopMonitor:
+    """Detects stalls of the event loop and records where they happened.
+
+    A heartbeat task sleeps for ``interval`` and measures how late it wakes
+    up, which is the loop lag every request on the loop also pays. A
+    watchdog thread checks the heartbeat. When the loop hasn't run for
+    ``threshold``, it is still stuck in the blocking call, so the watchdog
+    takes the loop thread's stack and the route of the running request
+    right then. When the loop recovers, the stall is logged with that stack
+    and recorded in EVENT_LOOP_BLOCK_SECONDS.
+
+    Routes come from MonitorMiddleware, which registers each request's
+    frame with its ASGI scope. The watchdog looks for a registered frame
+    on the loop thread's stack, so it never touches the loop's own state
+    from its thread.
+    """
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, interval_ms: float = LOOP_MONITOR_INTERVAL_MS):
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        # id(middleware frame) -> ASGI scope of the request it serves; guarded by _lock
+        self.requests: Dict[int, dict] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._last_beat = time.perf_counter()
+        self._stall: Optional[Dict] = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop (call from a coroutine on it)."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Event-loop monitor on: threshold {self.threshold * 1000:.0f} ms, "
+            f"heartbeat {self.interval * 1000:.0f} ms"
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    async def _heartbeat(self) -> None:
+        while True:
+            scheduled = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            EVENT_LOOP_LAG_SECONDS.observe(max(0.0, now - scheduled))
+            with self._lock:
+                self._last_beat = now
+                stall, self._stall = self._stall, None
+            if stall is not None:
+                self._report(stall, now - stall["since"])
+
+    def _watch(self) -> None:
+        poll = max(self.threshold / 4, 0.005)
+        while not self._stop.wait(poll):
+            with self._lock:
+                since = self._last_beat
+                if self._stall is not None or time.perf_counter() - since < self.interval + self.threshold:
+                    continue
+            stall = self._capture(since)
+            with self._lock:
+                # Only if the loop is still on the same beat
+                if self._last_beat == since and self._stall is None:
+                    self._stall = stall
+
+    def add_request(self, frame_id: int, scope: dict) -> None:
+        with self._lock:
+            self.requests[frame_id] = scope
+
+    def remove_request(self, frame_id: int) -> None:
+        with self._lock:
+            self.requests.pop(frame_id, None)
+
+    def _capture(self, since: float) -> Dict:
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = _task_stack(traceback.extract_stack(frame)) if frame is not None else []
+        with self._lock:
+            requests = dict(self.requests)
+        # The running request is the one whose middleware frame is on the stack
+        scope = None
+        while frame is not None and scope is None:
+            scope = requests.get(id(frame))
+            frame = frame.f_back
+        route = getattr(scope.get("route"), "path", "unmatched") if scope else "none"
+        method = scope.get("method", "") if scope else ""
+        return {"since": since + self.interval, "stack": stack, "route": route, "method": method}
+
+    def _report(self, stall: Dict, duration: float) -> None:
+        site = _app_site(stall["stack"])
+        EVENT_LOOP_BLOCK_SECONDS.labels(stall["route"], site).observe(duration)
+        logger.warning(
+            f"Event loop blocked for {duration * 1000:.0f} ms by {stall['method']} {stall['route']} "
+            f"at {site}\n{''.join(traceback.format_list(stall['stack']))}"
+        )
+
+
+class MonitorMiddleware:
+    """ASGI middleware telling a LoopMonitor which request each frame serves."""
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # While the request runs, this frame is on the loop thread's stack
+        frame_id = id(sys._getframe())
+        self.monitor.add_request(frame_id, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.remove_request(frame_id)
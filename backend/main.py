@@ -1,22 +1,34 @@
 import os
 import json
+import base64
+import binascii
+import hmac
+import time
+import asyncio
 import logging
 import traceback
 from pathlib import Path
 from contextlib import asynccontextmanager
-from typing import List
+from typing import Dict, List, Literal, Optional
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi import FastAPI, Depends, Query, Request, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import init_db, get_db
-from routers import auth_router, calibration_router, psychometric_router
+from database import AsyncSessionLocal, async_engine, get_async_db, init_db
+from routers import auth_router, calibration_router, candidates_router, matches_router, psychometric_router
 from db_models import User
-from auth import get_current_user
+from loop_monitor import LOOP_MONITOR_ENABLED, LoopMonitor, MonitorMiddleware
+from metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware
+from profiling import ProfilerBusy, capture_calibrations, sample_stacks
+from auth import get_current_user, password_executor
+from services.image_catalog import get_image_catalog
+from services.vector_store import get_vector_store
 
 # ==================== LOGGING SETUP ====================
 LOG_DIR = Path(os.getenv("DATA_DIR", "/app/data")) / "logs"
@@ -35,14 +47,53 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info(f"=== Harmonia Starting === Log file: {LOG_FILE}")
 
+# ==================== STARTUP TIMINGS ====================
+APP_START = time.perf_counter()
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "true").lower() == "true"
+STARTUP_TIMINGS = {}
+
+# Opt-in event-loop stall detection (see loop_monitor.py)
+loop_monitor = LoopMonitor() if LOOP_MONITOR_ENABLED else None
+
+
+def preload_models() -> None:
+    """Load and warm the MetaFBP models before serving traffic."""
+    from routers.calibration import get_visual_service
+    from services.match_index import get_match_index
+
+    service = get_visual_service()
+    service.warmup()
+    STARTUP_TIMINGS.update(service.timings)
+    # Open (on a first start, build) the match index before traffic too
+    start = time.perf_counter()
+    get_match_index(service.data_dir)
+    STARTUP_TIMINGS["match_index_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
+    if loop_monitor is not None:
+        loop_monitor.start()
+
     # Startup: Initialize database
+    start = time.perf_counter()
     init_db()
+    STARTUP_TIMINGS["db_init_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    # Startup: Load models so the first calibration doesn't pay for it
+    if PRELOAD_MODELS:
+        await asyncio.to_thread(preload_models)
+    STARTUP_TIMINGS["ready_s"] = round(time.perf_counter() - APP_START, 3)
+    logger.info(f"Startup complete: {STARTUP_TIMINGS}")
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop accepting pool work
+    from routers.calibration import calibration_executor
+    calibration_executor.shutdown()
+    password_executor.shutdown()
+    await async_engine.dispose()
+    if loop_monitor is not None:
+        await loop_monitor.stop()
 
 
 app = FastAPI(
@@ -61,6 +112,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if loop_monitor is not None:
+    app.add_middleware(MonitorMiddleware, monitor=loop_monitor)
+# Outermost, so latency includes CORS handling and error responses
+app.add_middleware(MetricsMiddleware)
 
 
 # ==================== GLOBAL ERROR HANDLER ====================
@@ -98,6 +153,8 @@ TRACEBACK:
 # Include API routers
 app.include_router(auth_router)
 app.include_router(calibration_router)
+app.include_router(matches_router)
+app.include_router(candidates_router)
 app.include_router(psychometric_router)
 
 # Serve static files (frontend)
@@ -158,8 +215,16 @@ async def health_check():
 @app.get("/api/status")
 async def get_status():
     """Get application status."""
+    from services import VisualService
+
+    startup = dict(STARTUP_TIMINGS)
+    service = VisualService._instance
+    if service is not None and service._initialized and service.first_calibration_at:
+        startup["time_to_first_calibration_s"] = round(service.first_calibration_at - APP_START, 3)
+
     return {
         "version": "1.0.0",
+        "startup": startup,
         "phase": "1 - Visual Calibration",
         "features": [
             "User Registration",
@@ -170,28 +235,131 @@ async def get_status():
     }
 
 
+# ==================== METRICS ====================
+# Optional bearer token for scrapers; /api/metrics is open when unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def _inference_queue_depth():
+    from services import VisualService
+
+    # Don't load the models just to report on them
+    service = VisualService._instance
+    if service is None or not service._initialized:
+        return None
+    return service.scheduler.stats()["queue_depth"]
+
+
+def _calibration_pool_in_flight():
+    from routers.calibration import calibration_executor
+    return calibration_executor.stats()["in_flight"]
+
+
+REGISTRY.gauge("inference_queue_depth", "Images waiting for a backbone batch.", _inference_queue_depth)
+REGISTRY.gauge("calibration_pool_in_flight", "Calibrations running or queued on the pool.", _calibration_pool_in_flight)
+REGISTRY.gauge("password_hash_pool_in_flight", "Password hashes running or queued on the pool.",
+               lambda: password_executor.stats()["in_flight"])
+REGISTRY.counter("password_hash_pool_rejected_total", "Sign-ins refused because the hashing pool was full.",
+                 lambda: password_executor.stats()["rejected"])
+
+
+@app.get("/api/metrics")
+async def get_metrics(request: Request):
+    """Prometheus text exposition of request, calibration-stage and DB timings."""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 # ==================== ADMIN/DEBUG ENDPOINTS (Protected) ====================
+# /api/admin/users page sizes, and rows fetched per round trip when streaming
+ADMIN_USERS_PAGE_SIZE = int(os.getenv("ADMIN_USERS_PAGE_SIZE", "100"))
+ADMIN_USERS_MAX_PAGE_SIZE = int(os.getenv("ADMIN_USERS_MAX_PAGE_SIZE", "1000"))
+ADMIN_USERS_STREAM_BATCH = int(os.getenv("ADMIN_USERS_STREAM_BATCH", "1000"))
+
+_USER_LISTING_COLUMNS = (
+    User.id, User.username, User.email,
+    User.psychometric_complete, User.calibration_complete, User.created_at
+)
+
+
+def _encode_user_cursor(created_at: datetime, user_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_user_cursor(cursor: str):
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(user_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _user_listing_query(
+    cursor: Optional[str],
+    psychometric_complete: Optional[bool],
+    calibration_complete: Optional[bool]
+):
+    """Users after ``cursor`` in (created_at, id) order, served by ix_users_created_at_id."""
+    query = select(*_USER_LISTING_COLUMNS).order_by(User.created_at, User.id)
+    if cursor:
+        query = query.where(tuple_(User.created_at, User.id) > tuple_(*_decode_user_cursor(cursor)))
+    if psychometric_complete is not None:
+        query = query.where(User.psychometric_complete == psychometric_complete)
+    if calibration_complete is not None:
+        query = query.where(User.calibration_complete == calibration_complete)
+    return query
+
+
+def _user_summary(row) -> Dict:
+    return {
+        "id": row.id,
+        "username": row.username,
+        "email": row.email,
+        "psychometric_complete": row.psychometric_complete,
+        "calibration_complete": row.calibration_complete,
+        "created_at": str(row.created_at)
+    }
+
+
+async def _stream_users(query):
+    # Own session: the request's one is closed before the body is sent
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=ADMIN_USERS_STREAM_BATCH))
+        async for rows in result.partitions():
+            yield "".join(json.dumps(_user_summary(row)) + "\n" for row in rows)
+
 
 @app.get("/api/admin/users")
 async def list_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(ADMIN_USERS_PAGE_SIZE, ge=1, le=ADMIN_USERS_MAX_PAGE_SIZE),
+    psychometric_complete: Optional[bool] = None,
+    calibration_complete: Optional[bool] = None,
+    format: Literal["json", "ndjson"] = "json",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """List all registered users (protected - requires auth)."""
-    users = db.query(User).all()
+    """List registered users, oldest first (protected - requires auth).
+
+    Pages are keyset-paginated on (created_at, id): pass ``next_cursor``
+    back as ``cursor`` for the next page. ``format=ndjson`` streams every
+    matching user after ``cursor`` as one JSON object per line, reading
+    ADMIN_USERS_STREAM_BATCH rows at a time, so memory doesn't grow with
+    the table; it ignores ``limit``.
+    """
+    query = _user_listing_query(cursor, psychometric_complete, calibration_complete)
+    if format == "ndjson":
+        return StreamingResponse(_stream_users(query), media_type="application/x-ndjson")
+
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    page = rows[:limit]
+    next_cursor = _encode_user_cursor(page[-1].created_at, page[-1].id) if len(rows) > limit else None
     return {
-        "total": len(users),
-        "users": [
-            {
-                "id": u.id,
-                "username": u.username,
-                "email": u.email,
-                "psychometric_complete": u.psychometric_complete,
-                "calibration_complete": u.calibration_complete,
-                "created_at": str(u.created_at)
-            }
-            for u in users
-        ]
+        "count": len(page),
+        "next_cursor": next_cursor,
+        "users": [_user_summary(row) for row in page]
     }
 
 
@@ -200,32 +368,8 @@ async def list_profiles(current_user: User = Depends(get_current_user)):
     """List all generated visual vector profiles (protected - requires auth)."""
     data_dir = Path(os.getenv("DATA_DIR", "/app/data"))
     profiles_dir = data_dir / "profiles"
-
-    profiles = []
-    if profiles_dir.exists():
-        for user_dir in profiles_dir.iterdir():
-            if user_dir.is_dir():
-                vector_file = user_dir / "p1_visual_vector.json"
-                profile_info = {
-                    "user_id": user_dir.name,
-                    "has_vector": vector_file.exists(),
-                    "vector_file": str(vector_file) if vector_file.exists() else None
-                }
-
-                if vector_file.exists():
-                    try:
-                        with open(vector_file) as f:
-                            vector_data = json.load(f)
-                        profile_info["vector_summary"] = {
-                            "images_rated": vector_data.get("meta", {}).get("images_rated", 0),
-                            "embedding_dim": len(vector_data.get("self_analysis", {}).get("embedding_vector", [])),
-                            "calibration_confidence": vector_data.get("preference_model", {}).get("calibration_confidence", 0),
-                            "timestamp": vector_data.get("meta", {}).get("calibration_timestamp")
-                        }
-                    except Exception as e:
-                        profile_info["error"] = str(e)
-
-                profiles.append(profile_info)
+    # Lists and decodes every stored vector: keep the file reads off the loop
+    profiles = await run_in_threadpool(_profile_summaries, get_vector_store(profiles_dir))
 
     return {
         "profiles_dir": str(profiles_dir),
@@ -234,18 +378,42 @@ async def list_profiles(current_user: User = Depends(get_current_user)):
     }
 
 
+def _profile_summaries(store) -> List[Dict]:
+    profiles = []
+    for user_id in store.user_ids():
+        vector_file = store.path(user_id)
+        profile_info = {
+            "user_id": user_id,
+            "has_vector": vector_file is not None,
+            "vector_file": str(vector_file) if vector_file else None
+        }
+
+        if vector_file is not None:
+            try:
+                vector_data = store.load(user_id)
+                profile_info["vector_summary"] = {
+                    "images_rated": vector_data.get("meta", {}).get("images_rated", 0),
+                    "embedding_dim": len(vector_data.get("self_analysis", {}).get("embedding_vector", [])),
+                    "calibration_confidence": vector_data.get("preference_model", {}).get("calibration_confidence", 0),
+                    "timestamp": vector_data.get("meta", {}).get("calibration_timestamp")
+                }
+            except Exception as e:
+                profile_info["error"] = str(e)
+
+        profiles.append(profile_info)
+    return profiles
+
+
 @app.get("/api/admin/profiles/{user_id}")
 async def get_profile_detail(user_id: str, current_user: User = Depends(get_current_user)):
     """Get detailed profile data for a specific user (protected - requires auth)."""
     data_dir = Path(os.getenv("DATA_DIR", "/app/data"))
-    vector_file = data_dir / "profiles" / user_id / "p1_visual_vector.json"
+    store = get_vector_store(data_dir / "profiles")
+    vector_data, vector_file = await run_in_threadpool(lambda: (store.load(user_id), store.path(user_id)))
 
-    if not vector_file.exists():
+    if vector_data is None:
         return {"error": "Profile not found", "user_id": user_id}
 
-    with open(vector_file) as f:
-        vector_data = json.load(f)
-
     return {
         "user_id": user_id,
         "vector_file": str(vector_file),
@@ -256,11 +424,11 @@ async def get_profile_detail(user_id: str, current_user: User = Depends(get_curr
 @app.get("/api/admin/db-info")
 async def get_db_info(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get database information (protected - requires auth)."""
     from database import DATABASE_URL
-    user_count = db.query(User).count()
+    user_count = await db.scalar(select(func.count()).select_from(User))
 
     return {
         "database_url": DATABASE_URL.replace("://", "://***:***@") if "@" in DATABASE_URL else DATABASE_URL,
@@ -268,6 +436,94 @@ async def get_db_info(
     }
 
 
+@app.get("/api/admin/inference-stats")
+async def get_inference_stats(current_user: User = Depends(get_current_user)):
+    """Get backbone micro-batching statistics (protected - requires auth)."""
+    from services import VisualService
+
+    # Don't load the models just to report on them
+    service = VisualService._instance
+    if service is None or not service._initialized:
+        return {"loaded": False}
+
+    return {"loaded": True, "scheduler": service.scheduler.stats()}
+
+
+@app.get("/api/admin/executor-stats")
+async def get_executor_stats(current_user: User = Depends(get_current_user)):
+    """Get blocking-work pool occupancy (protected - requires auth)."""
+    from routers.calibration import calibration_executor
+    return {"calibration": calibration_executor.stats(), "password_hash": password_executor.stats()}
+
+
+@app.get("/api/admin/match-index")
+async def get_match_index_stats(current_user: User = Depends(get_current_user)):
+    """Get match index size and search mode (protected - requires auth)."""
+    from services.match_index import get_match_index
+    index = await asyncio.to_thread(get_match_index, Path(os.getenv("DATA_DIR", "/app/data")))
+    return index.stats()
+
+
+# ==================== PROFILING (Protected) ====================
+# Off by default. When on, callers also need the operator token in
+# X-Profiling-Token: any registered user has a JWT, and a profile holds the
+# global profiler for up to PROFILE_MAX_SECONDS and exposes stacks.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+
+
+def _check_profiling_access(request: Request) -> None:
+    if not (PROFILING_ENABLED and PROFILING_TOKEN):
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    token = request.headers.get("x-profiling-token", "")
+    if not hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@app.post("/api/admin/profile/cpu")
+async def profile_cpu(
+    request: Request,
+    seconds: float = 10.0,
+    interval_ms: float = 10.0,
+    idle: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Sample all threads' Python stacks for a while (protected - requires auth and PROFILING_TOKEN).
+
+    Returns collapsed stacks (one "frame;frame;... count" line per stack) for
+    flamegraph.pl or speedscope.
+    """
+    _check_profiling_access(request)
+    try:
+        result = await asyncio.to_thread(sample_stacks, seconds, interval_ms, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(result.collapsed, headers={
+        "X-Profile-Samples": str(result.samples),
+        "X-Profile-Seconds": f"{result.seconds:.3f}",
+        "X-Profile-Sampler-Ms": f"{result.sampler_ms:.1f}"
+    })
+
+
+@app.post("/api/admin/profile/torch")
+async def profile_torch(
+    request: Request,
+    calibrations: int = 1,
+    timeout: float = 60.0,
+    current_user: User = Depends(get_current_user)
+):
+    """Trace the next calibrations with torch.profiler (protected - requires auth and PROFILING_TOKEN).
+
+    Returns Chrome trace JSON for chrome://tracing or Perfetto.
+    """
+    _check_profiling_access(request)
+    try:
+        trace = await asyncio.to_thread(capture_calibrations, calibrations, timeout)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(trace)
+
+
 # ==================== LOG VIEWING ENDPOINT ====================
 
 @app.get("/api/logs")
@@ -322,24 +578,23 @@ async def clear_logs(current_user: User = Depends(get_current_user)):
 @app.get("/api/profile/download")
 async def download_profile(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Download user profile and MetaFBP calibration data as JSON."""
-    from services import VisualService
+    from routers.calibration import get_visual_service
 
-    # Get visual vector
-    service = VisualService(data_dir=os.getenv("DATA_DIR", "/app/data"))
-    vector_data = service.load_vector(current_user.id)
+    # Get visual vector (off the event loop: may load the models, reads the disk)
+    vector_data = await asyncio.to_thread(lambda: get_visual_service().load_vector(current_user.id))
 
     # Get calibration ratings from DB
     from db_models import CalibrationRating, PsychometricResponse
-    ratings = db.query(CalibrationRating).filter(
-        CalibrationRating.user_id == current_user.id
-    ).all()
+    ratings = (await db.scalars(
+        select(CalibrationRating).where(CalibrationRating.user_id == current_user.id)
+    )).all()
 
-    psychometric = db.query(PsychometricResponse).filter(
-        PsychometricResponse.user_id == current_user.id
-    ).all()
+    psychometric = (await db.scalars(
+        select(PsychometricResponse).where(PsychometricResponse.user_id == current_user.id)
+    )).all()
 
     # Build complete profile
     profile = {
@@ -376,6 +631,10 @@ async def download_profile(
 
 # ==================== CALIBRATION IMAGE SETUP ====================
 
+def _catalog_size(calibration_dir: Path) -> int:
+    return len(get_image_catalog(calibration_dir))
+
+
 @app.post("/api/setup/download-images")
 async def download_calibration_images(
     current_user: User = Depends(get_current_user)
@@ -387,10 +646,10 @@ async def download_calibration_images(
     calibration_dir = DATA_DIR / "global_calibration"
     calibration_dir.mkdir(parents=True, exist_ok=True)
 
-    # Check if images already exist
-    existing = list(calibration_dir.glob("*.jpg"))
-    if len(existing) >= 10:
-        return {"status": "ready", "message": "Images already downloaded", "count": len(existing)}
+    # Check if images already exist (a first scan or rescan hashes every image)
+    existing = await run_in_threadpool(_catalog_size, calibration_dir)
+    if existing >= 10:
+        return {"status": "ready", "message": "Images already downloaded", "count": existing}
 
     # Unsplash portrait URLs (5 male, 5 female - curated for quality)
     portraits = [
@@ -446,8 +705,8 @@ async def check_setup_status():
     if not calibration_dir.exists():
         return {"ready": False, "count": 0}
 
-    images = list(calibration_dir.glob("*.jpg"))
-    return {"ready": len(images) >= 10, "count": len(images)}
+    count = await run_in_threadpool(_catalog_size, calibration_dir)
+    return {"ready": count >= 10, "count": count}
 
 
 # ==================== SPA CATCH-ALL (must be last) ====================
@@ -0,0 +1,246 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) shared by every latency histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Exposition format served by /api/metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _HistogramChild:
+    """One label combination of a Histogram."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative bucket counts (the last one is +Inf) and the sum."""
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class Histogram:
+    """Latency histogram with fixed buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[Tuple[str, ...], _HistogramChild] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values) -> _HistogramChild:
+        """The child for these label values (created on first use)."""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, _HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self) -> List[str]:
+        lines = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, child in sorted(self._children.items()):
+            cumulative, total = child.snapshot()
+            for bound, count in zip(bounds, cumulative):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative[-1]}")
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time (skipped when it returns None)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], Optional[float]]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def samples(self) -> List[str]:
+        value = self.read()
+        return [] if value is None else [f"{self.name} {_format_value(value)}"]
+
+
+class CallbackCounter(Gauge):
+    """Monotonic total read from a callback at scrape time."""
+
+    kind = "counter"
+
+
+class Registry:
+    """The metrics served by /api/metrics, in registration order."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, documentation, read))
+
+    def counter(self, name: str, documentation: str, read: Callable[[], Optional[float]]) -> CallbackCounter:
+        return self.register(CallbackCounter(name, documentation, read))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception:
+                # A failing gauge callback shouldn't take the whole scrape down
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ("method", "route", "status")
+)
+CALIBRATION_STAGE_SECONDS = REGISTRY.histogram(
+    "calibration_stage_duration_seconds",
+    "Time spent in each calibration stage (decode, transform, backbone, aggregation, learner, save).",
+    ("stage",)
+)
+DB_SESSION_SECONDS = REGISTRY.histogram(
+    "db_session_duration_seconds",
+    "Lifetime of request-scoped database sessions."
+)
+
+
+def calibration_stage(stage: str):
+    """Context manager timing one calibration stage."""
+    return CALIBRATION_STAGE_SECONDS.labels(stage).time()
+
+
+def process_rss_bytes() -> Optional[float]:
+    """Current resident set size, from /proc (None where that isn't available)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return float(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+REGISTRY.gauge("process_resident_memory_bytes", "Resident memory size in bytes.", process_rss_bytes)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording HTTP_REQUEST_SECONDS for every HTTP request.
+
+    Requests are labelled with the matched route template (``/api/matches``,
+    ``/api/admin/profiles/{user_id}``) rather than the raw path, so the
+    number of series stays bounded. Requests no route matched are labelled
+    ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1 @@
+# One-off schema migrations (python -m migrations.<name>)
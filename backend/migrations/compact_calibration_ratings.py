@@ -0,0 +1,107 @@
+"""Compact calibration_ratings to one SMALLINT rating per (user_id, image_id).
+
+Before this migration every submission appended rows, with the rating as
+VARCHAR(1). The table is rebuilt with the current schema, keeping the
+latest rating for each (user, image), the one the app already used. It
+then gets the unique index that the rating upserts rely on. Run it once
+per database, before starting the new app version, with writers stopped:
+
+    cd backend
+    python -m migrations.compact_calibration_ratings --dry-run
+    python -m migrations.compact_calibration_ratings
+
+It runs in one transaction. Re-running on a compacted table does nothing.
+"""
+import argparse
+import json
+import logging
+from typing import Dict
+
+from sqlalchemy import MetaData, SmallInteger, cast, func, inspect, insert, select, text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "calibration_ratings"
+COMPACT_TABLE = "calibration_ratings_compact"
+UNIQUE_INDEX = "ix_calibration_ratings_user_image"
+
+
+def is_compacted(engine: Engine) -> bool:
+    """Whether calibration_ratings is missing (create_all makes it) or already compacted."""
+    inspector = inspect(engine)
+    if not inspector.has_table(TABLE):
+        return True
+    return any(index["name"] == UNIQUE_INDEX for index in inspector.get_indexes(TABLE))
+
+
+def compact(engine: Engine, dry_run: bool = False) -> Dict:
+    """Rebuild calibration_ratings without duplicates.
+
+    Args:
+        engine: Sync engine of the app database
+        dry_run: Only count what would be removed
+
+    Returns:
+        Row counts before and after, and whether anything was changed
+    """
+    from db_models import CalibrationRating
+
+    if is_compacted(engine):
+        return {"migrated": False, "reason": "already compacted"}
+
+    old = MetaData()
+    old.reflect(bind=engine, only=[TABLE])
+    source = old.tables[TABLE]
+    target = CalibrationRating.__table__.to_metadata(MetaData(), name=COMPACT_TABLE)
+
+    # Latest rating per (user, image); ties broken by id as the app did
+    ranked = select(
+        source.c.id, source.c.user_id, source.c.image_id, source.c.rating, source.c.created_at,
+        func.row_number().over(
+            partition_by=(source.c.user_id, source.c.image_id),
+            order_by=(source.c.created_at.desc(), source.c.id.desc())
+        ).label("position")
+    ).subquery()
+    latest = select(
+        ranked.c.id, ranked.c.user_id, ranked.c.image_id,
+        cast(ranked.c.rating, SmallInteger), ranked.c.created_at
+    ).where(ranked.c.position == 1)
+
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"LOCK TABLE {TABLE} IN EXCLUSIVE MODE"))
+        rows_before = conn.scalar(select(func.count()).select_from(source))
+        rows_after = conn.scalar(select(func.count()).select_from(latest.subquery()))
+        report = {"migrated": not dry_run, "rows_before": rows_before, "rows_after": rows_after}
+        if dry_run:
+            return report
+
+        target.create(conn)
+        conn.execute(insert(target).from_select(
+            ["id", "user_id", "image_id", "rating", "created_at"], latest
+        ))
+        source.drop(conn)
+        conn.execute(text(f"ALTER TABLE {COMPACT_TABLE} RENAME TO {TABLE}"))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(f"ALTER INDEX {COMPACT_TABLE}_pkey RENAME TO {TABLE}_pkey"))
+
+    logger.info(f"Compacted {TABLE}: {rows_before} -> {rows_after} rows")
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    from database import engine
+    print(json.dumps(compact(engine, dry_run=args.dry_run), indent=2))
+
+
+if __name__ == "__main__":
+    main()
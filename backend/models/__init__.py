@@ -1,4 +1,5 @@
 from .resnet import ResNetBackbone
 from .dynamic_maml import DynamicLearner
+from .quantized import quantize_backbone
 
-__all__ = ["ResNetBackbone", "DynamicLearner"]
+__all__ = ["ResNetBackbone", "DynamicLearner", "quantize_backbone"]
@@ -62,3 +62,15 @@ class DynamicLearner(nn.Module):
         weight_num = self.in_dim
         # Return just the weights portion as the user's embedding
         return params[0, :weight_num]
+
+    def get_batch_user_weights(self, aggregated_features: torch.Tensor) -> torch.Tensor:
+        """get_user_weights for many users in one generator pass.
+
+        Args:
+            aggregated_features: Aggregated calibration features (batch, 512)
+
+        Returns:
+            Weight vectors (batch, 512), one per user
+        """
+        params = self.generator(aggregated_features)
+        return params[:, :self.in_dim]
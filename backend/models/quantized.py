@@ -0,0 +1,40 @@
+import copy
+from typing import Iterable
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+
+def quantize_backbone(backbone: nn.Module, calibration_batches: Iterable[torch.Tensor]) -> nn.Module:
+    """Static post-training INT8 quantization of a feature backbone (CPU only).
+
+    Uses FX graph mode so residual adds in the ResNet blocks are handled
+    without a hand-written quantizable copy of the model. Activation ranges
+    are observed on ``calibration_batches``, which should be real,
+    preprocessed images representative of production inputs.
+
+    Args:
+        backbone: Float backbone in eval mode (left unmodified)
+        calibration_batches: Iterable of (batch, 3, 224, 224) tensors
+
+    Returns:
+        Quantized module with the same (batch, 512) float output
+
+    Raises:
+        ValueError: If no calibration data was provided
+    """
+    model = copy.deepcopy(backbone).cpu().eval()
+    qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+    example_inputs = (torch.zeros(1, 3, 224, 224),)
+
+    prepared = prepare_fx(model, qconfig_mapping, example_inputs)
+    seen = 0
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch.cpu())
+            seen += batch.size(0)
+    if not seen:
+        raise ValueError("INT8 quantization needs at least one calibration image")
+    return convert_fx(prepared).eval()
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds on what one profiling request may ask for
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MAX_CALIBRATIONS = int(os.getenv("PROFILE_MAX_CALIBRATIONS", "20"))
+# Shortest sampling interval accepted
+PROFILE_MIN_INTERVAL_MS = float(os.getenv("PROFILE_MIN_INTERVAL_MS", "5"))
+
+# Innermost Python frames of a thread that is blocked rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusy(Exception):
+    """Raised when another profile is already being captured."""
+
+
+class StackProfile(NamedTuple):
+    collapsed: str  # "frame;frame;... count" lines, root first
+    samples: int
+    seconds: float
+    sampler_ms: float  # time spent taking samples (the profiler's own cost)
+
+
+# One capture at a time, of either kind
+_busy = threading.Lock()
+
+
+@contextmanager
+def _exclusive() -> Iterator[None]:
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already being captured")
+    try:
+        yield
+    finally:
+        _busy.release()
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])})"
+
+
+def _is_idle(frame) -> bool:
+    filename = frame.f_code.co_filename.replace("\\", "/").rsplit("/", 1)[-1]
+    return (filename, frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def sample_stacks(seconds: float, interval_ms: float = 10.0, include_idle: bool = False) -> StackProfile:
+    """Sample every thread's Python stack for ``seconds``.
+
+    Runs on the calling thread, which is left out of the samples. Each
+    sample holds the GIL while it walks the stacks, so its cost grows with
+    the number of threads and the stack depth. Bounding the interval bounds
+    the overhead (see benchmarks/profiling.py).
+
+    Args:
+        seconds: How long to sample (at most PROFILE_MAX_SECONDS)
+        interval_ms: Time between samples (at least PROFILE_MIN_INTERVAL_MS)
+        include_idle: Keep threads blocked on a lock, queue, selector or
+            idle pool worker (dropped by default)
+
+    Returns:
+        Collapsed stacks for flamegraph.pl or speedscope, with the thread
+        name as the root frame
+
+    Raises:
+        ProfilerBusy: If another profile is being captured
+    """
+    seconds = min(max(seconds, 0.0), PROFILE_MAX_SECONDS)
+    interval = max(interval_ms, PROFILE_MIN_INTERVAL_MS) / 1000.0
+    own = threading.get_ident()
+
+    with _exclusive():
+        stacks: Counter = Counter()
+        samples, sampler = 0, 0.0
+        start = time.perf_counter()
+        deadline = start + seconds
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (not include_idle and _is_idle(frame)):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            sampler += time.perf_counter() - tick
+            time.sleep(max(0.0, tick + interval - time.perf_counter()))
+
+        elapsed = time.perf_counter() - start
+    collapsed = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    logger.info(f"Sampled {samples} stacks over {elapsed:.1f}s ({sampler * 1000:.1f} ms sampling)")
+    return StackProfile(collapsed, samples, elapsed, sampler * 1000)
+
+
+class _CalibrationCapture:
+    """Counts the calibrations that start while a torch profile is running."""
+
+    def __init__(self, calibrations: int):
+        self.calibrations = calibrations
+        self.started = 0
+        self.finished = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self.started >= self.calibrations:
+                return False
+            self.started += 1
+            return True
+
+    def exit(self) -> None:
+        with self._lock:
+            self.finished += 1
+            if self.finished >= self.calibrations:
+                self.done.set()
+
+
+_capture: Optional[_CalibrationCapture] = None
+
+
+@contextmanager
+def profiled_calibration(name: str) -> Iterator[None]:
+    """Mark a calibration in torch traces, and count it toward a running capture.
+
+    Does nothing unless a capture is running.
+    """
+    capture = _capture
+    if capture is None:
+        yield
+        return
+
+    counted = capture.enter()
+    try:
+        with record_function(name):
+            yield
+    finally:
+        if counted:
+            capture.exit()
+
+
+def _all_threads_profile() -> profile:
+    """CPU profiler covering every thread (the backbone runs on the batching thread)."""
+    try:
+        from torch._C._profiler import _ExperimentalConfig
+        return profile(
+            activities=[ProfilerActivity.CPU],
+            experimental_config=_ExperimentalConfig(profile_all_threads=True)
+        )
+    except (ImportError, TypeError):
+        logger.warning(f"torch {torch.__version__} can't profile all threads; tracing the calibration threads only")
+        return profile(activities=[ProfilerActivity.CPU])
+
+
+def capture_calibrations(calibrations: int = 1, timeout: float = 60.0) -> Dict:
+    """Run torch.profiler over the next ``calibrations`` calibrations.
+
+    Blocks until they have finished or ``timeout`` seconds have passed.
+    Every thread is traced while the profiler runs, so the batched backbone
+    forwards and any concurrent calibrations appear too. Calibrations are
+    ``calibrate_user`` / ``update_calibration`` ranges.
+
+    Args:
+        calibrations: Calibrations to wait for (at most PROFILE_MAX_CALIBRATIONS)
+        timeout: Longest wait in seconds (at most PROFILE_MAX_SECONDS)
+
+    Returns:
+        Chrome trace JSON (chrome://tracing, Perfetto); ``otherData`` holds
+        how many calibrations were captured and whether the wait timed out
+
+    Raises:
+        ProfilerBusy: If another profile is being captured
+    """
+    global _capture
+
+    calibrations = min(max(calibrations, 1), PROFILE_MAX_CALIBRATIONS)
+    timeout = min(max(timeout, 0.0), PROFILE_MAX_SECONDS)
+
+    with _exclusive():
+        capture = _CalibrationCapture(calibrations)
+        profiler = _all_threads_profile()
+        profiler.start()
+        _capture = capture
+        try:
+            timed_out = not capture.done.wait(timeout)
+        finally:
+            _capture = None
+            profiler.stop()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            profiler.export_chrome_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+
+    trace.setdefault("otherData", {}).update({
+        "calibrations": capture.finished,
+        "requested_calibrations": calibrations,
+        "timed_out": timed_out
+    })
+    logger.info(f"Captured torch trace of {capture.finished} calibration(s), timed_out={timed_out}")
+    return trace
@@ -1,5 +1,7 @@
 from .auth import router as auth_router
 from .calibration import router as calibration_router
+from .candidates import router as candidates_router
+from .matches import router as matches_router
 from .psychometric import router as psychometric_router
 
-__all__ = ["auth_router", "calibration_router", "psychometric_router"]
+__all__ = ["auth_router", "calibration_router", "candidates_router", "matches_router", "psychometric_router"]
@@ -2,14 +2,15 @@ import uuid
 from datetime import timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from db_models import User
 from schemas import UserCreate, UserLogin, UserResponse, Token
 from auth import (
-    get_password_hash,
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
@@ -19,10 +20,10 @@ router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
 
 @router.post("/register", response_model=Token)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user."""
     # Check if email already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -30,26 +31,31 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Check if username already exists
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
+    existing_username = await db.scalar(select(User.id).where(User.username == user_data.username))
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
 
+    # Hash on the password pool, off the event loop. Give the connection back
+    # first, so sign-ins waiting for the pool don't exhaust the DB pool.
+    await db.close()
+    hashed_password = await get_password_hash_async(user_data.password)
+
     # Create new user
     new_user = User(
         id=str(uuid.uuid4()),
         email=user_data.email,
         username=user_data.username,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=hashed_password,
         gender=user_data.gender,
         preference_target=user_data.preference_target
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # Create access token
     access_token = create_access_token(
@@ -74,11 +80,14 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-async def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login an existing user."""
-    user = db.query(User).filter(User.email == credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == credentials.email))
+    # The loaded user stays usable; the connection goes back to the pool
+    # while the password is verified
+    await db.close()
 
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not user or not await verify_password_async(credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
@@ -1,100 +1,139 @@
 import os
 from pathlib import Path
+import zlib
+from typing import Dict, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from db_models import User, CalibrationRating
+from database import get_async_db
+from db_models import User, CalibrationRating, rating_upserts
 from schemas import (
     CalibrationSubmission,
     CalibrationImagesResponse,
     CalibrationImage,
+    NextCalibrationImagesResponse,
+    SelectedCalibrationImage,
     VisualVectorResponse
 )
 from auth import get_current_user
+from executors import BoundedExecutor, PoolSaturated
 from services import VisualService
+from services.image_catalog import get_image_catalog
+from services.image_derivatives import DerivativeCache
 
 router = APIRouter(prefix="/api/calibration", tags=["calibration"])
 
 # Initialize VisualService (lazy loading in production)
 DATA_DIR = os.getenv("DATA_DIR", "/app/data")
 
+# Calibration is CPU-heavy; run it off the event loop with bounded queueing
+calibration_executor = BoundedExecutor(
+    "calibration",
+    max_workers=int(os.getenv("CALIBRATION_WORKERS", "2")),
+    max_queue=int(os.getenv("CALIBRATION_QUEUE", "8")),
+    retry_after=int(os.getenv("CALIBRATION_RETRY_AFTER", "5"))
+)
+
+# Calibration images are served as resized, immutable derivatives
+CALIBRATION_IMAGE_WIDTH = int(os.getenv("CALIBRATION_IMAGE_WIDTH", "640"))
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, max-age=300"
+
+derivative_cache = DerivativeCache(
+    Path(DATA_DIR) / "global_calibration",
+    Path(DATA_DIR) / "derivatives",
+    catalog=get_image_catalog(Path(DATA_DIR) / "global_calibration")
+)
+
 
 def get_visual_service() -> VisualService:
     """Get or create VisualService instance."""
     return VisualService(data_dir=DATA_DIR)
 
 
-@router.get("/images", response_model=CalibrationImagesResponse)
-async def get_calibration_images(
-    count: int = 20,
-    current_user: User = Depends(get_current_user)
-):
-    """Get list of calibration images for rating."""
-    service = get_visual_service()
-    images = service.get_calibration_images(count=count)
+def _calibrate_user(**kwargs) -> Dict:
+    """Run calibration on a pool thread (model loading included)."""
+    return get_visual_service().calibrate_user(**kwargs)
 
-    return CalibrationImagesResponse(
-        images=[CalibrationImage(**img) for img in images],
-        total=len(images)
+
+def _update_calibration(**kwargs) -> Dict:
+    """Apply incremental rating changes on a pool thread."""
+    return get_visual_service().update_calibration(**kwargs)
+
+
+async def _stored_ratings(db: AsyncSession, user_id: str) -> Dict[str, int]:
+    """A user's ratings from the database."""
+    rows = await db.execute(
+        select(CalibrationRating.image_id, CalibrationRating.rating)
+        .where(CalibrationRating.user_id == user_id)
     )
+    return {image_id: int(rating) for image_id, rating in rows}
 
 
-@router.get("/images/{filename}")
-async def get_calibration_image(filename: str):
-    """Serve a calibration image file."""
-    image_path = Path(DATA_DIR) / "global_calibration" / filename
+async def _store_ratings(db: AsyncSession, user_id: str, ratings: Dict[str, int]) -> None:
+    """Insert or replace a user's ratings in one statement (uncommitted)."""
+    rows = [{"user_id": user_id, "image_id": image_id, "rating": rating} for image_id, rating in ratings.items()]
+    for statement in rating_upserts(db.bind.dialect.name, rows):
+        await db.execute(statement)
 
-    if not image_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Image not found"
-        )
 
-    return FileResponse(image_path)
+def _link_derivative(img: Dict) -> None:
+    """Point a local image at a versioned derivative so browsers can cache it forever."""
+    if img.get("version"):
+        img["url"] += f"?w={CALIBRATION_IMAGE_WIDTH}&v={img['version']}"
 
 
-@router.post("/submit", response_model=VisualVectorResponse)
-async def submit_calibration(
-    submission: CalibrationSubmission,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Submit image ratings and generate visual vector."""
-    # Validate ratings
-    if not submission.ratings:
+def _has_stats(user_id: str) -> bool:
+    """Whether the user has calibration stats; reads the disk, so call it on a pool thread."""
+    return get_visual_service().vector_store.has_stats(user_id)
+
+
+def _calibration_images(**kwargs) -> List[Dict]:
+    return get_visual_service().get_calibration_images(**kwargs)
+
+
+def _load_vector(user_id: str) -> Optional[Dict]:
+    return get_visual_service().load_vector(user_id)
+
+
+def _next_images(user_id: str, ratings: Optional[Dict[str, int]], count: int) -> Dict:
+    service = get_visual_service()
+    if ratings is None:
+        stats = service.vector_store.load_stats(user_id)
+        ratings = stats["ratings"] if stats else {}
+    selection = service.next_calibration_images(ratings, count=count, seed=zlib.crc32(user_id.encode()))
+    selection["rated"] = len(ratings)
+    return selection
+
+
+def _validate_ratings(ratings: Dict[str, int]) -> None:
+    if not ratings:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No ratings provided"
         )
 
-    for image_id, rating in submission.ratings.items():
+    for image_id, rating in ratings.items():
         if not 1 <= rating <= 5:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid rating for {image_id}: must be 1-5"
             )
 
-    # Store ratings in database
-    for image_id, rating in submission.ratings.items():
-        db_rating = CalibrationRating(
-            user_id=current_user.id,
-            image_id=image_id,
-            rating=str(rating)
-        )
-        db.add(db_rating)
-
-    # Generate visual vector using VisualService
-    service = get_visual_service()
 
+async def _run_calibration(func, **kwargs) -> Dict:
+    """Run a calibration function on the pool, mapping failures to HTTP errors."""
     try:
-        vector_data = service.calibrate_user(
-            user_id=current_user.id,
-            ratings=submission.ratings,
-            gender=current_user.gender,
-            preference_target=current_user.preference_target
+        return await calibration_executor.run(func, **kwargs)
+    except PoolSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Calibration is busy, please retry shortly",
+            headers={"Retry-After": str(e.retry_after)}
         )
     except ValueError as e:
         raise HTTPException(
@@ -107,9 +146,166 @@ async def submit_calibration(
             detail=f"Calibration failed: {str(e)}"
         )
 
-    # Update user progress
+
+@router.get("/images", response_model=CalibrationImagesResponse)
+async def get_calibration_images(
+    count: int = Query(20, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    stratify: Optional[Literal["gender", "cluster"]] = None,
+    seed: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Get list of calibration images for rating.
+
+    Returns a page in filename order, or with ``stratify`` a random sample
+    spread evenly over that tag's values.
+    """
+    images = await run_in_threadpool(
+        _calibration_images, count=count, offset=offset, stratify=stratify, seed=seed
+    )
+
+    for img in images:
+        _link_derivative(img)
+
+    return CalibrationImagesResponse(
+        images=[CalibrationImage(**img) for img in images],
+        total=len(images)
+    )
+
+
+@router.get("/next", response_model=NextCalibrationImagesResponse)
+async def get_next_images(
+    count: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """The calibration images the current user should rate next.
+
+    Picks images that represent the feature clusters of the set, skipping
+    ones the user's ratings so far show they will not like (see
+    services/active_selection.py). Rate them with PATCH /ratings and ask
+    again; ``remaining`` reaches 0 when further ratings would add little.
+    """
+    ratings = None
+    if not await run_in_threadpool(_has_stats, current_user.id):
+        ratings = await _stored_ratings(db, current_user.id)
+
+    selection = await run_in_threadpool(_next_images, current_user.id, ratings, count)
+    for img in selection["images"]:
+        _link_derivative(img)
+
+    return NextCalibrationImagesResponse(
+        images=[SelectedCalibrationImage(**img) for img in selection["images"]],
+        rated=selection["rated"],
+        remaining=selection["remaining"],
+        uncertainty=selection["uncertainty"]
+    )
+
+
+@router.get("/images/{filename}")
+async def get_calibration_image(
+    filename: str,
+    request: Request,
+    w: Optional[int] = None,
+    fmt: Optional[str] = None,
+    v: Optional[str] = None
+):
+    """Serve a calibration image, resized and re-encoded when ``w`` is given.
+
+    ``w`` snaps up to a width bucket (never upscaling) and the format is
+    ``fmt`` (webp/jpeg) or negotiated from ``Accept``. Responses carry a
+    strong ETag and honour If-None-Match and Range; when ``v`` matches the
+    image's content hash they are also cacheable as immutable.
+    """
+    source = derivative_cache.source_path(filename)
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    if w is None:
+        derivative = await run_in_threadpool(derivative_cache.original, source)
+    else:
+        if w <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Width must be positive"
+            )
+        image_format = derivative_cache.negotiate_format(fmt, request.headers.get("accept", ""))
+        derivative = await run_in_threadpool(derivative_cache.get, source, w, image_format)
+
+    headers = {
+        "ETag": derivative.etag,
+        "Cache-Control": IMMUTABLE_CACHE if v == derivative.version else REVALIDATE_CACHE
+    }
+    if w is not None and fmt is None:
+        headers["Vary"] = "Accept"
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if derivative.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(derivative.path, media_type=derivative.media_type, headers=headers)
+
+
+@router.post("/submit", response_model=VisualVectorResponse)
+async def submit_calibration(
+    submission: CalibrationSubmission,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Submit image ratings and generate visual vector."""
+    _validate_ratings(submission.ratings)
+
+    # Generate visual vector using VisualService (on the calibration pool)
+    vector_data = await _run_calibration(
+        _calibrate_user,
+        user_id=current_user.id,
+        ratings=submission.ratings,
+        gender=current_user.gender,
+        preference_target=current_user.preference_target
+    )
+
+    # Store ratings and update user progress (after calibration, so no
+    # transaction is held open while it runs)
+    await _store_ratings(db, current_user.id, submission.ratings)
     current_user.calibration_complete = True
-    db.commit()
+    await db.commit()
+
+    return vector_data
+
+
+@router.patch("/ratings", response_model=VisualVectorResponse)
+async def update_ratings(
+    submission: CalibrationSubmission,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Add or change a few ratings and update the visual vector incrementally.
+
+    Only the changed images are processed; the result is the same as
+    resubmitting every rating. Users calibrated before calibration stats
+    were kept are recomputed once from their stored ratings.
+    """
+    _validate_ratings(submission.ratings)
+
+    base_ratings = None
+    if not await run_in_threadpool(_has_stats, current_user.id):
+        base_ratings = await _stored_ratings(db, current_user.id)
+
+    vector_data = await _run_calibration(
+        _update_calibration,
+        user_id=current_user.id,
+        changes=submission.ratings,
+        gender=current_user.gender,
+        preference_target=current_user.preference_target,
+        base_ratings=base_ratings
+    )
+
+    await _store_ratings(db, current_user.id, submission.ratings)
+    current_user.calibration_complete = True
+    await db.commit()
 
     return vector_data
 
@@ -125,8 +321,7 @@ async def get_visual_vector(
             detail="Calibration not yet completed"
         )
 
-    service = get_visual_service()
-    vector = service.load_vector(current_user.id)
+    vector = await run_in_threadpool(_load_vector, current_user.id)
 
     if not vector:
         raise HTTPException(
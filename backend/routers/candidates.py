@@ -0,0 +1,69 @@
+import os
+import threading
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+
+from db_models import User
+from schemas import CandidateScoresResponse, ScoredCandidate
+from auth import get_current_user
+from routers.calibration import get_visual_service
+from services.candidate_scoring import CandidateRegistry
+
+router = APIRouter(prefix="/api/candidates", tags=["candidates"])
+
+DATA_DIR = os.getenv("DATA_DIR", "/app/data")
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> CandidateRegistry:
+    """Get or create the candidate registry (loads the VisualService)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = CandidateRegistry(get_visual_service(), Path(DATA_DIR) / "candidates")
+    return _registry
+
+
+def _top_candidates(user_id: str, name: str, k: int):
+    registry = get_registry()
+    vector = registry.service.load_vector(user_id)
+    if vector is None:
+        return None, None
+    scorer = registry.get(name)
+    if scorer is None:
+        return vector, None
+    return vector, scorer.top_k(vector["self_analysis"]["embedding_vector"], k=k, exclude=[user_id])
+
+
+@router.get("", response_model=CandidateScoresResponse)
+async def get_top_candidates(
+    candidate_set: str = Query("images", alias="set", description="images, or a saved candidate set"),
+    k: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Top-k candidates of a set ranked by the current user's preference model."""
+    if not current_user.calibration_complete:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calibration not yet completed"
+        )
+
+    vector, results = await run_in_threadpool(_top_candidates, current_user.id, candidate_set, k)
+    if vector is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Visual vector not found"
+        )
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown candidate set: {candidate_set}"
+        )
+
+    candidates = [ScoredCandidate(id=candidate_id, score=score) for candidate_id, score in results]
+    return CandidateScoresResponse(set=candidate_set, candidates=candidates, total=len(candidates))
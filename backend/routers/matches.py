@@ -0,0 +1,104 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database import get_async_db
+from db_models import User
+from schemas import MatchCandidate, MatchesResponse
+from auth import get_current_user
+from services.match_index import get_match_index, update_profile_filters
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/matches", tags=["matches"])
+
+DATA_DIR = os.getenv("DATA_DIR", "/app/data")
+
+# Profile and index rewrites after a user edits their match filters; one
+# worker keeps them in commit order and off the committing (event loop) thread
+filter_updates = ThreadPoolExecutor(max_workers=1, thread_name_prefix="match-filters")
+_FILTER_COLUMNS = ("gender", "preference_target")
+
+
+def _update_filters(user_id: str, gender: Optional[str], target: Optional[str]) -> None:
+    try:
+        update_profile_filters(Path(DATA_DIR), user_id, gender, target)
+    except Exception:
+        logger.exception(f"Failed to re-index match filters of {user_id}")
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_filter_changes(session: Session, flush_context) -> None:
+    changed = session.info.setdefault("match_filter_changes", {})
+    for obj in session.dirty:
+        if isinstance(obj, User) and any(inspect(obj).attrs[key].history.has_changes() for key in _FILTER_COLUMNS):
+            changed[obj.id] = (obj.gender, obj.preference_target)
+
+
+@event.listens_for(Session, "after_commit")
+def _reindex_filter_changes(session: Session) -> None:
+    for user_id, (gender, target) in session.info.pop("match_filter_changes", {}).items():
+        filter_updates.submit(_update_filters, user_id, gender, target)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_filter_changes(session: Session) -> None:
+    session.info.pop("match_filter_changes", None)
+
+
+@router.get("", response_model=MatchesResponse)
+async def get_matches(
+    k: int = Query(10, ge=1, le=100),
+    vector: Literal["embedding", "ideal"] = "embedding",
+    mutual: bool = True,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Top-k users whose visual vector is most similar to the current user's.
+
+    With ``mutual`` (the default) only users matching the current user's
+    preference_target, and interested in their gender, are returned.
+    """
+    if not current_user.calibration_complete:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Calibration not yet completed"
+        )
+
+    index = await run_in_threadpool(get_match_index, Path(DATA_DIR))
+    results = await run_in_threadpool(
+        index.match,
+        current_user.id,
+        k=k,
+        kind=vector,
+        gender=current_user.gender,
+        target=current_user.preference_target,
+        mutual=mutual
+    )
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No {vector} vector indexed for this user"
+        )
+
+    usernames = dict((await db.execute(
+        select(User.id, User.username).where(User.id.in_([user_id for user_id, _ in results]))
+    )).all())
+    matches = [
+        MatchCandidate(user_id=user_id, username=usernames.get(user_id), score=score)
+        for user_id, score in results
+    ]
+    return MatchesResponse(
+        vector=vector,
+        mode=index.indexes[vector].stats()["mode"],
+        matches=matches,
+        total=len(matches)
+    )
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from database import get_db
+from database import get_async_db
 from db_models import User, PsychometricResponse
 from schemas import (
     PsychometricQuestion,
@@ -181,7 +182,7 @@ async def get_questions(
 async def submit_answers(
     submission: PsychometricSubmission,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Submit answers to psychometric questions."""
     # Validate all questions are answered
@@ -241,7 +242,7 @@ async def submit_answers(
 
     # Update user progress
     current_user.psychometric_complete = True
-    db.commit()
+    await db.commit()
 
     return PsychometricResultResponse(
         success=True,
@@ -253,15 +254,16 @@ async def submit_answers(
 @router.get("/status")
 async def get_psychometric_status(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get psychometric completion status for current user."""
-    responses = db.query(PsychometricResponse).filter(
-        PsychometricResponse.user_id == current_user.id
-    ).all()
+    answered = await db.scalar(
+        select(func.count()).select_from(PsychometricResponse)
+        .where(PsychometricResponse.user_id == current_user.id)
+    )
 
     return {
         "complete": current_user.psychometric_complete,
-        "questions_answered": len(responses),
+        "questions_answered": answered,
         "total_questions": len(FIXED_FIVE_QUESTIONS)
     }
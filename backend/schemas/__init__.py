@@ -10,8 +10,18 @@ from .calibration import (
     CalibrationSubmission,
     CalibrationImage,
     CalibrationImagesResponse,
+    SelectedCalibrationImage,
+    NextCalibrationImagesResponse,
     VisualVectorResponse
 )
+from .candidates import (
+    ScoredCandidate,
+    CandidateScoresResponse
+)
+from .matches import (
+    MatchCandidate,
+    MatchesResponse
+)
 from .psychometric import (
     QuestionType,
     QuestionOption,
@@ -32,7 +42,13 @@ __all__ = [
     "CalibrationSubmission",
     "CalibrationImage",
     "CalibrationImagesResponse",
+    "SelectedCalibrationImage",
+    "NextCalibrationImagesResponse",
     "VisualVectorResponse",
+    "ScoredCandidate",
+    "CandidateScoresResponse",
+    "MatchCandidate",
+    "MatchesResponse",
     "QuestionType",
     "QuestionOption",
     "PsychometricQuestion",
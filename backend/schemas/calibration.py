@@ -22,6 +22,10 @@ class CalibrationImage(BaseModel):
     id: str
     filename: str
     url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    gender: Optional[str] = None
+    cluster: Optional[int] = None
 
 
 class CalibrationImagesResponse(BaseModel):
@@ -30,6 +34,20 @@ class CalibrationImagesResponse(BaseModel):
     total: int
 
 
+class SelectedCalibrationImage(CalibrationImage):
+    """Calibration image picked for a user, with the model's current estimate."""
+    predicted_rating: float
+    uncertainty: float
+
+
+class NextCalibrationImagesResponse(BaseModel):
+    """Schema for the next images a user should rate."""
+    images: List[SelectedCalibrationImage]
+    rated: int
+    remaining: int = Field(..., description="Unrated images still worth rating; 0 when calibration can stop")
+    uncertainty: float = Field(..., description="Mean rating std over the remaining images")
+
+
 class VisualVectorMeta(BaseModel):
     """Metadata section of visual vector."""
     user_id: str
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class ScoredCandidate(BaseModel):
+    """A candidate and the user's predicted preference score for it."""
+    id: str
+    score: float
+
+
+class CandidateScoresResponse(BaseModel):
+    """Top-k candidates of a set for the current user."""
+    set: str
+    candidates: List[ScoredCandidate]
+    total: int
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class MatchCandidate(BaseModel):
+    """A matched user and their cosine similarity to the searcher."""
+    user_id: str
+    username: Optional[str] = None
+    score: float
+
+
+class MatchesResponse(BaseModel):
+    """Top-k matches for the current user."""
+    vector: str
+    mode: str
+    matches: List[MatchCandidate]
+    total: int
@@ -1,3 +1,10 @@
-from .visual_service import VisualService
-
 __all__ = ["VisualService"]
+
+
+def __getattr__(name):
+    # Imported on first use so torch-free modules (e.g. services.numpy_learner,
+    # services.vector_store) can be used in processes without torch
+    if name == "VisualService":
+        from .visual_service import VisualService
+        return VisualService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
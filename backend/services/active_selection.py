@@ -0,0 +1,172 @@
+import os
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from services.calibration_stats import LIKED_MIN_RATING
+from services.candidate_scoring import CandidateSet
+
+# Feature clusters the selection is stratified over (when images carry no cluster tags)
+ACTIVE_CLUSTERS = int(os.getenv("ACTIVE_CLUSTERS", "32"))
+# Rating noise variance assumed by the preference model (ratings scaled to [-1, 1])
+ACTIVE_NOISE = float(os.getenv("ACTIVE_NOISE", "0.3"))
+# Skip images predicted this many stds below the liked threshold
+ACTIVE_SKIP_STD = float(os.getenv("ACTIVE_SKIP_STD", "0.5"))
+
+# LIKED_MIN_RATING on the scaled rating (rating - 3) / 2, halfway to the star below
+_LIKED_THRESHOLD = (LIKED_MIN_RATING - 0.5 - 3) / 2
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, seed: int = 0, iterations: int = 20) -> np.ndarray:
+    """Cluster unit-norm rows by cosine similarity.
+
+    Returns:
+        Cluster label per row (int64)
+    """
+    k = min(k, len(vectors))
+    if k <= 0:
+        return np.zeros(len(vectors), dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    labels = np.zeros(len(vectors), dtype=np.int64)
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / (np.linalg.norm(centroid) + 1e-12)
+    return labels
+
+
+class Selection(NamedTuple):
+    id: str
+    predicted_rating: float
+    uncertainty: float
+
+
+class NextImages(NamedTuple):
+    picks: List[Selection]
+    remaining: int  # unrated images still worth rating
+    uncertainty: float  # mean rating std over them (1-5 scale)
+
+
+class ActiveSelector:
+    """Picks the calibration images a user should rate next.
+
+    The ideal vector is the centroid of the images a user liked, so the
+    ratings should be a representative sample of the liked images, and
+    ratings of images the user will not like are wasted. Two things
+    follow:
+
+    - Diversity. Images are visited in a stratified order over feature
+      clusters: every prefix holds each cluster in proportion to its size,
+      with near-duplicates spread apart.
+    - Uncertainty. Ratings are modelled as a Bayesian linear function of
+      the centered, unit-norm backbone features, which is a Gaussian
+      process with a linear kernel fitted to the ratings so far. Images
+      predicted more than ACTIVE_SKIP_STD stds below the liked threshold
+      are skipped. Images the model cannot yet tell apart are still shown.
+
+    The order depends on a seed, so users do not all start on the same
+    images. The selection stops when every unrated image is confidently
+    not liked.
+    """
+
+    def __init__(
+        self,
+        candidates: CandidateSet,
+        clusters: Optional[Sequence[Optional[int]]] = None,
+        noise: float = ACTIVE_NOISE,
+        skip_std: float = ACTIVE_SKIP_STD,
+        n_clusters: int = ACTIVE_CLUSTERS
+    ):
+        """Prepare a selector over a candidate set (usually the calibration images).
+
+        Args:
+            candidates: Image ids and backbone features
+            clusters: Cluster label per image; when missing (or partly
+                missing) the features are clustered into ``n_clusters``
+            noise: Rating noise variance assumed by the model
+            skip_std: Margin, in stds, below the liked threshold for skipping
+            n_clusters: Clusters to stratify over without tags
+        """
+        features = np.asarray(candidates.features, dtype=np.float32)
+        centered = features - features.mean(axis=0) if len(features) else features
+        self.unit = centered / (np.linalg.norm(centered, axis=1, keepdims=True) + 1e-12)
+        self.ids = candidates.ids
+        self.version = candidates.version
+        self.noise = noise
+        self.skip_std = skip_std
+        self._rows = {image_id: row for row, image_id in enumerate(self.ids.tolist())}
+
+        if clusters is None or any(label is None for label in clusters):
+            labels = spherical_kmeans(self.unit, n_clusters)
+        else:
+            labels = np.unique(np.asarray(clusters), return_inverse=True)[1].astype(np.int64)
+        self.clusters = labels
+        self._sizes = np.bincount(labels) if len(labels) else np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def order(self, seed: int = 0) -> np.ndarray:
+        """Rows in stratified order: member j of a cluster of size n sits at
+        (j + u) / n, with a random offset u per cluster and a random member order."""
+        rng = np.random.default_rng(seed)
+        keys = rng.random(len(self.unit))
+        by_cluster = np.lexsort((keys, self.clusters))
+        starts = np.concatenate([[0], np.cumsum(self._sizes)[:-1]])
+        rank = np.empty(len(self.unit), dtype=np.int64)
+        rank[by_cluster] = np.arange(len(self.unit)) - starts[self.clusters[by_cluster]]
+        offsets = rng.random(len(self._sizes))
+        position = (rank + offsets[self.clusters]) / self._sizes[self.clusters]
+        return np.argsort(position, kind="stable")
+
+    def _posterior(self, ratings: Dict[str, int]):
+        """Rated rows, and the posterior mean and variance of every image's scaled rating."""
+        known = [(self._rows[i], r) for i, r in ratings.items() if i in self._rows]
+        rows = np.array([row for row, _ in known], dtype=np.int64)
+        if not len(rows):
+            return rows, np.zeros(len(self.unit)), np.ones(len(self.unit))
+        targets = np.array([(r - 3) / 2.0 for _, r in known], dtype=np.float64)
+        rated = self.unit[rows].astype(np.float64)
+        kernel = rated @ rated.T + self.noise * np.eye(len(rows))
+        cross = self.unit @ rated.T  # (n, m)
+        solved = np.linalg.solve(kernel, cross.T).T  # cross @ kernel^-1
+        mean = solved @ targets
+        var = np.maximum(1.0 - np.einsum("ij,ij->i", solved, cross), 0.0)
+        return rows, mean, var
+
+    def select(self, ratings: Dict[str, int], count: int = 1, seed: int = 0) -> NextImages:
+        """The next ``count`` images to rate, in the order they should be shown.
+
+        Args:
+            ratings: The user's ratings so far {image_id: 1-5}; ids not in
+                the set are ignored
+            count: Images to pick
+            seed: Seed of the stratified order (keep it fixed per user)
+
+        Returns:
+            The picks with the model's predicted rating and std (1-5
+            scale), and how many unrated images are still worth rating
+        """
+        rows, mean, var = self._posterior(ratings)
+        z = (mean - _LIKED_THRESHOLD) / np.sqrt(var + self.noise)
+        # Without ratings the prior alone puts every image below the threshold
+        eligible = z >= -self.skip_std if len(rows) else np.ones(len(self.unit), dtype=bool)
+        eligible[rows] = False
+
+        order = self.order(seed)
+        picked = order[eligible[order]][:max(0, count)]
+        picks = [
+            Selection(
+                id=str(self.ids[row]),
+                predicted_rating=float(3 + 2 * mean[row]),
+                uncertainty=float(2 * np.sqrt(var[row]))
+            )
+            for row in picked
+        ]
+        remaining = int(eligible.sum())
+        uncertainty = float(2 * np.sqrt(var[eligible]).mean()) if remaining else 0.0
+        return NextImages(picks=picks, remaining=remaining, uncertainty=uncertainty)
@@ -0,0 +1,186 @@
+import hashlib
+import statistics
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Liked / disliked thresholds used by the preference model
+LIKED_MIN_RATING = 4
+DISLIKED_MAX_RATING = 2
+
+# Fixed-point values below this are summed as int64 (headroom for the sum)
+_INT64_SAFE = 2 ** 62
+
+
+def feature_digest(feature: np.ndarray) -> str:
+    """Short fingerprint of a float32 feature, to detect changed features."""
+    return hashlib.sha1(np.ascontiguousarray(feature, dtype=np.float32).tobytes()).hexdigest()[:16]
+
+
+class CalibrationStats:
+    """Running sufficient statistics of a user's calibration ratings.
+
+    Holds everything calibrate_user derives its vectors from: the
+    rating-weighted feature sum, the weight total, the liked-feature sum
+    and count, and the ratings themselves (for the variance), each with a
+    fingerprint of the feature it was added with. Feature sums
+    are kept as exact integers (each float32 feature scaled by a power of
+    two), so adding, removing or changing a rating is exact and the result
+    does not depend on the order ratings arrived in. Vectors derived from
+    incrementally updated stats are therefore bit-identical to a full
+    recompute.
+
+    Rating weights are ``(rating - 1) / 4``; the integer numerator
+    ``rating - 1`` is accumulated and the division folded into ``aggregated``.
+    """
+
+    def __init__(self, dim: int = 512, model: Optional[str] = None):
+        """Create empty stats.
+
+        Args:
+            dim: Feature dimension
+            model: Identifies the backbone the features came from; stats
+                are only updated incrementally with features of the same model
+        """
+        self.dim = dim
+        self.model = model
+        self.scale = 0  # features are stored as integers x * 2**scale
+        self.weighted_sum = np.zeros(dim, dtype=object)
+        self.liked_sum = np.zeros(dim, dtype=object)
+        self.weight_total = 0
+        self.liked_count = 0
+        self.ratings: Dict[str, int] = {}
+        self.digests: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.ratings)
+
+    def _to_fixed(self, features: np.ndarray) -> np.ndarray:
+        """Exact integer image of float32 features at the current scale,
+        raising the scale (exactly) first if the features need more bits.
+
+        Returns an int64 array when every value fits, else an object array.
+        """
+        values = np.asarray(features, dtype=np.float32).astype(np.float64).reshape(-1, self.dim)
+        if not np.isfinite(values).all():
+            raise ValueError("Feature contains non-finite values")
+
+        nonzero = values[values != 0]
+        if len(nonzero):
+            # float32 has 24 significant bits: x * 2**(24 - exponent) is an integer
+            needed = int(24 - np.frexp(nonzero)[1].min())
+            if needed > self.scale:
+                shift = 1 << (needed - self.scale)
+                self.weighted_sum *= shift
+                self.liked_sum *= shift
+                self.scale = needed
+
+        scaled = np.ldexp(values, self.scale)
+        if not len(nonzero) or np.abs(scaled).max() < _INT64_SAFE:
+            return scaled.astype(np.int64)
+        fixed = np.empty(scaled.shape, dtype=object)
+        fixed.ravel()[:] = [int(v) for v in scaled.ravel().tolist()]
+        return fixed
+
+    def add(self, image_id: str, rating: int, feature: np.ndarray) -> None:
+        """Add (or replace) one image's rating."""
+        self.add_many({image_id: rating}, np.asarray(feature)[None])
+
+    def add_many(self, ratings: Dict[str, int], features: np.ndarray) -> None:
+        """Add (or replace) several ratings; ``features`` rows follow ``ratings`` order."""
+        features = np.asarray(features).reshape(len(ratings), self.dim)
+        for image_id, feature in zip(ratings, features):
+            if image_id in self.ratings:
+                self.remove(image_id, feature)
+
+        fixed = self._to_fixed(features)
+        weights = np.array([rating - 1 for rating in ratings.values()], dtype=np.int64)
+        liked = np.array([rating >= LIKED_MIN_RATING for rating in ratings.values()], dtype=bool)
+
+        # Sum in int64 when no partial sum can overflow, else in Python ints
+        bound = int(np.abs(fixed).max()) * max(int(weights.sum()), int(liked.sum()), 1) if len(fixed) else 0
+        if fixed.dtype != np.int64 or bound >= _INT64_SAFE:
+            fixed, weights = fixed.astype(object), weights.astype(object)
+        self.weighted_sum += (weights[:, None] * fixed).sum(axis=0).astype(object)
+        self.liked_sum += fixed[liked].sum(axis=0).astype(object)
+        self.weight_total += int(weights.sum())
+        self.liked_count += int(liked.sum())
+
+        for image_id, rating, feature in zip(ratings, ratings.values(), features):
+            self.ratings[image_id] = rating
+            self.digests[image_id] = feature_digest(feature)
+
+    def remove(self, image_id: str, feature: np.ndarray) -> None:
+        """Remove one image's rating; ``feature`` must be the one it was added with."""
+        if not self.matches(image_id, feature):
+            raise ValueError(f"Feature for {image_id} differs from the one it was rated with")
+        rating = self.ratings.pop(image_id)
+        del self.digests[image_id]
+        fixed = self._to_fixed(feature)[0].astype(object)
+        self.weighted_sum -= (rating - 1) * fixed
+        self.weight_total -= rating - 1
+        if rating >= LIKED_MIN_RATING:
+            self.liked_sum -= fixed
+            self.liked_count -= 1
+
+    def matches(self, image_id: str, feature: np.ndarray) -> bool:
+        """Whether ``feature`` is the one ``image_id`` was added with."""
+        return self.digests.get(image_id) == feature_digest(feature)
+
+    def _to_float(self, values: np.ndarray) -> np.ndarray:
+        return np.ldexp(values.astype(np.float64), -self.scale)
+
+    def aggregated(self) -> np.ndarray:
+        """Rating-weighted mean feature, shape (1, dim) float32."""
+        weights = self.weight_total / 4.0
+        return (self._to_float(self.weighted_sum) / 4.0 / (weights + 1e-8)).astype(np.float32)[None, :]
+
+    def ideal_vector(self) -> Optional[np.ndarray]:
+        """Centroid of liked images (float32), or None if none are liked."""
+        if not self.liked_count:
+            return None
+        return (self._to_float(self.liked_sum) / self.liked_count).astype(np.float32)
+
+    def liked_ids(self) -> List[str]:
+        return [i for i, r in self.ratings.items() if r >= LIKED_MIN_RATING]
+
+    def disliked_ids(self) -> List[str]:
+        return [i for i, r in self.ratings.items() if r <= DISLIKED_MAX_RATING]
+
+    def confidence(self) -> float:
+        """Calibration confidence from rating variance.
+
+        Higher variance in ratings indicates more decisive preferences,
+        which translates to higher confidence in the calibration.
+        """
+        ratings = list(self.ratings.values())
+        if len(ratings) < 3:
+            return 0.5
+        variance = statistics.variance(ratings)
+        # Normalize: max variance for 1-5 scale is ~4
+        return round(min(variance / 2.0, 1.0), 2)
+
+    def to_dict(self) -> Dict:
+        return {
+            "dim": self.dim,
+            "model": self.model,
+            "scale": self.scale,
+            "weighted_sum": [str(v) for v in self.weighted_sum],
+            "liked_sum": [str(v) for v in self.liked_sum],
+            "weight_total": self.weight_total,
+            "liked_count": self.liked_count,
+            "ratings": self.ratings,
+            "digests": self.digests
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "CalibrationStats":
+        stats = cls(dim=data["dim"], model=data.get("model"))
+        stats.scale = data["scale"]
+        stats.weighted_sum[:] = [int(v) for v in data["weighted_sum"]]
+        stats.liked_sum[:] = [int(v) for v in data["liked_sum"]]
+        stats.weight_total = data["weight_total"]
+        stats.liked_count = data["liked_count"]
+        stats.ratings = {k: int(v) for k, v in data["ratings"].items()}
+        stats.digests = dict(data["digests"])
+        return stats
@@ -0,0 +1,217 @@
+import argparse
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Candidate rows scored per matrix multiply; bounds the score buffer
+# (SCORING_CHUNK_ROWS x users float32) independently of the set size
+SCORING_CHUNK_ROWS = int(os.getenv("SCORING_CHUNK_ROWS", "16384"))
+
+IDS_FILE = "ids.npy"
+FEATURES_FILE = "features.npy"
+
+
+class CandidateSet:
+    """Named candidates with a precomputed float32 feature matrix (n, dim).
+
+    Saved as ``ids.npy`` plus ``features.npy`` in a directory. Loading
+    memory-maps the features, so scoring a set larger than RAM streams it
+    chunk by chunk through the page cache.
+    """
+
+    def __init__(self, ids: Sequence[str], features: np.ndarray, version: Optional[str] = None):
+        features = np.asarray(features)
+        if features.ndim != 2 or len(ids) != len(features):
+            raise ValueError(f"Expected {len(ids)} feature rows, got shape {features.shape}")
+        self.ids = np.asarray(ids, dtype=str)
+        self.features = features if features.dtype == np.float32 else features.astype(np.float32)
+        self.version = version
+        self._rows: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.features.shape[1]
+
+    def rows(self, ids: Iterable[str]) -> np.ndarray:
+        """Row numbers of the given ids (unknown ids are skipped)."""
+        if self._rows is None:
+            self._rows = {candidate_id: row for row, candidate_id in enumerate(self.ids.tolist())}
+        return np.array([self._rows[i] for i in ids if i in self._rows], dtype=np.int64)
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in ((IDS_FILE, self.ids), (FEATURES_FILE, self.features)):
+            tmp = directory / f".{name}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+            os.replace(tmp, directory / name)
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "CandidateSet":
+        directory = Path(directory)
+        features = np.load(directory / FEATURES_FILE, mmap_mode="r" if mmap else None)
+        ids = np.load(directory / IDS_FILE)
+        version = str((directory / FEATURES_FILE).stat().st_mtime_ns)
+        return cls(ids, features, version=version)
+
+
+def _merge_top_k(
+    best_scores: np.ndarray,
+    best_rows: np.ndarray,
+    scores: np.ndarray,
+    offset: int,
+    k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fold one chunk's scores (chunk, users) into the running top-k (users, k)."""
+    if scores.shape[0] > k:
+        top = np.argpartition(-scores, k - 1, axis=0)[:k].T
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[0]), (scores.shape[1], scores.shape[0]))
+    chunk_scores = np.take_along_axis(scores.T, top, axis=1)
+
+    merged_scores = np.concatenate([best_scores, chunk_scores], axis=1)
+    merged_rows = np.concatenate([best_rows, top + offset], axis=1)
+    if merged_scores.shape[1] > k:
+        keep = np.argpartition(-merged_scores, k - 1, axis=1)[:, :k]
+        merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        merged_rows = np.take_along_axis(merged_rows, keep, axis=1)
+    return merged_scores, merged_rows
+
+
+class CandidateScorer:
+    """Ranks a candidate set against users' generated predictor weights.
+
+    A user's ``embedding_vector`` is the weight vector DynamicLearner
+    generates from their calibration (see DynamicLearner.get_user_weights), so a
+    candidate's score is ``features @ embedding`` - gen_forward's output with
+    the user's weights in place of per-input ones. The user's generated bias
+    is the same for every candidate and is left out of the ranking.
+
+    Scores come from one matrix multiply per chunk of ``chunk_rows``
+    candidates, for all requested users at once, and only a running top-k
+    per user is kept between chunks.
+    """
+
+    def __init__(self, candidates: CandidateSet, chunk_rows: int = SCORING_CHUNK_ROWS):
+        self.candidates = candidates
+        self.chunk_rows = max(1, chunk_rows)
+
+    def top_k_many(
+        self,
+        weights: np.ndarray,
+        k: int = 10,
+        exclude: Optional[Iterable[str]] = None
+    ) -> List[List[Tuple[str, float]]]:
+        """Top-k candidates for each row of ``weights`` (users, dim).
+
+        Args:
+            weights: Users' generated weight vectors
+            k: Candidates per user
+            exclude: Candidate ids never returned (for any user)
+
+        Returns:
+            Per user, [(candidate_id, score)] by descending score
+        """
+        weights = np.ascontiguousarray(np.atleast_2d(weights), dtype=np.float32)
+        if weights.shape[1] != self.candidates.dim:
+            raise ValueError(f"Expected {self.candidates.dim}-dim weights, got {weights.shape[1]}")
+
+        features = self.candidates.features
+        k = min(k, len(self.candidates))
+        users = len(weights)
+        best_scores = np.empty((users, 0), dtype=np.float32)
+        best_rows = np.empty((users, 0), dtype=np.int64)
+        if k <= 0:
+            return [[] for _ in range(users)]
+
+        excluded = self.candidates.rows(exclude) if exclude is not None else np.empty(0, dtype=np.int64)
+        weights_t = weights.T.copy()
+        for start in range(0, len(features), self.chunk_rows):
+            chunk = features[start:start + self.chunk_rows]
+            scores = chunk @ weights_t  # (chunk, users)
+            hidden = excluded[(excluded >= start) & (excluded < start + len(chunk))]
+            if len(hidden):
+                scores[hidden - start] = -np.inf
+            best_scores, best_rows = _merge_top_k(best_scores, best_rows, scores, start, k)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        ids = self.candidates.ids
+        return [
+            [(str(ids[row]), float(score)) for row, score in zip(rows, scores) if np.isfinite(score)]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    def top_k(
+        self,
+        weights: np.ndarray,
+        k: int = 10,
+        exclude: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Top-k candidates for one user's weight vector (dim,)."""
+        return self.top_k_many(np.asarray(weights)[None, :], k=k, exclude=exclude)[0]
+
+
+class CandidateRegistry:
+    """Candidate sets available for scoring, by name.
+
+    ``images`` is the calibration images' backbone features
+    (VisualService.calibration_candidates, rebuilt when the images or the
+    backbone change). Any other name is a set saved under
+    ``$DATA_DIR/candidates/<name>/`` with CandidateSet.save, e.g. other
+    users' photo features.
+    """
+
+    def __init__(self, service, candidates_dir: Path, chunk_rows: int = SCORING_CHUNK_ROWS):
+        self.service = service
+        self.candidates_dir = Path(candidates_dir)
+        self.chunk_rows = chunk_rows
+        self._scorers: Dict[str, CandidateScorer] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[CandidateScorer]:
+        """Scorer for a candidate set, or None if there is no such set."""
+        with self._lock:
+            scorer = self._scorers.get(name)
+            if name == "images":
+                candidates = self.service.calibration_candidates()
+                if scorer is None or scorer.candidates is not candidates:
+                    scorer = CandidateScorer(candidates, self.chunk_rows)
+            else:
+                directory = self.candidates_dir / name
+                if "/" in name or name.startswith(".") or not (directory / FEATURES_FILE).exists():
+                    return None
+                version = str((directory / FEATURES_FILE).stat().st_mtime_ns)
+                if scorer is None or scorer.candidates.version != version:
+                    scorer = CandidateScorer(CandidateSet.load(directory), self.chunk_rows)
+            self._scorers[name] = scorer
+            return scorer
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Save a candidate set from a features .npy and an ids file")
+    parser.add_argument("name", help="Set name (directory under $DATA_DIR/candidates)")
+    parser.add_argument("--features", required=True, help=".npy float matrix (n, 512)")
+    parser.add_argument("--ids", required=True, help="Text file with one candidate id per line")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(args.ids) as f:
+        ids = [line.strip() for line in f if line.strip()]
+    candidates = CandidateSet(ids, np.load(args.features, mmap_mode="r"))
+    candidates.save(Path(args.data_dir) / "candidates" / args.name)
+    print(f"Saved {len(candidates)} candidates as '{args.name}' in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
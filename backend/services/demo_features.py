@@ -0,0 +1,58 @@
+import hashlib
+from typing import Sequence
+
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def demo_seed(image_id: str) -> int:
+    """Stable 64-bit seed of an image id (the same in every process, unlike hash())."""
+    return int.from_bytes(hashlib.sha256(image_id.encode("utf-8")).digest()[:8], "little")
+
+
+def _splitmix64(z: np.ndarray) -> np.ndarray:
+    """SplitMix64 output function, in place on a uint64 array of counters."""
+    z *= _GOLDEN
+    z ^= z >> np.uint64(30)
+    z *= _MIX1
+    z ^= z >> np.uint64(27)
+    z *= _MIX2
+    z ^= z >> np.uint64(31)
+    return z
+
+
+def demo_features(image_ids: Sequence[str], dim: int = 512) -> np.ndarray:
+    """Deterministic unit-norm stand-in features for images without a file.
+
+    Each id's vector depends only on the id. It is a standard normal
+    sample normalized to the unit sphere, drawn from a counter-based
+    generator: SplitMix64 over (seed, index), then Box-Muller. The whole
+    batch is generated in a few array operations, and neither NumPy's nor
+    torch's global RNG state is read or changed. Concurrent requests and
+    separate workers therefore get the same vectors.
+
+    Args:
+        image_ids: Image identifiers
+        dim: Feature dimension (even)
+
+    Returns:
+        float32 array of shape (len(image_ids), dim)
+    """
+    if not len(image_ids):
+        return np.empty((0, dim), dtype=np.float32)
+    seeds = np.array([demo_seed(image_id) for image_id in image_ids], dtype=np.uint64)
+    counters = seeds[:, None] + np.arange(1, dim + 1, dtype=np.uint64)[None, :]
+    # Top 24 random bits -> float32 uniform in (0, 1]
+    uniform = ((_splitmix64(counters) >> np.uint64(40)).astype(np.float32) + 1) * np.float32(2.0 ** -24)
+
+    u1, u2 = uniform[:, 0::2], uniform[:, 1::2]
+    radius = np.sqrt(-2 * np.log(u1))
+    angle = np.float32(2 * np.pi) * u2
+    features = np.empty((len(image_ids), dim), dtype=np.float32)
+    features[:, 0::2] = radius * np.cos(angle)
+    features[:, 1::2] = radius * np.sin(angle)
+    features /= np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+    return features
@@ -0,0 +1,267 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or the preprocessing that feeds the backbone
+# changes in a way that makes previously stored features incomparable.
+STORE_SCHEMA = "v2"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Hash a file's contents without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Content-addressed, memory-mapped store of per-image arrays.
+
+    Used for 512-dim backbone feature vectors and, with a different row
+    shape and dtype, for preprocessed image tensors.
+
+    Layout under ``<root>/<version>/``:
+    - ``rows-NNNNN.bin``: raw shards of up to ``rows_per_shard`` rows each,
+      append-only
+    - ``index.json``: content hash -> row, plus a filename -> (size, mtime,
+      hash) cache so unchanged files are not re-hashed on every lookup
+
+    ``version`` identifies the model weights and preprocessing. Rows
+    produced by different weights land in different directories, so swapping
+    ``backbone_weights`` invalidates the store without any explicit purge.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        version: str,
+        dim: int = 512,
+        row_shape: Optional[Tuple[int, ...]] = None,
+        dtype=np.float32,
+        rows_per_shard: int = 65536,
+        hash_lookup: Optional[Callable[[Path], Optional[str]]] = None
+    ):
+        """Open (or create) a store.
+
+        Args:
+            root: Parent directory for all versions
+            version: Model/preprocessing identifier
+            dim: Row length for 1-d rows (feature vectors)
+            row_shape: Shape of each row, overriding ``dim``
+            dtype: Element type of the stored arrays
+            rows_per_shard: Rows per shard file
+            hash_lookup: Known content hash of a path, or None (e.g.
+                ImageCatalog.content_hash); consulted before hashing
+        """
+        self.row_shape = tuple(row_shape) if row_shape else (dim,)
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = int(np.prod(self.row_shape)) * self.dtype.itemsize
+        self.rows_per_shard = rows_per_shard
+        self.hash_lookup = hash_lookup
+        self.version = f"{STORE_SCHEMA}-{version}"
+        self.dir = Path(root) / self.version
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+        self.index_path = self.dir / "index.json"
+        self.lock_path = self.dir / ".lock"
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._files: Dict[str, Dict] = {}
+        self._shards: Dict[int, np.memmap] = {}
+        self._index_mtime_ns = 0
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _file_lock(self):
+        """Serialize writers across threads and worker processes."""
+        with self._lock, open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self) -> None:
+        """(Re)read the index written by any worker, keeping hashes computed
+        locally since the last read."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "r") as f:
+            index = json.load(f)
+        self._rows = index.get("rows", {})
+        self._files = {**index.get("files", {}), **self._files}
+        self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+        self._shards = {}
+
+    def _refresh_if_stale(self) -> None:
+        if self.index_path.exists() and self.index_path.stat().st_mtime_ns != self._index_mtime_ns:
+            self._load_index()
+
+    def _write_index(self) -> None:
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": self.version,
+                "row_shape": list(self.row_shape),
+                "dtype": self.dtype.name,
+                "rows": self._rows,
+                "files": self._files
+            }, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.dir / f"rows-{shard:05d}.bin"
+
+    def _read_row(self, row: int) -> np.ndarray:
+        shard, offset = divmod(row, self.rows_per_shard)
+        view = self._shards.get(shard)
+        if view is None:
+            # Map only the rows the index vouches for in this shard
+            n_rows = min(self.rows_per_shard, len(self._rows) - shard * self.rows_per_shard)
+            view = np.memmap(
+                self._shard_path(shard), dtype=self.dtype, mode="r", shape=(n_rows, *self.row_shape)
+            )
+            self._shards[shard] = view
+        return np.array(view[offset])
+
+    def content_key(self, path: Path) -> str:
+        """Return the content hash of ``path``, reusing the cached hash when
+        the file's size and mtime are unchanged."""
+        path = Path(path)
+        if self.hash_lookup is not None:
+            known = self.hash_lookup(path)
+            if known is not None:
+                return known
+
+        stat = path.stat()
+        cached = self._files.get(path.name)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+
+        key = file_sha256(path)
+        self._files[path.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": key
+        }
+        return key
+
+    def get_many(self, paths: Sequence[Path]) -> Dict[str, np.ndarray]:
+        """Look up stored features.
+
+        Args:
+            paths: Image file paths
+
+        Returns:
+            Dict mapping str(path) to an array of ``row_shape``, for hits only
+        """
+        keys = {str(p): self.content_key(p) for p in paths}
+        if any(key not in self._rows for key in keys.values()):
+            # Another worker may have appended since we last read the index
+            self._refresh_if_stale()
+
+        hits = {}
+        for path, key in keys.items():
+            row = self._rows.get(key)
+            if row is not None:
+                hits[path] = self._read_row(row)
+        return hits
+
+    def put_many(self, paths: Sequence[Path], features: np.ndarray) -> None:
+        """Append rows for the given images, skipping already-stored ones.
+
+        Args:
+            paths: Image file paths, aligned with ``features``
+            features: Array of shape (len(paths), *row_shape)
+        """
+        features = np.ascontiguousarray(features, dtype=self.dtype).reshape(len(paths), *self.row_shape)
+        keys = [self.content_key(p) for p in paths]
+
+        with self._file_lock():
+            self._load_index()
+            by_shard: Dict[int, List[np.ndarray]] = {}
+            first_offset: Dict[int, int] = {}
+            for key, feature in zip(keys, features):
+                if key in self._rows:
+                    continue
+                row = len(self._rows)
+                self._rows[key] = row
+                shard, offset = divmod(row, self.rows_per_shard)
+                first_offset.setdefault(shard, offset)
+                by_shard.setdefault(shard, []).append(feature)
+
+            for shard, rows in by_shard.items():
+                with open(self._shard_path(shard), "ab") as f:
+                    # Drop any tail left by a writer that died before its index update
+                    f.truncate(first_offset[shard] * self.row_bytes)
+                    f.write(np.stack(rows).tobytes())
+            self._write_index()
+            self._index_mtime_ns = self.index_path.stat().st_mtime_ns
+            self._shards = {}
+
+    def build(
+        self,
+        paths: Sequence[Path],
+        extract_fn: Callable[[List[str]], np.ndarray],
+        batch_size: int = 32
+    ) -> int:
+        """Populate the store for every image not already present.
+
+        Args:
+            paths: Image file paths
+            extract_fn: Maps a list of paths to a (batch, *row_shape) array
+            batch_size: Images per backbone forward
+
+        Returns:
+            Number of newly stored images
+        """
+        hits = self.get_many(paths)
+        missing = [Path(p) for p in paths if str(p) not in hits]
+        for start in range(0, len(missing), batch_size):
+            chunk = missing[start:start + batch_size]
+            self.put_many(chunk, extract_fn([str(p) for p in chunk]))
+            logger.info(f"Feature store {self.version}: {start + len(chunk)}/{len(missing)} images")
+        return len(missing)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Build the feature store for the global calibration set offline."""
+    parser = argparse.ArgumentParser(description="Build the calibration feature store")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--backbone-weights", default=None)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from services.visual_service import VisualService
+
+    service = VisualService(data_dir=args.data_dir, backbone_weights=args.backbone_weights)
+    paths = [service.catalog.path(image) for image in service.catalog.images()]
+    added = service.feature_store.build(
+        paths,
+        lambda batch: service.extract_features(batch).cpu().numpy(),
+        batch_size=args.batch_size
+    )
+    print(f"Feature store {service.feature_store.version}: {added} new, {len(service.feature_store)} total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from PIL import Image
+
+from services.feature_store import file_sha256
+
+logger = logging.getLogger(__name__)
+
+# Same set the old "*.[jp][pn][g]" glob picked up in practice
+IMAGE_SUFFIXES = (".jpg", ".png")
+
+CATALOG_FILE = "calibration_catalog.json"
+TAGS_FILE = "calibration_tags.json"
+
+# Filename prefixes the setup download uses ("male_1.jpg", "female_3.jpg")
+GENDER_PREFIXES = ("male", "female")
+
+
+class CatalogImage(NamedTuple):
+    id: str
+    filename: str
+    width: int
+    height: int
+    sha256: str
+    size: int
+    mtime_ns: int
+    gender: Optional[str] = None
+    cluster: Optional[int] = None
+
+
+class _Snapshot(NamedTuple):
+    images: tuple
+    by_id: Dict[str, CatalogImage]
+    by_filename: Dict[str, CatalogImage]
+    strata: Dict[str, Dict[object, List[CatalogImage]]]
+    dir_mtime_ns: int
+    tags_mtime_ns: int
+
+
+class ImageCatalog:
+    """In-memory index of the global calibration images.
+
+    The directory is scanned once; after that a scan only happens when the
+    directory's or the tags file's mtime changes (an image added, removed or
+    replaced by rename), and only new or changed files are opened and
+    hashed. Metadata is persisted next to the directory so a restart does
+    not re-hash either. Lookups, pages and stratified samples touch the
+    filesystem only to stat the directory and the tags file.
+
+    Tags come from ``calibration_tags.json`` ({id: {"gender", "cluster"}});
+    without one, gender falls back to a ``male_``/``female_`` filename prefix.
+    """
+
+    def __init__(self, calibration_dir: Path, index_path: Optional[Path] = None, tags_path: Optional[Path] = None):
+        """Create a catalog (the first scan is lazy).
+
+        Args:
+            calibration_dir: Directory of calibration images
+            index_path: Persisted metadata (default: next to the directory)
+            tags_path: Optional tags file (default: next to the directory)
+        """
+        self.calibration_dir = Path(calibration_dir)
+        self.index_path = Path(index_path) if index_path else self.calibration_dir.parent / CATALOG_FILE
+        self.tags_path = Path(tags_path) if tags_path else self.calibration_dir.parent / TAGS_FILE
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self.scans = 0
+
+    @staticmethod
+    def _mtime_ns(path: Path) -> int:
+        try:
+            return path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if (
+            snapshot is None
+            or snapshot.dir_mtime_ns != self._mtime_ns(self.calibration_dir)
+            or snapshot.tags_mtime_ns != self._mtime_ns(self.tags_path)
+        ):
+            self.refresh()
+            snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rescan the directory if it (or the tags) changed, or when forced.
+
+        Returns:
+            Whether a scan happened
+        """
+        with self._lock:
+            dir_mtime = self._mtime_ns(self.calibration_dir)
+            tags_mtime = self._mtime_ns(self.tags_path)
+            previous = self._snapshot
+            if (
+                not force
+                and previous is not None
+                and previous.dir_mtime_ns == dir_mtime
+                and previous.tags_mtime_ns == tags_mtime
+            ):
+                return False
+
+            start = time.perf_counter()
+            known = dict(previous.by_filename) if previous else self._load_index()
+            images, changed = self._scan(known)
+            if changed or len(images) != len(known):
+                self._write_index(images)
+            images = self._apply_tags(images)
+
+            by_id: Dict[str, CatalogImage] = {}
+            for image in images:
+                # foo.jpg wins over foo.png, as in resolve_image_paths
+                if image.id not in by_id or image.filename.endswith(".jpg"):
+                    by_id[image.id] = image
+            self._snapshot = _Snapshot(
+                images=tuple(images),
+                by_id=by_id,
+                by_filename={image.filename: image for image in images},
+                strata={},
+                dir_mtime_ns=dir_mtime,
+                tags_mtime_ns=tags_mtime
+            )
+            self.scans += 1
+            logger.info(
+                f"Calibration catalog: {len(images)} images ({changed} new or changed) "
+                f"in {(time.perf_counter() - start) * 1000:.1f} ms"
+            )
+            return True
+
+    def _scan(self, known: Dict[str, CatalogImage]):
+        if not self.calibration_dir.exists():
+            return [], 0
+        images, changed = [], 0
+        with os.scandir(self.calibration_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(IMAGE_SUFFIXES) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                cached = known.get(entry.name)
+                if cached and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+                    images.append(cached._replace(gender=None, cluster=None))
+                    continue
+                try:
+                    with Image.open(entry.path) as img:
+                        width, height = img.size
+                except OSError as e:
+                    logger.warning(f"Skipping unreadable calibration image {entry.name}: {e}")
+                    continue
+                images.append(CatalogImage(
+                    id=Path(entry.name).stem,
+                    filename=entry.name,
+                    width=width,
+                    height=height,
+                    sha256=file_sha256(Path(entry.path)),
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns
+                ))
+                changed += 1
+        images.sort(key=lambda image: image.filename)
+        return images, changed
+
+    def _load_index(self) -> Dict[str, CatalogImage]:
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)["images"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return {}
+        return {entry["filename"]: CatalogImage(**entry) for entry in entries}
+
+    def _write_index(self, images: Sequence[CatalogImage]) -> None:
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"images": [image._asdict() for image in images]}, f)
+        os.replace(tmp, self.index_path)
+
+    def _apply_tags(self, images: List[CatalogImage]) -> List[CatalogImage]:
+        tags = {}
+        if self.tags_path.exists():
+            with open(self.tags_path) as f:
+                tags = json.load(f)
+        tagged = []
+        for image in images:
+            image_tags = tags.get(image.id, {})
+            gender = image_tags.get("gender")
+            if gender is None:
+                prefix = image.id.split("_", 1)[0].lower()
+                gender = prefix if prefix in GENDER_PREFIXES else None
+            tagged.append(image._replace(gender=gender, cluster=image_tags.get("cluster")))
+        return tagged
+
+    def set_tags(self, tags: Dict[str, Dict]) -> None:
+        """Merge tags ({id: {"gender": ..., "cluster": ...}}) into the tags file."""
+        existing = {}
+        if self.tags_path.exists():
+            with open(self.tags_path) as f:
+                existing = json.load(f)
+        for image_id, image_tags in tags.items():
+            existing.setdefault(image_id, {}).update(image_tags)
+        tmp = self.tags_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(existing, f, indent=2)
+        os.replace(tmp, self.tags_path)
+        self.refresh(force=True)
+
+    def __len__(self) -> int:
+        return len(self._current().images)
+
+    def images(self) -> Sequence[CatalogImage]:
+        """Every image, sorted by filename."""
+        return self._current().images
+
+    def get(self, image_id: str) -> Optional[CatalogImage]:
+        return self._current().by_id.get(image_id)
+
+    def by_filename(self, filename: str) -> Optional[CatalogImage]:
+        return self._current().by_filename.get(filename)
+
+    def path(self, image: CatalogImage) -> Path:
+        return self.calibration_dir / image.filename
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the set of images or their contents change."""
+        snapshot = self._current()
+        return f"{snapshot.dir_mtime_ns}-{len(snapshot.images)}"
+
+    def content_hash(self, path: Path) -> Optional[str]:
+        """sha256 of a catalogued file, if it is unchanged since it was scanned."""
+        path = Path(path)
+        if path.parent != self.calibration_dir:
+            return None
+        image = self._current().by_filename.get(path.name)
+        if image is None:
+            return None
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        if stat.st_size != image.size or stat.st_mtime_ns != image.mtime_ns:
+            return None
+        return image.sha256
+
+    def page(self, offset: int = 0, count: int = 20) -> Sequence[CatalogImage]:
+        """``count`` images from ``offset`` in filename order."""
+        return self._current().images[max(0, offset):max(0, offset) + max(0, count)]
+
+    def sample(self, count: int = 20, stratify: str = "gender", seed: Optional[int] = None) -> List[CatalogImage]:
+        """Random images spread evenly over the values of a tag.
+
+        Each stratum (tag value, untagged included) gets an equal share,
+        capped at its size; what a small stratum cannot fill goes to the
+        others. Costs O(count + strata), independent of the catalog size.
+
+        Args:
+            count: Images to return
+            stratify: "gender" or "cluster"
+            seed: Seed for a reproducible sample
+
+        Returns:
+            The sample, shuffled so strata interleave
+        """
+        if stratify not in ("gender", "cluster"):
+            raise ValueError(f"Cannot stratify by {stratify}")
+        snapshot = self._current()
+        strata = snapshot.strata.get(stratify)
+        if strata is None:
+            strata = {}
+            for image in snapshot.images:
+                strata.setdefault(getattr(image, stratify), []).append(image)
+            snapshot.strata[stratify] = strata
+
+        keys = sorted(strata, key=str)
+        quota = dict.fromkeys(keys, 0)
+        remaining = min(count, len(snapshot.images))
+        active = keys
+        while remaining and active:
+            share = max(1, remaining // len(active))
+            still_open = []
+            for key in active:
+                take = min(share, len(strata[key]) - quota[key], remaining)
+                quota[key] += take
+                remaining -= take
+                if quota[key] < len(strata[key]):
+                    still_open.append(key)
+            active = still_open
+
+        rng = random.Random(seed)
+        picked = [image for key in keys for image in rng.sample(strata[key], quota[key])]
+        rng.shuffle(picked)
+        return picked
+
+
+_catalogs: Dict[Path, ImageCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_image_catalog(calibration_dir: Path) -> ImageCatalog:
+    """Process-wide ImageCatalog per directory, shared by every caller."""
+    calibration_dir = Path(calibration_dir)
+    with _catalogs_lock:
+        if calibration_dir not in _catalogs:
+            _catalogs[calibration_dir] = ImageCatalog(calibration_dir)
+        return _catalogs[calibration_dir]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Scan the calibration catalog, optionally tagging feature clusters")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--clusters", type=int, default=0, help="k-means clusters over backbone features (0: skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    catalog = get_image_catalog(Path(args.data_dir) / "global_calibration")
+    catalog.refresh(force=True)
+
+    if args.clusters:
+        import numpy as np
+
+        from services.active_selection import spherical_kmeans
+        from services.visual_service import VisualService
+
+        candidates = VisualService(data_dir=args.data_dir).calibration_candidates()
+        vectors = np.asarray(candidates.features, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        labels = spherical_kmeans(vectors, args.clusters, seed=args.seed)
+        catalog.set_tags({image_id: {"cluster": int(label)} for image_id, label in zip(candidates.ids.tolist(), labels)})
+
+    counts: Dict[str, int] = {}
+    for image in catalog.images():
+        key = f"gender={image.gender} cluster={image.cluster}"
+        counts[key] = counts.get(key, 0) + 1
+    print(f"{len(catalog)} calibration images: {json.dumps(counts, indent=2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from services.feature_store import file_sha256
+
+# Widths we are willing to generate; requests snap up to the next bucket so
+# the cache stays small and CDN/browser caches get shared hits
+WIDTH_BUCKETS = (160, 320, 480, 640, 960, 1280)
+
+FORMATS = {
+    "webp": ("image/webp", "WEBP", "webp"),
+    "jpeg": ("image/jpeg", "JPEG", "jpg")
+}
+
+
+class Derivative(NamedTuple):
+    path: Path
+    media_type: str
+    etag: str
+    version: str
+
+
+class DerivativeCache:
+    """Width-bucketed WebP/JPEG variants of calibration images, built once
+    and kept on disk.
+
+    Variants are named after the source's content hash, so replacing a
+    source image can never serve a stale variant, and the hash doubles as
+    a strong ETag and as the ``v`` URL token that makes responses
+    cacheable as immutable.
+    """
+
+    def __init__(self, source_dir: Path, cache_dir: Path, quality: int = 80, catalog=None):
+        self.source_dir = Path(source_dir)
+        self.cache_dir = Path(cache_dir)
+        self.quality = quality
+        # ImageCatalog of source_dir, if any: its hashes are reused
+        self.catalog = catalog
+        # name -> (size, mtime_ns, sha256) so sources aren't re-hashed per request
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+
+    def source_path(self, filename: str) -> Optional[Path]:
+        """Resolve a calibration image, refusing anything outside source_dir."""
+        path = (self.source_dir / filename).resolve()
+        if path.parent != self.source_dir.resolve() or not path.is_file():
+            return None
+        return path
+
+    def version(self, path: Path) -> str:
+        """Short content hash of a source image."""
+        if self.catalog is not None:
+            known = self.catalog.content_hash(path)
+            if known is not None:
+                return known[:16]
+        stat = path.stat()
+        cached = self._hashes.get(path.name)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = file_sha256(path)[:16]
+        self._hashes[path.name] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    @staticmethod
+    def bucket(width: int) -> int:
+        """Snap a requested width up to the nearest bucket."""
+        for bucket in WIDTH_BUCKETS:
+            if width <= bucket:
+                return bucket
+        return WIDTH_BUCKETS[-1]
+
+    @staticmethod
+    def negotiate_format(fmt: Optional[str], accept: str) -> str:
+        """Explicit ``fmt`` wins; otherwise WebP if the client accepts it."""
+        if fmt in FORMATS:
+            return fmt
+        return "webp" if "image/webp" in (accept or "") else "jpeg"
+
+    def original(self, path: Path) -> Derivative:
+        version = self.version(path)
+        media_type = "image/png" if path.suffix.lower() == ".png" else "image/jpeg"
+        return Derivative(path, media_type, f'"{version}"', version)
+
+    def get(self, path: Path, width: int, fmt: str) -> Derivative:
+        """Return the cached variant, generating it on first request.
+
+        Args:
+            path: Source image (from ``source_path``)
+            width: Requested width in pixels (snapped to a bucket, never upscaled)
+            fmt: Key of FORMATS
+
+        Returns:
+            Derivative describing the file to serve
+        """
+        version = self.version(path)
+        width = self.bucket(width)
+        media_type, pil_format, ext = FORMATS[fmt]
+        target = self.cache_dir / f"{path.stem}.{version}.w{width}.{ext}"
+        etag = f'"{version}-w{width}-{fmt}"'
+
+        if not target.exists():
+            self._render(path, target, width, pil_format)
+        return Derivative(target, media_type, etag, version)
+
+    def _render(self, source: Path, target: Path, width: int, pil_format: str) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        img = Image.open(source)
+        # Reduced-scale JPEG decode when the source is much larger than needed
+        img.draft("RGB", (width, width))
+        img = img.convert("RGB")
+        if img.width > width:
+            height = round(img.height * width / img.width)
+            img = img.resize((width, height), Image.LANCZOS)
+
+        if pil_format == "WEBP":
+            options = {"quality": self.quality, "method": 4}
+        else:
+            options = {"quality": self.quality, "optimize": True, "progressive": True}
+
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        img.save(tmp, format=pil_format, **options)
+        # Atomic publish: concurrent renders of the same variant are harmless
+        os.replace(tmp, target)
@@ -0,0 +1,226 @@
+import inspect
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+
+from models import DynamicLearner
+from services.numpy_learner import NumpyLearner
+
+
+class TorchEngine:
+    """Default engine: eager (or TorchScript) torch modules.
+
+    With ``fast_learner`` single-user generator calls (dominated by torch's
+    per-op overhead) run in NumPy; batches stay in torch, where BLAS time
+    dominates and the two are on par.
+    """
+
+    name = "torch"
+
+    def __init__(
+        self,
+        backbone: torch.nn.Module,
+        learner: DynamicLearner,
+        fast_learner: Optional[NumpyLearner] = None
+    ):
+        self.backbone = backbone
+        self.learner = learner
+        self.fast_learner = fast_learner
+
+    def backbone_forward(self, batch: torch.Tensor) -> torch.Tensor:
+        """Map (batch, 3, 224, 224) images to (batch, 512) features."""
+        with torch.no_grad():
+            return self.backbone(batch)
+
+    def user_weights(self, aggregated_features: torch.Tensor) -> torch.Tensor:
+        """DynamicLearner.get_user_weights for a (1, 512) preference signal."""
+        if self.fast_learner is not None:
+            return torch.from_numpy(self.fast_learner.get_user_weights(aggregated_features.cpu().numpy()))
+        with torch.no_grad():
+            return self.learner.get_user_weights(aggregated_features)
+
+    def batch_user_weights(self, aggregated_features: torch.Tensor) -> torch.Tensor:
+        """User weights for (batch, 512) preference signals in one call."""
+        with torch.no_grad():
+            return self.learner.get_batch_user_weights(aggregated_features)
+
+
+class OnnxEngine:
+    """ONNX Runtime engine over exported backbone and generator graphs.
+
+    The sessions themselves work on NumPy arrays (see ``run_backbone`` and
+    ``run_generator``), so processes that only need inference can use them
+    without torch; the tensor methods adapt them to VisualService.
+    """
+
+    name = "onnx"
+
+    def __init__(
+        self,
+        backbone_path: Path,
+        generator_path: Path,
+        in_dim: int = 512,
+        intra_op_threads: Optional[int] = None,
+        fast_learner: Optional[NumpyLearner] = None
+    ):
+        """Create CPU inference sessions.
+
+        Args:
+            backbone_path: Exported ResNetBackbone graph
+            generator_path: Exported DynamicLearner.generator graph
+            in_dim: Feature dimension (weights portion of generator output)
+            intra_op_threads: ORT thread count (default: ORT's choice)
+            fast_learner: NumPy generator for single-user calls
+
+        Raises:
+            ImportError: If onnxruntime is not installed
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        providers = ["CPUExecutionProvider"]
+        self._backbone = ort.InferenceSession(str(backbone_path), options, providers=providers)
+        self._generator = ort.InferenceSession(str(generator_path), options, providers=providers)
+        self.in_dim = in_dim
+        self.fast_learner = fast_learner
+
+    def run_backbone(self, images: np.ndarray) -> np.ndarray:
+        return self._backbone.run(None, {"images": np.ascontiguousarray(images, dtype=np.float32)})[0]
+
+    def run_generator(self, features: np.ndarray) -> np.ndarray:
+        return self._generator.run(None, {"features": np.ascontiguousarray(features, dtype=np.float32)})[0]
+
+    def backbone_forward(self, batch: torch.Tensor) -> torch.Tensor:
+        return torch.from_numpy(self.run_backbone(batch.cpu().numpy()))
+
+    def user_weights(self, aggregated_features: torch.Tensor) -> torch.Tensor:
+        if self.fast_learner is not None:
+            return torch.from_numpy(self.fast_learner.get_user_weights(aggregated_features.cpu().numpy()))
+        params = self.run_generator(aggregated_features.cpu().numpy())
+        return torch.from_numpy(params[0, :self.in_dim])
+
+    def batch_user_weights(self, aggregated_features: torch.Tensor) -> torch.Tensor:
+        params = self.run_generator(aggregated_features.cpu().numpy())
+        return torch.from_numpy(params[:, :self.in_dim])
+
+
+def export_onnx(
+    backbone: torch.nn.Module,
+    learner: DynamicLearner,
+    out_dir: Path,
+    opset_version: int = 17
+) -> dict:
+    """Export the backbone and the learner's generator MLP to ONNX.
+
+    Both graphs get a dynamic batch axis.
+
+    Returns:
+        Manifest entry mapping graph name to file name
+    """
+    # Newer torch defaults to the dynamo exporter; keep the TorchScript one,
+    # which honours dynamic_axes and needs no extra packages
+    export_kwargs = {"opset_version": opset_version}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs["dynamo"] = False
+
+    out_dir = Path(out_dir)
+    with torch.no_grad():
+        torch.onnx.export(
+            backbone.eval(), (torch.zeros(1, 3, 224, 224),), str(out_dir / "backbone.onnx"),
+            input_names=["images"], output_names=["features"],
+            dynamic_axes={"images": {0: "batch"}, "features": {0: "batch"}},
+            **export_kwargs
+        )
+        torch.onnx.export(
+            learner.generator.eval(), (torch.zeros(1, learner.in_dim),), str(out_dir / "generator.onnx"),
+            input_names=["features"], output_names=["params"],
+            dynamic_axes={"features": {0: "batch"}, "params": {0: "batch"}},
+            **export_kwargs
+        )
+    return {"backbone": "backbone.onnx", "generator": "generator.onnx"}
+
+
+def verify_onnx(
+    backbone: torch.nn.Module,
+    learner: DynamicLearner,
+    engine: OnnxEngine,
+    images: Optional[torch.Tensor] = None,
+    atol: float = 1e-3
+) -> dict:
+    """Check ONNX Runtime outputs against torch.
+
+    Args:
+        backbone: Torch backbone the graphs were exported from
+        learner: Torch learner the generator was exported from
+        engine: OnnxEngine over the exported graphs
+        images: Preprocessed images to compare on (random if None)
+        atol: Maximum allowed absolute difference
+
+    Returns:
+        Max absolute differences and minimum cosine similarities
+
+    Raises:
+        RuntimeError: If any output differs by more than ``atol``
+    """
+    if images is None:
+        images = torch.randn(4, 3, 224, 224, generator=torch.Generator().manual_seed(0))
+
+    with torch.no_grad():
+        torch_features = backbone.eval()(images)
+        aggregated = torch_features.mean(dim=0, keepdim=True)
+        torch_weights = learner.eval().get_user_weights(aggregated)
+    onnx_features = engine.backbone_forward(images)
+    onnx_weights = engine.user_weights(aggregated)
+
+    result = {
+        "backbone_max_abs_diff": float((torch_features - onnx_features).abs().max()),
+        "backbone_min_cosine": float(torch.nn.functional.cosine_similarity(torch_features, onnx_features).min()),
+        "user_weights_max_abs_diff": float((torch_weights - onnx_weights).abs().max()),
+        "user_weights_cosine": float(torch.nn.functional.cosine_similarity(torch_weights, onnx_weights, dim=0))
+    }
+    if result["backbone_max_abs_diff"] > atol or result["user_weights_max_abs_diff"] > atol:
+        raise RuntimeError(f"ONNX outputs differ from torch beyond atol={atol}: {result}")
+    return result
+
+
+def verify_numpy_learner(
+    learner: DynamicLearner,
+    fast_learner: NumpyLearner,
+    batch_size: int = 64,
+    atol: float = 1e-4
+) -> dict:
+    """Check the NumPy generator against the torch learner.
+
+    Args:
+        learner: Torch learner the weights were copied from
+        fast_learner: NumpyLearner to check
+        batch_size: Random inputs to compare on
+        atol: Maximum allowed absolute difference
+
+    Returns:
+        Max absolute differences for user weights and gen_forward
+
+    Raises:
+        RuntimeError: If any output differs by more than ``atol``
+    """
+    x = torch.randn(batch_size, learner.in_dim, generator=torch.Generator().manual_seed(0))
+    with torch.no_grad():
+        learner = learner.cpu().eval()
+        torch_weights = learner.get_user_weights(x[:1])
+        torch_batch = learner.get_batch_user_weights(x)
+        torch_out = learner.gen_forward(x)
+
+    result = {
+        "user_weights_max_abs_diff": float(np.abs(fast_learner.get_user_weights(x[:1].numpy()) - torch_weights.numpy()).max()),
+        "batch_user_weights_max_abs_diff": float(np.abs(fast_learner.get_batch_user_weights(x.numpy()) - torch_batch.numpy()).max()),
+        "gen_forward_max_abs_diff": float(np.abs(fast_learner.gen_forward(x.numpy()) - torch_out.numpy()).max())
+    }
+    if max(result.values()) > atol:
+        raise RuntimeError(f"NumPy learner differs from torch beyond atol={atol}: {result}")
+    return result
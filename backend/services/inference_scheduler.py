@@ -0,0 +1,147 @@
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket(value: int) -> int:
+    """Power-of-two histogram bucket (upper bound) for ``value``."""
+    return 1 if value <= 1 else 1 << (value - 1).bit_length()
+
+
+class BatchScheduler:
+    """Dynamic micro-batching in front of a batch model.
+
+    Callers from any thread submit single input tensors; a background worker
+    groups whatever is queued into one forward pass, bounded by
+    ``max_batch_size`` and by ``max_wait_ms`` after the first item of a batch
+    arrives, then hands each output row back to its caller's future.
+    """
+
+    def __init__(
+        self,
+        model: Callable[[torch.Tensor], torch.Tensor],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "backbone"
+    ):
+        """Start the scheduler.
+
+        Args:
+            model: Batch callable mapping (batch, ...) -> (batch, ...)
+            max_batch_size: Largest batch sent to the model
+            max_wait_ms: How long the first queued item waits for company
+            name: Label used for the worker thread
+        """
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: "queue.Queue[Optional[Tuple[torch.Tensor, Future]]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._queue_depths: Counter = Counter()
+        self._batches = 0
+        self._items = 0
+
+        self._thread = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, tensor: torch.Tensor) -> Future:
+        """Queue a single input (without batch dimension) for inference."""
+        future: Future = Future()
+        self._queue.put((tensor, future))
+        return future
+
+    def infer(self, batch: torch.Tensor) -> torch.Tensor:
+        """Run a caller's batch through the shared scheduler and wait.
+
+        The rows may be split across, or merged with, other callers' batches.
+
+        Args:
+            batch: Input tensor of shape (n, ...)
+
+        Returns:
+            Output tensor of shape (n, ...), in input order
+        """
+        futures = [self.submit(tensor) for tensor in batch]
+        return torch.stack([future.result() for future in futures])
+
+    def close(self) -> None:
+        """Stop the worker after the queued items are processed."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self) -> Optional[List[Tuple[torch.Tensor, Future]]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            try:
+                # Drain what is already queued without waiting, then wait
+                # out the remaining budget for late arrivals
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-post the shutdown marker so the loop exits after this batch
+                self._queue.put(None)
+                break
+            items.append(item)
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+
+            depth = self._queue.qsize()
+            tensors, futures = zip(*items)
+            try:
+                with torch.no_grad():
+                    outputs = self.model(torch.stack(tensors))
+            except Exception as exc:
+                logger.exception(f"{self.name} batch of {len(items)} failed")
+                for future in futures:
+                    future.set_exception(exc)
+            else:
+                for future, output in zip(futures, outputs):
+                    future.set_result(output)
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(items)
+                self._batch_sizes[_bucket(len(items))] += 1
+                self._queue_depths[_bucket(depth) if depth else 0] += 1
+
+    def stats(self) -> Dict:
+        """Snapshot of scheduler counters for tuning.
+
+        Histograms are keyed by power-of-two upper bound; queue depth is
+        sampled each time a batch is dispatched.
+        """
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+                "queue_depth_histogram": {str(k): v for k, v in sorted(self._queue_depths.items())}
+            }
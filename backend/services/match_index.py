@@ -0,0 +1,604 @@
+import argparse
+import base64
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.vector_store import VECTOR_FIELDS, get_vector_store
+
+# Below this many users search is an exact matrix-vector product; above it
+# (once the index has been trained) it probes an inverted-file index
+MATCH_ANN_MIN_USERS = int(os.getenv("MATCH_ANN_MIN_USERS", "50000"))
+MATCH_NPROBE = int(os.getenv("MATCH_NPROBE", "16"))
+# Journal records before the index is compacted into a new snapshot
+MATCH_JOURNAL_MAX = int(os.getenv("MATCH_JOURNAL_MAX", "20000"))
+
+# Codes for the mutual gender / preference_target filter. Gender 0 is
+# unspecified; target 0 is "everyone" (or unspecified) and accepts anyone.
+GENDER_CODES = {"male": 1, "female": 2, "other": 3}
+TARGET_CODES = {"male": 1, "female": 2}
+
+VECTOR_KINDS = dict(zip(("embedding", "ideal"), VECTOR_FIELDS))
+
+SNAPSHOT_FILE = "snapshot.npz"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if len(scores) > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class VectorIndex:
+    """Cosine top-k over one kind of user vector.
+
+    Small indexes are searched exactly with one matrix-vector product. Once
+    an index reaches ``ann_min_users`` it trains a spherical k-means coarse
+    quantizer and searches only the ``nprobe`` closest inverted lists (IVF).
+    Rows inserted since the last training are kept in a pending set that is
+    always scanned, so inserts are visible immediately.
+
+    On disk, a directory holds a ``snapshot.npz`` plus an append-only NDJSON
+    journal of upserts. Every process replays new journal lines before
+    searching, so inserts from other workers show up without a reload.
+    Compaction folds the journal into a new snapshot generation.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        dim: int = 512,
+        ann_min_users: int = MATCH_ANN_MIN_USERS,
+        nprobe: int = MATCH_NPROBE,
+        journal_max: int = MATCH_JOURNAL_MAX
+    ):
+        self.root = Path(root)
+        self.dim = dim
+        self.ann_min_users = ann_min_users
+        self.nprobe = nprobe
+        self.journal_max = journal_max
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._reset()
+        self._load_snapshot()
+
+    # ----- state -----
+
+    def _reset(self) -> None:
+        self.generation = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self._vectors = np.empty((0, self.dim), dtype=np.float32)
+        self._gender = np.empty(0, dtype=np.uint8)
+        self._target = np.empty(0, dtype=np.uint8)
+        self._assign = np.empty(0, dtype=np.int32)
+        self._pending = np.empty(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._list_rows = np.empty(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._snapshot_mtime: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _journal_path(self, generation: Optional[int] = None) -> Path:
+        gen = self.generation if generation is None else generation
+        return self.root / f"journal-{gen:06d}.ndjson"
+
+    def _file_lock(self):
+        lock_file = open(self.root / ".lock", "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _ensure_capacity(self, size: int) -> None:
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        new_capacity = max(size, capacity * 2, 1024)
+
+        def grow(array: np.ndarray, fill=0) -> np.ndarray:
+            grown = np.full((new_capacity, *array.shape[1:]), fill, dtype=array.dtype)
+            grown[:capacity] = array
+            return grown
+
+        self._vectors = grow(self._vectors)
+        self._gender = grow(self._gender)
+        self._target = grow(self._target)
+        self._assign = grow(self._assign, -1)
+        self._pending = grow(self._pending, False)
+
+    def _apply(self, user_id: str, vector: np.ndarray, gender: int, target: int) -> None:
+        row = self.rows.get(user_id)
+        if row is None:
+            row = len(self.ids)
+            self._ensure_capacity(row + 1)
+            self.ids.append(user_id)
+            self.rows[user_id] = row
+        self._vectors[row] = vector
+        self._gender[row] = gender
+        self._target[row] = target
+        if self.trained:
+            self._assign[row] = int(np.argmax(self.centroids @ vector))
+            self._pending[row] = True
+
+    # ----- persistence -----
+
+    def _load_snapshot(self) -> None:
+        snapshot = self.root / SNAPSHOT_FILE
+        self._reset()
+        if snapshot.exists():
+            with np.load(snapshot) as data:
+                self.generation = int(data["generation"])
+                ids = [str(i) for i in data["ids"]]
+                n = len(ids)
+                self._ensure_capacity(n)
+                self.ids = ids
+                self.rows = {user_id: row for row, user_id in enumerate(ids)}
+                self._vectors[:n] = data["vectors"]
+                self._gender[:n] = data["gender"]
+                self._target[:n] = data["target"]
+                if "centroids" in data:
+                    self.centroids = data["centroids"]
+                    self.trained_size = int(data["trained_size"])
+                    self._assign[:n] = data["assign"]
+                    self._build_lists()
+            self._snapshot_mtime = snapshot.stat().st_mtime_ns
+        self._replay_journal()
+
+    def _replay_journal(self) -> None:
+        journal = self._journal_path()
+        if not journal.exists():
+            return
+        with open(journal, "rb") as f:
+            f.seek(self._journal_offset)
+            data = f.read()
+        # Only complete lines; a writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            record = json.loads(line)
+            vector = np.frombuffer(base64.b64decode(record["v"]), dtype=np.float32)
+            self._apply(record["id"], vector, record["g"], record["t"])
+            self._journal_records += 1
+        self._journal_offset += end
+
+    def _refresh(self) -> None:
+        """Pick up compactions and journal appends made by other processes."""
+        snapshot = self.root / SNAPSHOT_FILE
+        try:
+            mtime = snapshot.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._snapshot_mtime:
+            self._load_snapshot()
+            return
+        try:
+            if self._journal_path().stat().st_size > self._journal_offset:
+                self._replay_journal()
+        except FileNotFoundError:
+            pass
+
+    def _write_snapshot(self) -> None:
+        n = len(self.ids)
+        arrays = {
+            "generation": np.int64(self.generation + 1),
+            "ids": np.array(self.ids, dtype=str) if n else np.empty(0, dtype="<U1"),
+            "vectors": self._vectors[:n],
+            "gender": self._gender[:n],
+            "target": self._target[:n]
+        }
+        if self.trained:
+            arrays.update(centroids=self.centroids, trained_size=np.int64(self.trained_size), assign=self._assign[:n])
+
+        tmp = self.root / f".{SNAPSHOT_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.root / SNAPSHOT_FILE)
+
+        old_journal = self._journal_path()
+        self.generation += 1
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._snapshot_mtime = (self.root / SNAPSHOT_FILE).stat().st_mtime_ns
+        old_journal.unlink(missing_ok=True)
+
+    def compact(self) -> None:
+        """Fold the journal into a new snapshot, (re)training IVF if due."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        n = len(self.ids)
+        if n >= self.ann_min_users and (not self.trained or n >= 2 * self.trained_size):
+            self.train()
+        elif self.trained:
+            self._pending[:n] = False
+            self._build_lists()
+        self._write_snapshot()
+
+    # ----- writes -----
+
+    def upsert(self, user_id: str, vector: Iterable[float], gender: Optional[str], target: Optional[str]) -> None:
+        """Insert or replace a user's vector (durable once this returns)."""
+        vector = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dim vector, got {vector.shape}")
+        gender_code = GENDER_CODES.get(gender or "", 0)
+        target_code = TARGET_CODES.get(target or "", 0)
+        line = json.dumps({
+            "id": user_id,
+            "g": gender_code,
+            "t": target_code,
+            "v": base64.b64encode(vector.astype(np.float32).tobytes()).decode()
+        }).encode() + b"\n"
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            with open(self._journal_path(), "ab") as f:
+                f.write(line)
+            self._journal_offset += len(line)
+            self._journal_records += 1
+            self._apply(user_id, vector, gender_code, target_code)
+            if self._journal_records >= self.journal_max:
+                self._compact_locked()
+
+    def replace_all(
+        self,
+        user_ids: List[str],
+        vectors: np.ndarray,
+        genders: np.ndarray,
+        targets: np.ndarray,
+        persist: bool = True
+    ) -> None:
+        """Bulk (re)build from arrays, e.g. from the profile store.
+
+        Args:
+            user_ids: One id per row
+            vectors: (n, dim) array; normalized in place when float32
+            genders: (n,) uint8 gender codes (see GENDER_CODES)
+            targets: (n,) uint8 target codes (see TARGET_CODES)
+            persist: Write a snapshot (skipped by in-memory benchmarks)
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for start in range(0, len(vectors), 65536):
+            chunk = vectors[start:start + 65536]
+            chunk /= np.maximum(np.linalg.norm(chunk, axis=1, keepdims=True), 1e-12)
+
+        with self._lock, self._file_lock():
+            self._refresh()
+            generation = self.generation
+            self._reset()
+            self.generation = generation
+            n = len(user_ids)
+            self.ids = list(user_ids)
+            self.rows = {user_id: row for row, user_id in enumerate(self.ids)}
+            self._vectors = vectors
+            self._gender = np.asarray(genders, dtype=np.uint8)
+            self._target = np.asarray(targets, dtype=np.uint8)
+            self._assign = np.full(n, -1, dtype=np.int32)
+            self._pending = np.zeros(n, dtype=bool)
+            if n >= self.ann_min_users:
+                self.train()
+            if persist:
+                self._write_snapshot()
+
+    # ----- IVF -----
+
+    def train(self, nlist: Optional[int] = None, sample: int = 100_000, iterations: int = 10, seed: int = 0) -> None:
+        """Train the coarse quantizer (spherical k-means) and assign all rows."""
+        n = len(self.ids)
+        vectors = self._vectors[:n]
+        nlist = nlist or int(np.clip(2 * np.sqrt(n), 16, 4096))
+        rng = np.random.default_rng(seed)
+
+        train_set = vectors[np.sort(rng.choice(n, size=min(sample, n), replace=False))]
+        centroids = train_set[rng.choice(len(train_set), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = self._nearest(train_set, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train_set)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists from random training points
+            sums[empty] = train_set[rng.choice(len(train_set), size=int(empty.sum()))]
+            centroids = _normalize(sums).astype(np.float32)
+
+        self.centroids = centroids
+        self.trained_size = n
+        self._assign = np.full(len(self._vectors), -1, dtype=np.int32)
+        self._assign[:n] = self._nearest(vectors, centroids)
+        self._pending = np.zeros(len(self._vectors), dtype=bool)
+        self._build_lists()
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk: int = 32768) -> np.ndarray:
+        return np.concatenate([
+            np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+            for start in range(0, len(vectors), chunk)
+        ]).astype(np.int32) if len(vectors) else np.empty(0, dtype=np.int32)
+
+    def _build_lists(self) -> None:
+        """CSR layout of the inverted lists: rows sorted by list id."""
+        n = len(self.ids)
+        assign = self._assign[:n]
+        self._list_rows = np.argsort(assign, kind="stable")
+        self._list_offsets = np.searchsorted(assign[self._list_rows], np.arange(len(self.centroids) + 1))
+
+    # ----- reads -----
+
+    def vector(self, user_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            self._refresh()
+            row = self.rows.get(user_id)
+            return None if row is None else self._vectors[row].copy()
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        gender: Optional[str] = None,
+        target: Optional[str] = None,
+        mutual: bool = True,
+        exclude: Optional[str] = None,
+        exact: Optional[bool] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[str, float]]:
+        """Top-k users by cosine similarity to ``query``.
+
+        Args:
+            query: Query vector (normalized here)
+            k: Number of results
+            gender: Searcher's gender, for the mutual filter
+            target: Searcher's preference_target, for the mutual filter
+            mutual: Only return users the searcher is interested in and who
+                are interested in the searcher's gender
+            exclude: User id to leave out (normally the searcher)
+            exact: Force exact (True) or IVF (False) search; default picks
+                IVF for trained indexes of at least ``ann_min_users``
+            nprobe: Inverted lists to scan (default ``self.nprobe``)
+
+        Returns:
+            [(user_id, score)], best first
+        """
+        # Everything read below is taken under the lock: rebuild() and
+        # snapshot reloads replace these arrays wholesale
+        with self._lock:
+            self._refresh()
+            ids = self.ids
+            n = len(ids)
+            vectors = self._vectors[:n]
+            all_genders = self._gender[:n]
+            all_targets = self._target[:n]
+            use_ivf = self.trained and (not exact if exact is not None else n >= self.ann_min_users)
+            state = (self.centroids, self._list_rows, self._list_offsets, self._pending[:n]) if use_ivf else None
+            exclude_row = self.rows.get(exclude) if exclude is not None else None
+        if n == 0 or k <= 0:
+            return []
+
+        query = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        gender_code = GENDER_CODES.get(gender or "", 0)
+        target_code = TARGET_CODES.get(target or "", 0)
+
+        def allowed(rows: Optional[np.ndarray]) -> np.ndarray:
+            genders = all_genders if rows is None else all_genders[rows]
+            targets = all_targets if rows is None else all_targets[rows]
+            mask = np.ones(len(genders), dtype=bool)
+            if mutual:
+                if target_code:
+                    mask &= genders == target_code
+                mask &= (targets == 0) | (targets == gender_code)
+            if exclude_row is not None:
+                mask &= (np.arange(n) if rows is None else rows) != exclude_row
+            return mask
+
+        if state is None:
+            scores = vectors @ query
+            scores[~allowed(None)] = -np.inf
+            top = _top_k(scores, k)
+            top = top[np.isfinite(scores[top])]
+            return [(ids[row], float(scores[row])) for row in top]
+
+        centroids, list_rows, offsets, pending = state
+        order = np.argsort(-(centroids @ query))
+        pending_rows = np.flatnonzero(pending)
+
+        def candidates(probes: int) -> np.ndarray:
+            rows = np.concatenate([list_rows[offsets[l]:offsets[l + 1]] for l in order[:probes]] + [pending_rows])
+            return np.unique(rows) if len(pending_rows) else rows
+
+        probes = min(nprobe or self.nprobe, len(centroids))
+        rows = candidates(probes)
+        keep = allowed(rows)
+        # A selective filter discards most of each list; probe proportionally
+        # more lists so as many allowed candidates are scored as unfiltered
+        selectivity = keep.mean() if len(keep) else 1.0
+        wanted = min(len(centroids), int(round(probes / max(selectivity, 1e-3))))
+        while wanted > probes or (keep.sum() < k and probes < len(centroids)):
+            probes = max(wanted, min(probes * 2, len(centroids)))
+            wanted = probes
+            rows = candidates(probes)
+            keep = allowed(rows)
+        rows = rows[keep]
+
+        scores = vectors[rows] @ query
+        top = _top_k(scores, k)
+        return [(ids[rows[i]], float(scores[i])) for i in top]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self.ids),
+                "mode": "ivf" if self.trained and len(self.ids) >= self.ann_min_users else "exact",
+                "lists": 0 if self.centroids is None else len(self.centroids),
+                "pending": int(self._pending[:len(self.ids)].sum()),
+                "generation": self.generation,
+                "journal_records": self._journal_records
+            }
+
+
+class MatchIndex:
+    """Embedding- and ideal-vector indexes over all calibrated users."""
+
+    def __init__(self, root: Path, dim: int = 512):
+        self.root = Path(root)
+        self.dim = dim
+        self.indexes = {kind: VectorIndex(self.root / kind, dim) for kind in VECTOR_KINDS}
+
+    def add_profile(self, user_id: str, vector_data: Dict) -> None:
+        """Index a saved p1_visual_vector (called after calibration)."""
+        meta = vector_data.get("meta", {})
+        for kind, (section, field) in VECTOR_KINDS.items():
+            values = vector_data.get(section, {}).get(field) or []
+            if len(values) == self.dim:
+                self.indexes[kind].upsert(user_id, values, meta.get("gender"), meta.get("preference_target"))
+
+    def match(
+        self,
+        user_id: str,
+        k: int = 10,
+        kind: str = "embedding",
+        gender: Optional[str] = None,
+        target: Optional[str] = None,
+        mutual: bool = True
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Users whose ``kind`` vector is closest to this user's.
+
+        Returns:
+            [(user_id, score)], or None if the user is not indexed
+        """
+        index = self.indexes[kind]
+        query = index.vector(user_id)
+        if query is None:
+            return None
+        return index.search(query, k=k, gender=gender, target=target, mutual=mutual, exclude=user_id)
+
+    def rebuild(self, profiles_dir: Path) -> int:
+        """Rebuild both indexes from every profile in the vector store."""
+        store = get_vector_store(profiles_dir)
+        collected = {kind: ([], [], [], []) for kind in VECTOR_KINDS}
+        for user_id in store.user_ids():
+            vector_data = store.load(user_id)
+            if vector_data is None:
+                continue
+            meta = vector_data.get("meta", {})
+            for kind, (section, field) in VECTOR_KINDS.items():
+                values = vector_data.get(section, {}).get(field) or []
+                if len(values) != self.dim:
+                    continue
+                ids, vectors, genders, targets = collected[kind]
+                ids.append(user_id)
+                vectors.append(values)
+                genders.append(GENDER_CODES.get(meta.get("gender") or "", 0))
+                targets.append(TARGET_CODES.get(meta.get("preference_target") or "", 0))
+
+        for kind, (ids, vectors, genders, targets) in collected.items():
+            array = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim)
+            self.indexes[kind].replace_all(ids, array, np.asarray(genders), np.asarray(targets))
+        return len(collected["embedding"][0])
+
+    def stats(self) -> Dict:
+        return {kind: index.stats() for kind, index in self.indexes.items()}
+
+
+_indexes: Dict[Path, MatchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_match_index(data_dir: Path) -> MatchIndex:
+    """Process-wide MatchIndex for a data directory.
+
+    Built from the profile store the first time it is opened (see build_index).
+    """
+    root = Path(data_dir) / "match_index"
+    with _indexes_lock:
+        if root not in _indexes:
+            if not root.exists():
+                build_index(root, Path(data_dir) / "profiles")
+            _indexes[root] = MatchIndex(root)
+        return _indexes[root]
+
+
+def build_index(root: Path, profiles_dir: Path) -> None:
+    """Build a complete index from the profile store, then move it to ``root``.
+
+    The build happens in a scratch directory that is renamed into place, so
+    ``root`` only ever exists complete: a crash mid-build leaves nothing
+    that a restart would mistake for the index. If another process finishes
+    first, its index is kept and this one discarded.
+    """
+    root = Path(root)
+    scratch = root.with_name(f".{root.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.building")
+    try:
+        start = time.perf_counter()
+        users = MatchIndex(scratch).rebuild(profiles_dir)
+        try:
+            os.rename(scratch, root)
+        except OSError:
+            if not root.exists():
+                raise
+            return
+        print(f"Match index built: {users} users in {time.perf_counter() - start:.1f}s")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def update_profile_filters(data_dir: Path, user_id: str, gender: Optional[str], target: Optional[str]) -> bool:
+    """Apply a user's new gender / preference_target to their profile and index rows.
+
+    The mutual filter uses the values saved at calibration time, so call
+    this when a user changes them.
+
+    Returns:
+        Whether the user has a profile (uncalibrated users have nothing to update)
+    """
+    store = get_vector_store(Path(data_dir) / "profiles")
+    if not store.exists(user_id):
+        return False
+    with store.user_lock(user_id):
+        vector_data = store.load(user_id)
+        if vector_data is None:
+            return False
+        meta = vector_data.setdefault("meta", {})
+        meta["gender"] = gender or "unspecified"
+        meta["preference_target"] = target or "unspecified"
+        store.save(user_id, vector_data)
+        get_match_index(data_dir).add_profile(user_id, vector_data)
+    return True
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rebuild the match index from stored profiles")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = MatchIndex(Path(args.data_dir) / "match_index")
+    users = index.rebuild(Path(args.data_dir) / "profiles")
+    print(f"Indexed {users} users in {time.perf_counter() - start:.1f}s: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
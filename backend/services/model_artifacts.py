@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import torch
+
+from models import ResNetBackbone, DynamicLearner, quantize_backbone
+from services.feature_store import file_sha256
+from services.inference_engines import OnnxEngine, export_onnx, verify_numpy_learner, verify_onnx
+from services.numpy_learner import NumpyLearner
+from services.preprocessing import build_transform, calibration_batches
+
+MANIFEST_NAME = "manifest.json"
+BACKBONE_FILE = "backbone.pt"
+BACKBONE_INT8_FILE = "backbone_int8.pt"
+LEARNER_FILE = "learner.pt"
+LEARNER_NUMPY_FILE = "learner.npz"
+
+
+def backbone_version(backbone_weights: Optional[str]) -> str:
+    """Identify the backbone weights in use for feature cache keys."""
+    if backbone_weights and os.path.exists(backbone_weights):
+        return f"resnet18-{file_sha256(Path(backbone_weights))[:16]}"
+    return "resnet18-imagenet1k_v1"
+
+
+def export_artifacts(
+    out_dir: str,
+    backbone_weights: Optional[str] = None,
+    learner_weights: Optional[str] = None,
+    seed: int = 0,
+    quantize_calibration_dir: Optional[str] = None,
+    onnx: bool = False
+) -> Dict:
+    """Serialize a frozen TorchScript backbone and the learner weights.
+
+    The learner is written both as a torch state dict and as NumPy arrays
+    (for NumpyLearner, verified against torch).
+
+    This is the only step that needs torchvision's ImageNet weights (and so
+    network access); run it at image build time.
+
+    Args:
+        out_dir: Directory to write artifacts to
+        backbone_weights: Optional fine-tuned backbone state dict
+        learner_weights: Optional trained learner state dict
+        seed: Seed for the learner's initialisation when no weights are given,
+            so every worker shares one learner instead of its own random one
+        quantize_calibration_dir: If set, also export a static INT8 backbone
+            calibrated on the images in this directory
+        onnx: Also export ONNX graphs of the backbone and learner generator,
+            verified against torch with onnxruntime
+
+    Returns:
+        The written manifest
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    backbone = ResNetBackbone(pretrained=True)
+    if backbone_weights and os.path.exists(backbone_weights):
+        backbone.load_state_dict(torch.load(backbone_weights, map_location="cpu"))
+    backbone.eval()
+
+    torch.manual_seed(seed)
+    learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1)
+    if learner_weights and os.path.exists(learner_weights):
+        learner.load_state_dict(torch.load(learner_weights, map_location="cpu"))
+    learner.eval()
+
+    _save_frozen(backbone, out / BACKBONE_FILE)
+    torch.save(learner.state_dict(), out / LEARNER_FILE)
+    fast_learner = NumpyLearner.from_torch(learner)
+    fast_learner.save(out / LEARNER_NUMPY_FILE)
+    print(f"NumPy learner equivalence: {verify_numpy_learner(learner, fast_learner)}")
+
+    int8_file = None
+    if quantize_calibration_dir:
+        batches = calibration_batches(Path(quantize_calibration_dir), build_transform())
+        _save_frozen(quantize_backbone(backbone, batches), out / BACKBONE_INT8_FILE)
+        int8_file = BACKBONE_INT8_FILE
+
+    onnx_files = None
+    if onnx:
+        onnx_files = export_onnx(backbone, learner, out)
+        engine = OnnxEngine(out / onnx_files["backbone"], out / onnx_files["generator"])
+        print(f"ONNX equivalence: {verify_onnx(backbone, learner, engine)}")
+
+    manifest = {
+        "backbone_version": backbone_version(backbone_weights),
+        "backbone_file": BACKBONE_FILE,
+        "backbone_int8_file": int8_file,
+        "learner_file": LEARNER_FILE,
+        "learner_numpy_file": LEARNER_NUMPY_FILE,
+        "onnx_files": onnx_files,
+        "torch_version": torch.__version__,
+        "created_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    }
+    with open(out / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _save_frozen(module: torch.nn.Module, path: Path) -> None:
+    with torch.no_grad():
+        traced = torch.jit.trace(module, torch.zeros(1, 3, 224, 224))
+    torch.jit.freeze(traced).save(str(path))
+
+
+def load_manifest(artifact_dir: Optional[str]) -> Optional[Dict]:
+    """Return the artifact manifest, or None if no artifacts are present."""
+    if not artifact_dir:
+        return None
+    manifest_path = Path(artifact_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def load_artifacts(
+    artifact_dir: str,
+    manifest: Dict,
+    device: torch.device,
+    quantized: bool = False
+) -> Tuple[torch.jit.ScriptModule, DynamicLearner]:
+    """Load serialized models from local disk (no network access).
+
+    Args:
+        artifact_dir: Directory written by export_artifacts
+        manifest: Its manifest
+        device: Target device
+        quantized: Load the INT8 backbone (CPU only) instead of FP32
+
+    Returns:
+        (frozen backbone, learner), both in eval mode on ``device``
+    """
+    artifact_dir = Path(artifact_dir)
+    backbone_file = manifest["backbone_int8_file"] if quantized else manifest["backbone_file"]
+    backbone = torch.jit.load(str(artifact_dir / backbone_file), map_location=device)
+    backbone.eval()
+
+    learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1)
+    learner.load_state_dict(torch.load(artifact_dir / manifest["learner_file"], map_location=device))
+    learner.to(device).eval()
+    return backbone, learner
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Export serialized MetaFBP model artifacts")
+    parser.add_argument("--out", default=os.getenv("MODEL_ARTIFACT_DIR", "/app/artifacts"))
+    parser.add_argument("--backbone-weights", default=None)
+    parser.add_argument("--learner-weights", default=None)
+    parser.add_argument(
+        "--quantize-calibration-dir", default=None,
+        help="Also export an INT8 backbone calibrated on these images"
+    )
+    parser.add_argument("--onnx", action="store_true", help="Also export verified ONNX graphs")
+    args = parser.parse_args(argv)
+
+    manifest = export_artifacts(
+        args.out,
+        args.backbone_weights,
+        args.learner_weights,
+        quantize_calibration_dir=args.quantize_calibration_dir,
+        onnx=args.onnx
+    )
+    print(f"Exported {manifest['backbone_version']} artifacts to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
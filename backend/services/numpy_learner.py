@@ -0,0 +1,83 @@
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+# Keys of DynamicLearner.state_dict() used by the generator MLP
+GENERATOR_KEYS = ("generator.0.weight", "generator.0.bias", "generator.2.weight", "generator.2.bias")
+
+
+class NumpyLearner:
+    """DynamicLearner's generator MLP (512 -> 256 -> 513) in plain NumPy.
+
+    For a single (1, 512) preference signal the math is two small GEMVs;
+    torch's per-op dispatch costs more than that, so the request path runs
+    this instead. Weights are stored transposed and contiguous so each layer
+    is one BLAS call. The module does not import torch, so processes that
+    only need the learner can load it from an exported ``learner.npz``.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], out_dim: int = 1):
+        """Create from generator weights.
+
+        Args:
+            arrays: DynamicLearner state dict entries (see GENERATOR_KEYS),
+                as NumPy arrays in torch's (out_features, in_features) layout
+            out_dim: DynamicLearner.out_dim
+        """
+        w1, b1, w2, b2 = (np.asarray(arrays[key], dtype=np.float32) for key in GENERATOR_KEYS)
+        self.w1 = np.ascontiguousarray(w1.T)
+        self.b1 = np.ascontiguousarray(b1)
+        self.w2 = np.ascontiguousarray(w2.T)
+        self.b2 = np.ascontiguousarray(b2)
+        self.in_dim = self.w1.shape[0]
+        self.out_dim = out_dim
+
+    @classmethod
+    def from_torch(cls, learner) -> "NumpyLearner":
+        """Copy the weights of a torch DynamicLearner (on any device)."""
+        state = learner.state_dict()
+        return cls({key: state[key].detach().cpu().numpy() for key in GENERATOR_KEYS}, learner.out_dim)
+
+    @classmethod
+    def load(cls, path: Path) -> "NumpyLearner":
+        with np.load(path) as data:
+            return cls({key: data[key] for key in GENERATOR_KEYS}, int(data["out_dim"]))
+
+    def save(self, path: Path) -> None:
+        np.savez(
+            path,
+            **{
+                "generator.0.weight": self.w1.T,
+                "generator.0.bias": self.b1,
+                "generator.2.weight": self.w2.T,
+                "generator.2.bias": self.b2,
+                "out_dim": np.array(self.out_dim)
+            }
+        )
+
+    def generator(self, x: np.ndarray) -> np.ndarray:
+        """Linear -> ReLU -> Linear, (batch, 512) -> (batch, 513)."""
+        hidden = np.asarray(x, dtype=np.float32) @ self.w1
+        hidden += self.b1
+        np.maximum(hidden, 0, out=hidden)
+        params = hidden @ self.w2
+        params += self.b2
+        return params
+
+    def get_user_weights(self, aggregated_features: np.ndarray) -> np.ndarray:
+        """DynamicLearner.get_user_weights: (1, 512) -> (512,)."""
+        return self.generator(aggregated_features)[0, :self.in_dim]
+
+    def get_batch_user_weights(self, aggregated_features: np.ndarray) -> np.ndarray:
+        """DynamicLearner.get_batch_user_weights: (batch, 512) -> (batch, 512)."""
+        return self.generator(aggregated_features)[:, :self.in_dim]
+
+    def gen_forward(self, x: np.ndarray) -> np.ndarray:
+        """DynamicLearner.gen_forward: (batch, 512) -> (batch, out_dim)."""
+        x = np.asarray(x, dtype=np.float32)
+        params = self.generator(x)
+        weight_num = self.in_dim * self.out_dim
+        generated_weight = params[:, :weight_num].reshape(len(x), self.in_dim, self.out_dim)
+        generated_bias = params[:, weight_num:]
+        return np.einsum("bi,bio->bo", x, generated_weight) + generated_bias
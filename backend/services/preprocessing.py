@@ -0,0 +1,143 @@
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+from torchvision import transforms
+
+from metrics import calibration_stage
+from services.feature_store import FeatureStore
+
+# ImageNet normalization used by the ResNet backbone
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+INPUT_SIZE = (224, 224)
+
+# Identifies the decode + resize steps below for the tensor cache
+PREPROCESS_VERSION = "draft-bilinear-224"
+
+
+def load_image(path: str, size=INPUT_SIZE) -> Image.Image:
+    """Open an image as RGB, letting JPEGs decode at reduced scale.
+
+    ``draft`` makes libjpeg decode at 1/2, 1/4 or 1/8 scale while keeping
+    both sides at least ``size``, so a 1920px photo bound for 224x224 never
+    gets fully decoded. Non-JPEG formats ignore it.
+    """
+    img = Image.open(path)
+    img.draft("RGB", size)
+    return img.convert("RGB")
+
+
+_resize = transforms.Compose([
+    transforms.Resize(INPUT_SIZE),
+    transforms.PILToTensor()
+])
+_normalize = transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
+
+
+def image_to_uint8(img: Image.Image) -> torch.Tensor:
+    """Resize to the backbone input size; (3, 224, 224) uint8."""
+    return _resize(img)
+
+
+def normalize_uint8(batch: torch.Tensor) -> torch.Tensor:
+    """uint8 (batch, 3, 224, 224) -> normalized float backbone input.
+
+    Matches ToTensor + Normalize on the resized image exactly.
+    """
+    return _normalize(batch.float().div_(255))
+
+
+def build_transform() -> transforms.Compose:
+    """Image preprocessing pipeline for the backbone (224x224, normalized)."""
+    return transforms.Compose([
+        transforms.Resize(INPUT_SIZE),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
+    ])
+
+
+class Preprocessor:
+    """Image paths -> normalized backbone batch, with an optional on-disk
+    cache of the resized uint8 tensors.
+
+    The cache survives backbone changes (new weights, INT8, ONNX), so
+    re-extracting features for known images skips decode and resize.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        rows_per_shard: int = 256,
+        hash_lookup: Optional[Callable[[Path], Optional[str]]] = None
+    ):
+        """Create the preprocessor.
+
+        Args:
+            cache_dir: Where to keep tensor shards; None disables the cache
+            rows_per_shard: Tensors per shard file (~150 KB each)
+            hash_lookup: Known content hashes for the cache (see FeatureStore)
+        """
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = FeatureStore(
+                cache_dir, PREPROCESS_VERSION,
+                row_shape=(3, *INPUT_SIZE), dtype=np.uint8, rows_per_shard=rows_per_shard,
+                hash_lookup=hash_lookup
+            )
+
+    def load_uint8(self, image_paths: List[str]) -> torch.Tensor:
+        """Decode and resize images, using the tensor cache when possible.
+
+        Returns:
+            uint8 tensor of shape (batch, 3, 224, 224)
+        """
+        paths = [Path(p) for p in image_paths]
+        cached = self.cache.get_many(paths) if self.cache is not None else {}
+
+        missing = [p for p in paths if str(p) not in cached]
+        decoded = {}
+        if missing:
+            with calibration_stage("decode"):
+                decoded = {str(p): image_to_uint8(load_image(str(p))) for p in missing}
+            if self.cache is not None:
+                self.cache.put_many(missing, torch.stack([decoded[str(p)] for p in missing]).numpy())
+
+        return torch.stack([
+            torch.from_numpy(cached[str(p)]) if str(p) in cached else decoded[str(p)]
+            for p in paths
+        ])
+
+    def __call__(self, image_paths: List[str]) -> torch.Tensor:
+        """Normalized float batch of shape (batch, 3, 224, 224)."""
+        batch = self.load_uint8(image_paths)
+        with calibration_stage("transform"):
+            return normalize_uint8(batch)
+
+
+def calibration_batches(
+    image_dir: Path,
+    transform: transforms.Compose,
+    limit: int = 64,
+    batch_size: int = 16
+) -> Iterator[torch.Tensor]:
+    """Yield preprocessed batches from an image directory (e.g. to observe
+    activation ranges for quantization).
+
+    Args:
+        image_dir: Directory of .jpg/.png images
+        transform: Preprocessing pipeline
+        limit: Maximum number of images to use
+        batch_size: Images per yielded batch
+
+    Yields:
+        Tensors of shape (batch, 3, 224, 224)
+    """
+    paths = sorted(Path(image_dir).glob("*.[jp][pn][g]"))[:limit]
+    for start in range(0, len(paths), batch_size):
+        yield torch.stack([
+            transform(load_image(str(path)))
+            for path in paths[start:start + batch_size]
+        ])
@@ -0,0 +1,375 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from services.feature_store import file_sha256
+from services.vector_store import get_vector_store
+
+logger = logging.getLogger(__name__)
+
+
+class UserRatings(NamedTuple):
+    user_id: str
+    ratings: Dict[str, int]
+    gender: Optional[str] = None
+    preference_target: Optional[str] = None
+
+
+def db_rating_groups(after_user_id: Optional[str] = None, page_size: int = 5000) -> Iterator[UserRatings]:
+    """Stream CalibrationRating rows grouped by user, in user_id order.
+
+    Args:
+        after_user_id: Resume point; only users after this id are returned
+        page_size: Rows fetched per round trip
+    """
+    from database import SessionLocal
+    from db_models import CalibrationRating, User
+
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                CalibrationRating.user_id,
+                CalibrationRating.image_id,
+                CalibrationRating.rating,
+                User.gender,
+                User.preference_target
+            )
+            .outerjoin(User, User.id == CalibrationRating.user_id)
+            .order_by(CalibrationRating.user_id, CalibrationRating.image_id)
+        )
+        if after_user_id is not None:
+            query = query.filter(CalibrationRating.user_id > after_user_id)
+
+        for user_id, rows in itertools.groupby(query.yield_per(page_size), key=lambda row: row.user_id):
+            ratings, gender, target = {}, None, None
+            for row in rows:
+                ratings[row.image_id] = int(row.rating)
+                gender, target = row.gender, row.preference_target
+            yield UserRatings(user_id, ratings, gender, target)
+    finally:
+        db.close()
+
+
+def dump_rating_groups(path: Path) -> Iterator[UserRatings]:
+    """Read a ratings dump (CSV or NDJSON), grouped by consecutive user_id.
+
+    CSV needs ``user_id,image_id,rating`` columns, plus optional ``gender``
+    and ``preference_target`` columns. NDJSON lines may use the same fields,
+    or carry a whole user as ``{"user_id": ..., "ratings": {image_id: rating}}``.
+    Rows for one user must be adjacent (e.g. sorted by user_id).
+    """
+    path = Path(path)
+    with open(path, newline="") as f:
+        if path.suffix.lower() == ".csv":
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+
+        for user_id, rows in itertools.groupby(records, key=lambda record: str(record["user_id"])):
+            ratings, gender, target = {}, None, None
+            for record in rows:
+                if "ratings" in record:
+                    ratings.update({str(k): int(v) for k, v in record["ratings"].items()})
+                else:
+                    ratings[str(record["image_id"])] = int(record["rating"])
+                gender = record.get("gender") or gender
+                target = record.get("preference_target") or target
+            yield UserRatings(user_id, ratings, gender, target)
+
+
+def store_ratings(batch: List[UserRatings], calibrated: Sequence[str] = ()) -> None:
+    """Write imported ratings to CalibrationRating, replacing any existing
+    rating for the same (user, image) so re-runs don't duplicate them.
+
+    Users in ``calibrated`` (the ones that got a profile) are marked
+    calibration_complete in the same transaction.
+    """
+    from sqlalchemy import update
+
+    from database import SessionLocal
+    from db_models import User, rating_upserts
+
+    db = SessionLocal()
+    try:
+        rows = [
+            {"user_id": user.user_id, "image_id": image_id, "rating": rating}
+            for user in batch
+            for image_id, rating in user.ratings.items()
+        ]
+        for statement in rating_upserts(db.bind.dialect.name, rows):
+            db.execute(statement)
+        if calibrated:
+            db.execute(
+                update(User).where(User.id.in_(list(calibrated))).values(calibration_complete=True)
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _save_profiles(profiles_dir: str, profiles: List[Tuple[str, Dict, Dict]]) -> int:
+    """Process-pool worker: write p1_visual_vectors and their calibration stats."""
+    store = get_vector_store(Path(profiles_dir))
+    for user_id, vector_data, stats in profiles:
+        with store.user_lock(user_id):
+            store.save_stats(user_id, stats)
+            store.save(user_id, vector_data)
+    return len(profiles)
+
+
+class RecalibrationJob:
+    """Regenerate many users' profiles with the currently loaded models.
+
+    Users are processed in batches: the union of their rated images goes
+    through the feature store / backbone once, every user's aggregated
+    preference signal goes through the learner in one call, and the
+    resulting profiles are written by a process pool while the next batch
+    is computed. A checkpoint is written after each batch is on disk.
+    """
+
+    def __init__(
+        self,
+        service,
+        checkpoint_path: Path,
+        batch_users: int = 256,
+        workers: int = 2,
+        feature_chunk: int = 256,
+        model_tag: Optional[str] = None
+    ):
+        """Create the job.
+
+        Args:
+            service: Initialized VisualService (models to calibrate with)
+            checkpoint_path: JSON file recording progress
+            batch_users: Users per batch
+            workers: Profile-writer processes (0 writes inline)
+            feature_chunk: Images per feature extraction call
+            model_tag: Identifies the models for checkpoint matching
+                (default: the service's backbone_version)
+        """
+        self.service = service
+        self.checkpoint_path = Path(checkpoint_path)
+        self.batch_users = batch_users
+        self.workers = workers
+        self.feature_chunk = feature_chunk
+        self.model_tag = model_tag or service.backbone_version
+
+    def load_checkpoint(self, source: str) -> Optional[Dict]:
+        """Progress of an earlier run over the same source and models."""
+        if not self.checkpoint_path.exists():
+            return None
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("source") != source or checkpoint.get("models") != self.model_tag:
+            return None
+        return checkpoint
+
+    def _write_checkpoint(self, source: str, users_done: int, last_user_id: Optional[str], completed: bool) -> None:
+        checkpoint = {
+            "source": source,
+            "models": self.model_tag,
+            "users_done": users_done,
+            "last_user_id": last_user_id,
+            "completed": completed,
+            "updated_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.checkpoint_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+        os.replace(tmp, self.checkpoint_path)
+
+    def calibrate_batch(self, batch: List[UserRatings]) -> Tuple[List[Tuple[str, Dict, Dict]], int]:
+        """Calibrate a batch of users without saving.
+
+        Returns:
+            ([(user_id, p1_visual_vector, calibration stats)], number of users skipped)
+        """
+        service = self.service
+        paths_per_user = [service.resolve_image_paths(user.ratings) for user in batch]
+
+        unique_paths = sorted({path for paths in paths_per_user for path in paths.values()})
+        image_features = {}
+        for start in range(0, len(unique_paths), self.feature_chunk):
+            image_features.update(service.get_image_features(unique_paths[start:start + self.feature_chunk]))
+
+        prepared, aggregated, skipped = [], [], 0
+        for user, paths in zip(batch, paths_per_user):
+            try:
+                stats = service.build_stats(user.ratings, paths, image_features)
+            except ValueError:
+                skipped += 1
+                continue
+            prepared.append((user, stats))
+            aggregated.append(service.aggregate_features(stats))
+
+        if not prepared:
+            return [], skipped
+
+        # Imported here so the profile-writer processes never load torch
+        import torch
+
+        embeddings = service.engine.batch_user_weights(torch.cat(aggregated))
+        profiles = [
+            (user.user_id, service.build_vector_data(
+                user.user_id, stats, embedding, user.gender, user.preference_target
+            ), stats.to_dict())
+            for (user, stats), embedding in zip(prepared, embeddings)
+        ]
+        return profiles, skipped
+
+    def run(
+        self,
+        groups: Iterator[UserRatings],
+        source: str,
+        users_done: int = 0,
+        import_ratings: bool = False
+    ) -> Dict:
+        """Calibrate every user from ``groups`` and write their profiles.
+
+        Args:
+            groups: Users to calibrate (already past any resume point)
+            source: Identifies the input for checkpoint matching
+            users_done: Users completed by an earlier run (for reporting)
+            import_ratings: Also store the ratings in CalibrationRating and
+                mark the calibrated users calibration_complete
+
+        Returns:
+            Run statistics
+        """
+        groups = iter(groups)
+        profiles_dir = str(self.service.profiles_dir)
+        pool = None
+        if self.workers > 0:
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+        start = time.perf_counter()
+        processed = skipped = 0
+        in_flight: Optional[Tuple[List[Future], int, str]] = None
+
+        def finish(flight: Tuple[List[Future], int, str]) -> None:
+            futures, done, last_user_id = flight
+            wait(futures)
+            for future in futures:
+                future.result()
+            self._write_checkpoint(source, done, last_user_id, completed=False)
+
+        try:
+            while True:
+                batch = list(itertools.islice(groups, self.batch_users))
+                if not batch:
+                    break
+                profiles, batch_skipped = self.calibrate_batch(batch)
+                if import_ratings:
+                    store_ratings(batch, calibrated=[user_id for user_id, _, _ in profiles])
+                processed += len(batch)
+                skipped += batch_skipped
+
+                if pool is None:
+                    _save_profiles(profiles_dir, profiles)
+                    futures = []
+                else:
+                    size = max(1, -(-len(profiles) // self.workers))
+                    futures = [
+                        pool.submit(_save_profiles, profiles_dir, profiles[i:i + size])
+                        for i in range(0, len(profiles), size)
+                    ]
+
+                # Checkpoint the previous batch once its profiles are on disk
+                if in_flight is not None:
+                    finish(in_flight)
+                in_flight = (futures, users_done + processed, batch[-1].user_id)
+
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    "Recalibrated %d users (%d skipped), %.1f users/s",
+                    users_done + processed, skipped, processed / elapsed
+                )
+
+            if in_flight is not None:
+                finish(in_flight)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        last_user_id = in_flight[2] if in_flight else None
+        self._write_checkpoint(source, users_done + processed, last_user_id, completed=True)
+
+        # One bulk rebuild instead of a journal entry per user; running
+        # servers pick up the new snapshot on their next search
+        self.service.match_index.rebuild(self.service.profiles_dir)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "users": processed,
+            "skipped": skipped,
+            "total_done": users_done + processed,
+            "seconds": round(elapsed, 2),
+            "users_per_s": round(processed / elapsed, 1) if elapsed else None
+        }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Regenerate every calibrated user's profile with the current models"
+    )
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    parser.add_argument("--backbone-weights", default=None)
+    parser.add_argument("--learner-weights", default=None)
+    parser.add_argument("--from-dump", default=None, help="CSV/NDJSON ratings dump instead of the database")
+    parser.add_argument("--import-ratings", action="store_true", help="Also store dump ratings in the database and mark those users calibrated")
+    parser.add_argument("--batch-users", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=2, help="Profile-writer processes")
+    parser.add_argument("--checkpoint", default=None, help="Default: DATA_DIR/recalibration.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
+
+    from services import VisualService
+    service = VisualService(
+        data_dir=args.data_dir,
+        backbone_weights=args.backbone_weights,
+        learner_weights=args.learner_weights
+    )
+    model_tag = service.backbone_version
+    if args.learner_weights:
+        model_tag += f"+learner-{file_sha256(Path(args.learner_weights))[:16]}"
+    job = RecalibrationJob(
+        service,
+        Path(args.checkpoint or Path(args.data_dir) / "recalibration.json"),
+        batch_users=args.batch_users,
+        workers=args.workers,
+        model_tag=model_tag
+    )
+
+    source = f"dump:{Path(args.from_dump).resolve()}" if args.from_dump else "database"
+    checkpoint = None if args.restart else job.load_checkpoint(source)
+    if checkpoint and checkpoint["completed"]:
+        print(f"Already completed ({checkpoint['users_done']} users); use --restart to run again")
+        return
+
+    users_done = checkpoint["users_done"] if checkpoint else 0
+    if args.from_dump:
+        groups = itertools.islice(dump_rating_groups(Path(args.from_dump)), users_done, None)
+    else:
+        groups = db_rating_groups(after_user_id=checkpoint["last_user_id"] if checkpoint else None)
+    if checkpoint:
+        print(f"Resuming after {users_done} users")
+
+    stats = job.run(groups, source, users_done=users_done, import_ratings=args.import_ratings)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import fcntl
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Per-process read cache for load(); sized by entries and by bytes
+VECTOR_CACHE_ENTRIES = int(os.getenv("VECTOR_CACHE_ENTRIES", "10000"))
+VECTOR_CACHE_MB = float(os.getenv("VECTOR_CACHE_MB", "64"))
+
+LEGACY_FILE = "p1_visual_vector.json"
+META_FILE = "p1_visual_vector.meta.json"
+STATS_FILE = "p1_calibration_stats.json"
+
+# Float lists in p1_visual_vector that live in the binary sidecar
+VECTOR_FIELDS = (
+    ("self_analysis", "embedding_vector"),
+    ("preference_model", "ideal_vector")
+)
+
+
+def _pack_dtype(values: np.ndarray) -> np.dtype:
+    """float32 when it round-trips exactly (always, for torch output), else float64."""
+    as_f32 = values.astype("<f4")
+    return np.dtype("<f4") if np.array_equal(as_f32.astype(np.float64), values) else np.dtype("<f8")
+
+
+class VectorStore:
+    """p1_visual_vector storage: small JSON metadata plus packed float vectors.
+
+    ``embedding_vector`` and ``ideal_vector`` go into a raw little-endian
+    sidecar instead of indented JSON text. Vectors are float32 whenever that
+    is lossless, so ``load`` returns exactly the dict that was saved and the
+    API JSON is unchanged. Profiles still in the legacy single-file format
+    are read transparently.
+
+    Reads go through an LRU cache bounded by entry count and bytes. An entry
+    is only reused while the metadata file's (mtime, size) is unchanged, so
+    saves from other worker processes are picked up too.
+    """
+
+    def __init__(
+        self,
+        profiles_dir: Path,
+        cache_entries: int = VECTOR_CACHE_ENTRIES,
+        cache_bytes: int = int(VECTOR_CACHE_MB * 1024 * 1024)
+    ):
+        self.profiles_dir = Path(profiles_dir)
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, Tuple[Tuple[int, int], Dict, List[np.ndarray], int]]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _user_dir(self, user_id: str) -> Path:
+        return self.profiles_dir / user_id
+
+    def exists(self, user_id: str) -> bool:
+        user_dir = self._user_dir(user_id)
+        return (user_dir / META_FILE).exists() or (user_dir / LEGACY_FILE).exists()
+
+    def path(self, user_id: str) -> Optional[Path]:
+        """The file describing a user's vector (metadata, or legacy JSON)."""
+        for name in (META_FILE, LEGACY_FILE):
+            candidate = self._user_dir(user_id) / name
+            if candidate.exists():
+                return candidate
+        return None
+
+    def user_ids(self) -> Iterator[str]:
+        if not self.profiles_dir.exists():
+            return
+        for user_dir in self.profiles_dir.iterdir():
+            if user_dir.is_dir():
+                yield user_dir.name
+
+    def save(self, user_id: str, vector_data: Dict) -> Path:
+        """Write a p1_visual_vector structure.
+
+        The sidecar gets a fresh name on every save and the metadata that
+        points at it is swapped in atomically, so readers never pair new
+        metadata with old vectors. The legacy JSON file, if any, is removed.
+
+        Args:
+            user_id: Unique user identifier
+            vector_data: The p1_visual_vector data structure
+
+        Returns:
+            Path to the metadata file
+        """
+        user_dir = self._user_dir(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+
+        vectors = [np.asarray(self._get(vector_data, field), dtype=np.float64) for field in VECTOR_FIELDS]
+        packed = np.concatenate(vectors) if vectors else np.empty(0)
+        dtype = _pack_dtype(packed)
+
+        meta = json.loads(json.dumps(vector_data))
+        for field in VECTOR_FIELDS:
+            self._set(meta, field, None)
+
+        previous = self._read_meta(user_dir / META_FILE)
+        vectors_file = f"p1_visual_vector.{uuid.uuid4().hex[:12]}.bin"
+        meta["_vectors"] = {
+            "file": vectors_file,
+            "dtype": dtype.str,
+            "lengths": [len(v) for v in vectors]
+        }
+
+        packed.astype(dtype).tofile(user_dir / vectors_file)
+        tmp = user_dir / f".{META_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, separators=(",", ":"))
+        os.replace(tmp, user_dir / META_FILE)
+
+        if previous is not None:
+            (user_dir / previous["_vectors"]["file"]).unlink(missing_ok=True)
+        (user_dir / LEGACY_FILE).unlink(missing_ok=True)
+
+        self.invalidate(user_id)
+        return user_dir / META_FILE
+
+    @contextmanager
+    def user_lock(self, user_id: str):
+        """Exclusive per-user lock (across processes) for read-modify-write updates."""
+        user_dir = self._user_dir(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        with open(user_dir / ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def has_stats(self, user_id: str) -> bool:
+        return (self._user_dir(user_id) / STATS_FILE).exists()
+
+    def save_stats(self, user_id: str, stats: Dict) -> Path:
+        """Atomically write a user's calibration statistics (see services/calibration_stats.py)."""
+        user_dir = self._user_dir(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        tmp = user_dir / f".{STATS_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(stats, f, separators=(",", ":"))
+        os.replace(tmp, user_dir / STATS_FILE)
+        return user_dir / STATS_FILE
+
+    def load_stats(self, user_id: str) -> Optional[Dict]:
+        """A user's calibration statistics, or None if there are none."""
+        return self._read_meta(self._user_dir(user_id) / STATS_FILE)
+
+    def load(self, user_id: str) -> Optional[Dict]:
+        """Return a user's p1_visual_vector, or None if there is none.
+
+        Each call returns a fresh dict, so callers may modify it.
+        """
+        meta_path = self._user_dir(user_id) / META_FILE
+        try:
+            stat = meta_path.stat()
+        except FileNotFoundError:
+            return self._load_legacy(user_id)
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None and entry[0] == key:
+                self._cache.move_to_end(user_id)
+                self.hits += 1
+                return self._assemble(entry[1], entry[2])
+            self.misses += 1
+
+        # Retry once if a concurrent save replaced the sidecar under us
+        for _ in range(2):
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return self._load_legacy(user_id)
+            try:
+                vectors = self._read_vectors(meta_path.parent, meta["_vectors"])
+                break
+            except FileNotFoundError:
+                continue
+        else:
+            return None
+
+        self._remember(user_id, key, meta, vectors)
+        return self._assemble(meta, vectors)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            entry = self._cache.pop(user_id, None)
+            if entry is not None:
+                self._cached_bytes -= entry[3]
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._cached_bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "bytes": self._cached_bytes,
+                "max_entries": self.cache_entries,
+                "max_bytes": self.cache_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+    def migrate(self) -> int:
+        """Rewrite every legacy JSON profile in the binary format."""
+        migrated = 0
+        for user_id in self.user_ids():
+            user_dir = self._user_dir(user_id)
+            if (user_dir / LEGACY_FILE).exists() and not (user_dir / META_FILE).exists():
+                self.save(user_id, self._load_legacy(user_id))
+                migrated += 1
+        return migrated
+
+    def _remember(self, user_id: str, key: Tuple[int, int], meta: Dict, vectors: List[np.ndarray]) -> None:
+        size = sum(v.nbytes for v in vectors) + 1024  # rough allowance for metadata
+        if self.cache_entries <= 0 or size > self.cache_bytes:
+            return
+        with self._lock:
+            previous = self._cache.pop(user_id, None)
+            if previous is not None:
+                self._cached_bytes -= previous[3]
+            self._cache[user_id] = (key, meta, vectors, size)
+            self._cached_bytes += size
+            while len(self._cache) > self.cache_entries or self._cached_bytes > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted[3]
+
+    def _load_legacy(self, user_id: str) -> Optional[Dict]:
+        legacy_path = self._user_dir(user_id) / LEGACY_FILE
+        if not legacy_path.exists():
+            return None
+        with open(legacy_path, "r") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _read_meta(meta_path: Path) -> Optional[Dict]:
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _read_vectors(user_dir: Path, spec: Dict) -> List[np.ndarray]:
+        packed = np.fromfile(user_dir / spec["file"], dtype=np.dtype(spec["dtype"]))
+        offsets = np.cumsum([0] + spec["lengths"])
+        return [packed[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+    @classmethod
+    def _assemble(cls, meta: Dict, vectors: List[np.ndarray]) -> Dict:
+        vector_data = json.loads(json.dumps(meta))
+        del vector_data["_vectors"]
+        for field, values in zip(VECTOR_FIELDS, vectors):
+            cls._set(vector_data, field, values.tolist())
+        return vector_data
+
+    @staticmethod
+    def _get(data: Dict, field: Tuple[str, str]) -> list:
+        return data.get(field[0], {}).get(field[1]) or []
+
+    @staticmethod
+    def _set(data: Dict, field: Tuple[str, str], value) -> None:
+        if field[0] in data and field[1] in data[field[0]]:
+            data[field[0]][field[1]] = value
+
+
+_stores: Dict[Path, VectorStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(profiles_dir: Path) -> VectorStore:
+    """Process-wide VectorStore per directory, so every caller shares one cache."""
+    profiles_dir = Path(profiles_dir)
+    with _stores_lock:
+        if profiles_dir not in _stores:
+            _stores[profiles_dir] = VectorStore(profiles_dir)
+        return _stores[profiles_dir]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Convert legacy p1_visual_vector.json profiles")
+    parser.add_argument("--data-dir", default=os.getenv("DATA_DIR", "/app/data"))
+    args = parser.parse_args(argv)
+
+    store = VectorStore(Path(args.data_dir) / "profiles")
+    print(f"Migrated {store.migrate()} profiles in {store.profiles_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,47 @@
-import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 import uuid
 
+import numpy as np
 import torch
-import torch.nn.functional as F
-from torchvision import transforms
-from PIL import Image
 
-from models import ResNetBackbone, DynamicLearner
+from metrics import calibration_stage
+from models import ResNetBackbone, DynamicLearner, quantize_backbone
+from profiling import profiled_calibration
+from services.active_selection import ActiveSelector
+from services.calibration_stats import CalibrationStats
+from services.candidate_scoring import CandidateSet
+from services.demo_features import demo_features
+from services.feature_store import FeatureStore
+from services.image_catalog import get_image_catalog
+from services.inference_engines import OnnxEngine, TorchEngine
+from services.inference_scheduler import BatchScheduler
+from services.match_index import MatchIndex, get_match_index
+from services.numpy_learner import NumpyLearner
+from services.model_artifacts import backbone_version, load_artifacts, load_manifest
+from services.preprocessing import Preprocessor, build_transform, calibration_batches
+from services.vector_store import get_vector_store
+
+# Cross-request micro-batching for backbone forwards
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+# Pre-serialized models (see services/model_artifacts.py); used when present
+MODEL_ARTIFACT_DIR = os.getenv("MODEL_ARTIFACT_DIR", "/app/artifacts")
+
+# Opt-in static INT8 backbone (CPU only)
+BACKBONE_QUANTIZE = os.getenv("BACKBONE_QUANTIZE", "false").lower() == "true"
+
+# Inference engine: "torch" (default) or "onnx" (needs exported ONNX artifacts)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "torch").lower()
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0")) or None
+
+# Learner generator on the request path: "numpy" (default, CPU only) or "torch"
+LEARNER_BACKEND = os.getenv("LEARNER_BACKEND", "numpy").lower()
 
 
 class VisualService:
@@ -21,7 +52,7 @@ class VisualService:
     2. User rates images (1-5 stars) during calibration
     3. Features are weighted by ratings and aggregated
     4. DynamicLearner generates personalized weight vector from aggregated features
-    5. Result is saved as p1_visual_vector.json
+    5. Result is saved as p1_visual_vector (see services/vector_store.py)
 
     The DynamicLearner acts as a "parameter generator" - it takes the user's
     preference signal (aggregated features) and outputs a personalized weight
@@ -29,12 +60,18 @@ class VisualService:
     """
 
     _instance = None
+    # Creation and model loading happen once, even when pool threads and the
+    # startup preload ask for the service at the same time
+    _lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         """Singleton pattern to avoid reloading models."""
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
 
     def __init__(
@@ -42,7 +79,12 @@ class VisualService:
         data_dir: str = "/app/data",
         device: Optional[str] = None,
         backbone_weights: Optional[str] = None,
-        learner_weights: Optional[str] = None
+        learner_weights: Optional[str] = None,
+        use_feature_store: bool = True,
+        use_tensor_cache: bool = True,
+        artifact_dir: Optional[str] = MODEL_ARTIFACT_DIR,
+        quantize: bool = BACKBONE_QUANTIZE,
+        engine: str = INFERENCE_ENGINE
     ):
         """Initialize the VisualService.
 
@@ -51,10 +93,37 @@ class VisualService:
             device: Torch device ('cuda' or 'cpu')
             backbone_weights: Path to pre-trained backbone weights
             learner_weights: Path to pre-trained learner weights
+            use_feature_store: Cache calibration image features on disk
+            use_tensor_cache: Cache decoded, resized image tensors on disk
+            artifact_dir: Directory with serialized models; ignored when
+                custom weights are passed
+            quantize: Use a static INT8 backbone calibrated on the global
+                calibration images (CPU only)
+            engine: "torch" or "onnx" (ONNX Runtime over exported graphs)
         """
         if self._initialized:
             return
+        with self._lock:
+            if self._initialized:
+                return
+            self._setup(
+                data_dir, device, backbone_weights, learner_weights,
+                use_feature_store, use_tensor_cache, artifact_dir, quantize, engine
+            )
 
+    def _setup(
+        self,
+        data_dir: str,
+        device: Optional[str],
+        backbone_weights: Optional[str],
+        learner_weights: Optional[str],
+        use_feature_store: bool,
+        use_tensor_cache: bool,
+        artifact_dir: Optional[str],
+        quantize: bool,
+        engine: str
+    ) -> None:
+        """Load everything; runs once, under ``_lock`` (see ``__init__``)."""
         self.data_dir = Path(data_dir)
         self.profiles_dir = self.data_dir / "profiles"
         self.calibration_dir = self.data_dir / "global_calibration"
@@ -63,40 +132,163 @@ class VisualService:
         self.profiles_dir.mkdir(parents=True, exist_ok=True)
         self.calibration_dir.mkdir(parents=True, exist_ok=True)
 
+        # Calibration image metadata, scanned once and refreshed on change
+        self.catalog = get_image_catalog(self.calibration_dir)
+        # Catalog features and the active-learning selector, rebuilt when
+        # the images or the backbone change
+        self._candidates: Optional[CandidateSet] = None
+        self._selector: Optional[ActiveSelector] = None
+        self._candidates_lock = threading.Lock()
+
+        # p1_visual_vector storage (binary vectors, cached reads)
+        self.vector_store = get_vector_store(self.profiles_dir)
+
         # Set device
         if device is None:
             self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         else:
             self.device = torch.device(device)
 
+        # Image preprocessing pipeline (ImageNet normalization)
+        self.transform = build_transform()
+        self.preprocessor = Preprocessor(
+            self.data_dir / "tensor_cache" if use_tensor_cache else None,
+            hash_lookup=self.catalog.content_hash
+        )
+
+        if quantize and self.device.type != "cpu":
+            print("INT8 backbone is CPU-only; using FP32")
+            quantize = False
+
         # Initialize models
         print(f"Initializing MetaFBP models on {self.device}...")
-        self.backbone = ResNetBackbone(pretrained=True).to(self.device)
-        self.learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).to(self.device)
-
-        # Load custom weights if provided
-        if backbone_weights and os.path.exists(backbone_weights):
-            self.backbone.load_state_dict(torch.load(backbone_weights, map_location=self.device))
-        if learner_weights and os.path.exists(learner_weights):
-            self.learner.load_state_dict(torch.load(learner_weights, map_location=self.device))
+        load_start = time.perf_counter()
+        manifest = None
+        if not (backbone_weights or learner_weights):
+            manifest = load_manifest(artifact_dir)
+
+        quantized = False
+        if manifest is not None:
+            # Fast path: frozen backbone + learner from local disk, no download
+            quantized = quantize and bool(manifest.get("backbone_int8_file"))
+            self.backbone, self.learner = load_artifacts(
+                artifact_dir, manifest, self.device, quantized=quantized
+            )
+            self.backbone_version = manifest["backbone_version"]
+            model_source = "artifact"
+            if quantize and not quantized:
+                print("No INT8 backbone in model artifacts; using FP32")
+        else:
+            self.backbone = ResNetBackbone(pretrained=True).to(self.device)
+            self.learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).to(self.device)
+
+            # Load custom weights if provided
+            if backbone_weights and os.path.exists(backbone_weights):
+                self.backbone.load_state_dict(torch.load(backbone_weights, map_location=self.device))
+            if learner_weights and os.path.exists(learner_weights):
+                self.learner.load_state_dict(torch.load(learner_weights, map_location=self.device))
+            self.backbone_version = backbone_version(backbone_weights)
+            model_source = "torchvision"
+
+            if quantize:
+                # Observe activation ranges on the real calibration set
+                self.backbone.eval()
+                try:
+                    self.backbone = quantize_backbone(
+                        self.backbone, calibration_batches(self.calibration_dir, self.transform)
+                    )
+                    quantized = True
+                except ValueError as e:
+                    print(f"{e}; using FP32")
+
+        # INT8 features differ slightly from FP32, so cache them separately
+        if quantized:
+            self.backbone_version += "-int8"
 
         # Set to evaluation mode (inference only - no training)
         self.backbone.eval()
         self.learner.eval()
 
-        # Image preprocessing pipeline (ImageNet normalization)
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(
-                mean=[0.485, 0.456, 0.406],
-                std=[0.229, 0.224, 0.225]
+        # The generator is tiny: on CPU, NumPy beats torch's per-call overhead
+        fast_learner = None
+        if LEARNER_BACKEND == "numpy" and self.device.type == "cpu":
+            fast_learner = NumpyLearner.from_torch(self.learner)
+
+        # Engine that runs the backbone and learner generator
+        self.engine = TorchEngine(self.backbone, self.learner, fast_learner=fast_learner)
+        if engine == "onnx":
+            onnx_files = (manifest or {}).get("onnx_files")
+            if quantized or not onnx_files:
+                print("ONNX engine needs FP32 ONNX model artifacts; using torch")
+            else:
+                try:
+                    self.engine = OnnxEngine(
+                        Path(artifact_dir) / onnx_files["backbone"],
+                        Path(artifact_dir) / onnx_files["generator"],
+                        intra_op_threads=ONNX_THREADS,
+                        fast_learner=fast_learner
+                    )
+                    self.backbone_version += "-onnx"
+                    # ORT owns the backbone now; free the torch copy
+                    self.backbone = None
+                except ImportError:
+                    print("onnxruntime is not installed; using torch")
+
+        self.timings = {
+            "model_source": model_source,
+            "engine": self.engine.name,
+            "learner": "numpy" if fast_learner is not None else self.engine.name,
+            "quantized": quantized,
+            "model_load_ms": round((time.perf_counter() - load_start) * 1000, 1)
+        }
+        self.first_calibration_at: Optional[float] = None
+
+        # Concurrent requests share backbone forwards through one scheduler
+        self.scheduler = BatchScheduler(
+            self.engine.backbone_forward,
+            max_batch_size=INFERENCE_MAX_BATCH,
+            max_wait_ms=INFERENCE_MAX_WAIT_MS
+        )
+
+        # Persistent feature cache for the global calibration set, keyed by
+        # backbone version so new weights never read stale features
+        self.feature_store = None
+        if use_feature_store:
+            self.feature_store = FeatureStore(
+                self.data_dir / "feature_store", self.backbone_version, hash_lookup=self.catalog.content_hash
             )
-        ])
 
         self._initialized = True
         print("MetaFBP models initialized successfully")
 
+    @property
+    def match_index(self) -> MatchIndex:
+        """Nearest-neighbour index over calibrated users.
+
+        Opened on first use rather than in ``_setup``: a first open builds it
+        from the profile store, which shouldn't hold up model loading.
+        """
+        return get_match_index(self.data_dir)
+
+    def warmup(self, batch_sizes: Tuple[int, ...] = (1, 8)) -> float:
+        """Run dummy batches so the first real request doesn't pay for
+        allocator growth and TorchScript profiling passes.
+
+        Returns:
+            Warm-up wall time in milliseconds
+        """
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            # Twice per shape: the JIT profiles on the first call
+            for _ in range(2):
+                features = self.engine.backbone_forward(
+                    torch.zeros(batch_size, 3, 224, 224, device=self.device)
+                )
+                self.engine.user_weights(features[:1])
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.timings["warmup_ms"] = elapsed_ms
+        return elapsed_ms
+
     def extract_features(self, image_paths: List[str]) -> torch.Tensor:
         """Extract 512-dim feature vectors from images using ResNetBackbone.
 
@@ -106,18 +298,11 @@ class VisualService:
         Returns:
             Feature tensor of shape (batch, 512)
         """
-        images = []
-        for path in image_paths:
-            img = Image.open(path).convert("RGB")
-            img_tensor = self.transform(img)
-            images.append(img_tensor)
+        # Reduced-scale JPEG decode, or cached resized tensors
+        batch = self.preprocessor(image_paths).to(self.device)
 
-        batch = torch.stack(images).to(self.device)
-
-        with torch.no_grad():
-            features = self.backbone(batch)
-
-        return features
+        with calibration_stage("backbone"):
+            return self.scheduler.infer(batch)
 
     def extract_single_feature(self, image_path: str) -> torch.Tensor:
         """Extract feature vector from a single image.
@@ -130,28 +315,34 @@ class VisualService:
         """
         return self.extract_features([image_path])[0]
 
-    def _generate_demo_features(self, image_id: str, rating: int) -> torch.Tensor:
-        """Generate deterministic demo features when no real images exist.
+    def get_image_features(self, image_paths: List[Path]) -> Dict[str, torch.Tensor]:
+        """Get features for calibration images, using the feature store first.
 
-        Uses image_id as seed for reproducibility, and rating influences
-        the feature distribution to simulate preference patterns.
+        Only images missing from the store go through the backbone (in a
+        single batch); their features are then added to the store.
 
         Args:
-            image_id: Image identifier (used as seed)
-            rating: User rating 1-5
+            image_paths: Paths to calibration image files
 
         Returns:
-            Synthetic feature tensor of shape (512,)
+            Dict mapping str(path) to a feature tensor of shape (512,)
         """
-        # Create deterministic seed from image_id
-        seed = hash(image_id) % (2**32)
-        torch.manual_seed(seed)
+        if not image_paths:
+            return {}
 
-        # Generate base features
-        features = torch.randn(512, device=self.device)
+        cached = self.feature_store.get_many(image_paths) if self.feature_store else {}
+        features = {
+            path: torch.from_numpy(vector).to(self.device)
+            for path, vector in cached.items()
+        }
 
-        # Normalize to unit sphere
-        features = F.normalize(features, dim=0)
+        missing = [path for path in image_paths if str(path) not in cached]
+        if missing:
+            extracted = self.extract_features([str(path) for path in missing])
+            if self.feature_store is not None:
+                self.feature_store.put_many(missing, extracted.cpu().numpy())
+            for path, feature in zip(missing, extracted):
+                features[str(path)] = feature
 
         return features
 
@@ -170,7 +361,11 @@ class VisualService:
         3. Aggregate weighted features into a single preference vector
         4. Pass through DynamicLearner to generate personalized embedding
         5. Compute ideal_vector as centroid of highly-rated images
-        6. Save everything to p1_visual_vector.json
+        6. Save everything as the user's p1_visual_vector
+
+        Steps 2, 3 and 5 go through CalibrationStats, which are saved next to
+        the vector so later rating changes can be applied incrementally
+        (see update_calibration).
 
         Args:
             user_id: Unique user identifier
@@ -184,77 +379,180 @@ class VisualService:
         if not ratings:
             raise ValueError("No ratings provided for calibration")
 
-        # Collect features and ratings
-        features_list = []
-        ratings_list = []
-        liked_features = []  # Ratings >= 4
-        disliked_features = []  # Ratings <= 2
-
-        for image_id, rating in ratings.items():
-            # Try to load real image
-            image_path = self.calibration_dir / f"{image_id}.jpg"
-            if not image_path.exists():
-                image_path = self.calibration_dir / f"{image_id}.png"
-
-            if image_path.exists():
-                # Real image exists - extract actual features
-                feature = self.extract_single_feature(str(image_path))
-            else:
-                # Demo mode - generate synthetic features
-                feature = self._generate_demo_features(image_id, rating)
+        with profiled_calibration("calibrate_user"), self.vector_store.user_lock(user_id):
+            return self._calibrate(user_id, ratings, gender, preference_target)
 
-            features_list.append(feature)
-            ratings_list.append(rating)
+    def update_calibration(
+        self,
+        user_id: str,
+        changes: Dict[str, int],
+        gender: Optional[str] = None,
+        preference_target: Optional[str] = None,
+        base_ratings: Optional[Dict[str, int]] = None
+    ) -> Dict:
+        """Add or change a few ratings of an already calibrated user.
 
-            # Categorize by rating for preference model
-            if rating >= 4:
-                liked_features.append(feature)
-            elif rating <= 2:
-                disliked_features.append(feature)
+        The user's saved CalibrationStats are updated with only the changed
+        images' features, so the work is proportional to the number of
+        changes, and the result is identical to calibrate_user over the
+        merged ratings. Falls back to that full recompute when the stats
+        are missing or were built with another backbone, or when a changed
+        image has a file but there is no feature store. Images without a file
+        get the same deterministic demo features as in a full recompute.
 
-        if not features_list:
+        Args:
+            user_id: Unique user identifier
+            changes: Dict mapping image_id to its new rating (1-5 stars)
+            gender: User's gender
+            preference_target: Gender preference for matching
+            base_ratings: The user's existing ratings, only used when no
+                stats have been saved yet
+
+        Returns:
+            Updated p1_visual_vector data structure
+        """
+        if not changes:
+            raise ValueError("No ratings provided for calibration")
+
+        with profiled_calibration("update_calibration"), self.vector_store.user_lock(user_id):
+            saved = self.vector_store.load_stats(user_id)
+            stats = CalibrationStats.from_dict(saved) if saved else None
+
+            image_paths = self.resolve_image_paths(changes)
+            features = {}
+            if (
+                stats is not None
+                and stats.model == self.backbone_version
+                and (self.feature_store is not None or not image_paths)
+            ):
+                image_features = self.get_image_features(list(image_paths.values()))
+                features = {
+                    image_id: image_features[str(path)].cpu().numpy()
+                    for image_id, path in image_paths.items()
+                }
+                missing = [image_id for image_id in changes if image_id not in image_paths]
+                features.update(zip(missing, demo_features(missing)))
+
+            if not features or any(
+                image_id in stats.ratings and not stats.matches(image_id, feature)
+                for image_id, feature in features.items()
+            ):
+                merged = dict(stats.ratings if stats is not None else base_ratings or {})
+                merged.update(changes)
+                return self._calibrate(user_id, merged, gender, preference_target)
+
+            with calibration_stage("aggregation"):
+                for image_id, rating in changes.items():
+                    stats.add(image_id, rating, features[image_id])
+            return self._finish_calibration(user_id, stats, gender, preference_target)
+
+    def _calibrate(
+        self,
+        user_id: str,
+        ratings: Dict[str, int],
+        gender: Optional[str],
+        preference_target: Optional[str]
+    ) -> Dict:
+        # Real images - served from the feature store, backbone only on misses
+        image_paths = self.resolve_image_paths(ratings)
+        real_features = self.get_image_features(list(image_paths.values()))
+        with calibration_stage("aggregation"):
+            stats = self.build_stats(ratings, image_paths, real_features)
+        return self._finish_calibration(user_id, stats, gender, preference_target)
+
+    def _finish_calibration(
+        self,
+        user_id: str,
+        stats: CalibrationStats,
+        gender: Optional[str],
+        preference_target: Optional[str]
+    ) -> Dict:
+        # Generate user-specific embedding using DynamicLearner
+        # The learner takes the preference signal and outputs personalized weights
+        aggregated = self.aggregate_features(stats)
+        with calibration_stage("learner"):
+            user_embedding = self.engine.user_weights(aggregated)
+        vector_data = self.build_vector_data(user_id, stats, user_embedding, gender, preference_target)
+
+        # Save the vector to user's profile directory and make it matchable
+        with calibration_stage("save"):
+            self.vector_store.save_stats(user_id, stats.to_dict())
+            self.save_vector(user_id, vector_data)
+            self.match_index.add_profile(user_id, vector_data)
+
+        if self.first_calibration_at is None:
+            self.first_calibration_at = time.perf_counter()
+
+        return vector_data
+
+    def resolve_image_paths(self, image_ids) -> Dict[str, Path]:
+        """Map rated image ids to calibration image files (via the catalog)."""
+        image_paths = {}
+        for image_id in image_ids:
+            image = self.catalog.get(image_id)
+            if image is not None:
+                image_paths[image_id] = self.catalog.path(image)
+        return image_paths
+
+    def build_stats(
+        self,
+        ratings: Dict[str, int],
+        image_paths: Dict[str, Path],
+        image_features: Dict[str, torch.Tensor]
+    ) -> CalibrationStats:
+        """Sufficient statistics of the ratings (demo features for images not on disk)."""
+        if not ratings:
             raise ValueError("No valid ratings for calibration")
 
-        # Stack features into batch tensor
-        features = torch.stack(features_list)  # Shape: (N, 512)
-        ratings_tensor = torch.tensor(ratings_list, dtype=torch.float32, device=self.device)
+        # Demo mode - synthetic features for every missing image in one batch
+        missing = [image_id for image_id in ratings if image_id not in image_paths]
+        demo = dict(zip(missing, demo_features(missing)))
+        features = np.stack([
+            demo[image_id] if image_id in demo else image_features[str(image_paths[image_id])].cpu().numpy()
+            for image_id in ratings
+        ])
 
-        # Normalize ratings to [0, 1] weights
-        # Rating 1 -> weight 0.0, Rating 5 -> weight 1.0
-        weights = (ratings_tensor - 1) / 4.0
+        stats = CalibrationStats(model=self.backbone_version)
+        stats.add_many(ratings, features)
+        return stats
 
-        # Compute weighted average of features
-        # This represents the user's aggregate preference signal
-        weights_expanded = weights.unsqueeze(1)  # Shape: (N, 1)
-        weighted_features = features * weights_expanded  # Shape: (N, 512)
-        aggregated_features = weighted_features.sum(dim=0, keepdim=True) / (weights.sum() + 1e-8)  # Shape: (1, 512)
+    def aggregate_features(self, stats: CalibrationStats) -> torch.Tensor:
+        """Rating-weighted mean of the features: the user's preference signal.
 
-        # Generate user-specific embedding using DynamicLearner
-        # The learner takes the preference signal and outputs personalized weights
-        with torch.no_grad():
-            user_embedding = self.learner.get_user_weights(aggregated_features)
+        Ratings are normalized to [0, 1] weights (1 -> 0.0, 5 -> 1.0).
 
-        # Compute ideal_vector as centroid of highly-rated (liked) images
-        ideal_vector = None
-        if liked_features:
-            liked_stack = torch.stack(liked_features)
-            ideal_vector = liked_stack.mean(dim=0)
+        Returns:
+            Tensor of shape (1, 512)
+        """
+        return torch.from_numpy(stats.aggregated()).to(self.device)
+
+    def build_vector_data(
+        self,
+        user_id: str,
+        stats: CalibrationStats,
+        user_embedding: torch.Tensor,
+        gender: Optional[str] = None,
+        preference_target: Optional[str] = None
+    ) -> Dict:
+        """Assemble the p1_visual_vector structure from calibration results."""
+        # ideal_vector is the centroid of highly-rated (liked) images
+        ideal_vector = stats.ideal_vector()
 
         # Calculate calibration confidence based on rating variance
         # High variance = decisive preferences = high confidence
-        calibration_confidence = self._calculate_confidence(ratings_list)
+        calibration_confidence = stats.confidence()
 
         # Detect attraction triggers (placeholder for trait classifier)
-        attraction_triggers = self._detect_triggers(liked_features, disliked_features)
+        attraction_triggers = self._detect_triggers(stats.liked_ids(), stats.disliked_ids())
 
         # Build the p1_visual_vector structure per spec
-        vector_data = {
+        return {
             "meta": {
                 "user_id": user_id,
                 "gender": gender or "unspecified",
                 "preference_target": preference_target or "unspecified",
                 "calibration_timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-                "images_rated": len(ratings)
+                "images_rated": len(stats)
             },
             "self_analysis": {
                 "embedding_vector": user_embedding.cpu().tolist(),
@@ -265,36 +563,16 @@ class VisualService:
                 }
             },
             "preference_model": {
-                "ideal_vector": ideal_vector.cpu().tolist() if ideal_vector is not None else [],
+                "ideal_vector": ideal_vector.tolist() if ideal_vector is not None else [],
                 "attraction_triggers": attraction_triggers,
                 "calibration_confidence": calibration_confidence
             }
         }
 
-        # Save the vector to user's profile directory
-        self.save_vector(user_id, vector_data)
-
-        return vector_data
-
-    def _calculate_confidence(self, ratings: List[int]) -> float:
-        """Calculate calibration confidence from rating distribution.
-
-        Higher variance in ratings indicates more decisive preferences,
-        which translates to higher confidence in the calibration.
-        """
-        if len(ratings) < 3:
-            return 0.5
-
-        import statistics
-        variance = statistics.variance(ratings)
-        # Normalize: max variance for 1-5 scale is ~4
-        confidence = min(variance / 2.0, 1.0)
-        return round(confidence, 2)
-
     def _detect_triggers(
         self,
-        liked_features: List[torch.Tensor],
-        disliked_features: List[torch.Tensor]
+        liked_images: List[str],
+        disliked_images: List[str]
     ) -> Dict:
         """Detect attraction triggers from liked/disliked patterns.
 
@@ -314,15 +592,9 @@ class VisualService:
             vector_data: The p1_visual_vector data structure
 
         Returns:
-            Path to the saved file
+            Path to the saved metadata file
         """
-        user_dir = self.profiles_dir / user_id
-        user_dir.mkdir(parents=True, exist_ok=True)
-
-        vector_path = user_dir / "p1_visual_vector.json"
-        with open(vector_path, "w") as f:
-            json.dump(vector_data, f, indent=2)
-
+        vector_path = self.vector_store.save(user_id, vector_data)
         print(f"Saved visual vector for user {user_id} to {vector_path}")
         return vector_path
 
@@ -335,39 +607,101 @@ class VisualService:
         Returns:
             Vector data or None if not found
         """
-        vector_path = self.profiles_dir / user_id / "p1_visual_vector.json"
-        if not vector_path.exists():
-            return None
+        return self.vector_store.load(user_id)
+
+    @staticmethod
+    def _image_metadata(image) -> Dict:
+        return {
+            "id": image.id,
+            "filename": image.filename,
+            "url": f"/api/calibration/images/{image.filename}",
+            "width": image.width,
+            "height": image.height,
+            "gender": image.gender,
+            "cluster": image.cluster,
+            "version": image.sha256[:16]
+        }
+
+    def calibration_candidates(self) -> CandidateSet:
+        """Backbone features of every catalog image, as a CandidateSet.
+
+        Built through the feature store and cached until the catalog or the
+        backbone changes.
+        """
+        version = f"{self.backbone_version}:{self.catalog.version}"
+        with self._candidates_lock:
+            if self._candidates is None or self._candidates.version != version:
+                images = self.catalog.images()
+                paths = [self.catalog.path(image) for image in images]
+                features = self.get_image_features(paths)
+                matrix = np.stack([features[str(p)].cpu().numpy() for p in paths]) if paths else np.empty((0, 512))
+                self._candidates = CandidateSet([image.id for image in images], matrix, version=version)
+            return self._candidates
+
+    def next_calibration_images(self, ratings: Dict[str, int], count: int = 10, seed: int = 0) -> Dict:
+        """The calibration images a user should rate next (active learning).
 
-        with open(vector_path, "r") as f:
-            return json.load(f)
+        Args:
+            ratings: The user's ratings so far
+            count: Images to return
+            seed: Per-user seed of the selection order
+
+        Returns:
+            Dict with "images" (metadata dicts), "remaining" (unrated
+            images still worth rating) and "uncertainty" (mean rating std
+            over them)
+        """
+        candidates = self.calibration_candidates()
+        with self._candidates_lock:
+            if self._selector is None or self._selector.version != candidates.version:
+                clusters = [self.catalog.get(image_id).cluster for image_id in candidates.ids.tolist()]
+                self._selector = ActiveSelector(candidates, clusters=clusters)
+            selector = self._selector
+
+        result = selector.select(ratings, count=count, seed=seed)
+        images = []
+        for pick in result.picks:
+            image = self._image_metadata(self.catalog.get(pick.id))
+            image["predicted_rating"] = round(pick.predicted_rating, 2)
+            image["uncertainty"] = round(pick.uncertainty, 2)
+            images.append(image)
+        return {
+            "images": images,
+            "remaining": result.remaining,
+            "uncertainty": round(result.uncertainty, 3)
+        }
 
-    def get_calibration_images(self, count: int = 20) -> List[Dict]:
+    def get_calibration_images(
+        self,
+        count: int = 20,
+        offset: int = 0,
+        stratify: Optional[str] = None,
+        seed: Optional[int] = None
+    ) -> List[Dict]:
         """Get a list of calibration images for rating.
 
         If no real images exist, returns demo placeholder references.
 
         Args:
             count: Number of images to return
+            offset: Start of the page (filename order); ignored when sampling
+            stratify: Tag to spread a random sample over ("gender" or
+                "cluster"); None returns a page
+            seed: Seed for a reproducible sample
 
         Returns:
             List of image metadata dicts
         """
-        images = []
+        if stratify:
+            selected = self.catalog.sample(count, stratify=stratify, seed=seed)
+        else:
+            selected = self.catalog.page(offset, count)
 
-        # Check for real images first
-        if self.calibration_dir.exists():
-            real_images = list(self.calibration_dir.glob("*.[jp][pn][g]"))
-            for img_path in sorted(real_images)[:count]:
-                images.append({
-                    "id": img_path.stem,
-                    "filename": img_path.name,
-                    "url": f"/api/calibration/images/{img_path.name}"
-                })
+        images = [self._image_metadata(image) for image in selected]
 
         # If no real images, use Unsplash portrait photos (free, no API key needed)
         # Using source.unsplash.com which handles redirects for short IDs
-        if not images:
+        if not images and not len(self.catalog):
             # Curated portrait photo IDs from Unsplash (short IDs/slugs)
             unsplash_portraits = [
                 "rDEOVtE7vOs", "mEZ3PoFGs_k", "sibVwORYqs0", "d2MSDujJl2g",
@@ -0,0 +1,53 @@
+"""Shared test setup.
+
+Run from backend/:
+    python -m pytest -q
+
+App modules read their configuration at import, so the environment is
+pointed at a scratch data directory before any of them are imported.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="harmonia-tests-")
+os.environ["MODEL_ARTIFACT_DIR"] = os.path.join(os.environ["DATA_DIR"], "no-artifacts")
+os.environ["PRELOAD_MODELS"] = "false"
+
+
+@pytest.fixture(scope="session")
+def visual_service(tmp_path_factory):
+    """A VisualService over a few real calibration images.
+
+    The backbone is untrained (no ImageNet download); the tests compare code
+    paths against each other, not feature quality.
+    """
+    from PIL import Image
+
+    from models import ResNetBackbone
+    from services import visual_service as module
+
+    data_dir = tmp_path_factory.mktemp("data")
+    calibration_dir = data_dir / "global_calibration"
+    calibration_dir.mkdir()
+    rng = np.random.default_rng(0)
+    for i in range(12):
+        pixels = rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(calibration_dir / f"real_{i}.png")
+
+    patch = pytest.MonkeyPatch()
+    patch.setattr(module, "ResNetBackbone", lambda pretrained=True: ResNetBackbone(pretrained=False))
+    module.VisualService._instance = None
+    service = module.VisualService(data_dir=str(data_dir), device="cpu", artifact_dir=None)
+    yield service
+
+    service.scheduler.close()
+    module.VisualService._instance = None
+    patch.undo()
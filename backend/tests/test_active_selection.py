@@ -0,0 +1,117 @@
+"""Active-learning selection of calibration images."""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from auth import get_current_user
+from database import get_async_db
+from routers import calibration
+from services.active_selection import ActiveSelector
+from services.candidate_scoring import CandidateSet
+
+
+def two_cluster_set(sizes=(12, 6), dim=8, seed=0) -> CandidateSet:
+    """Images in tight clusters around orthogonal directions."""
+    rng = np.random.default_rng(seed)
+    rows, ids = [], []
+    for cluster, size in enumerate(sizes):
+        center = np.eye(dim)[cluster] * 10
+        rows.append(center + rng.standard_normal((size, dim)) * 0.1)
+        ids += [f"c{cluster}_{i}" for i in range(size)]
+    return CandidateSet(ids, np.concatenate(rows))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_every_prefix_is_stratified(seed):
+    sizes = (12, 6, 3)
+    selector = ActiveSelector(two_cluster_set(sizes), clusters=[0] * 12 + [1] * 6 + [2] * 3)
+    order = selector.order(seed)
+    assert sorted(order.tolist()) == list(range(21))
+    counts = np.zeros(3)
+    for length, row in enumerate(order, start=1):
+        counts[selector.clusters[row]] += 1
+        assert np.all(np.abs(counts - length * np.array(sizes) / 21) < 1 + 1e-9)
+    # The same seed gives the same order; users get different ones
+    assert selector.order(seed).tolist() == order.tolist()
+    assert selector.order(seed + 100).tolist() != order.tolist()
+
+
+def test_untagged_images_are_clustered_by_features():
+    selector = ActiveSelector(two_cluster_set(), n_clusters=2)
+    assert len(set(selector.clusters[:12])) == 1 and len(set(selector.clusters[12:])) == 1
+    assert selector.clusters[0] != selector.clusters[12]
+
+
+def test_disliked_clusters_are_skipped():
+    selector = ActiveSelector(two_cluster_set(), clusters=[0] * 12 + [1] * 6)
+    start = selector.select({}, count=100)
+    assert start.remaining == 18 and len(start.picks) == 18
+
+    disliked = {f"c0_{i}": 1 for i in range(3)}
+    after = selector.select(disliked, count=100)
+    assert {pick.id for pick in after.picks} == {f"c1_{i}" for i in range(6)}
+    assert after.remaining == 6
+    assert all(pick.uncertainty <= 2 for pick in after.picks)
+
+    # Centered, the two clusters point in opposite directions: liking one
+    # predicts disliking the other
+    liked = selector.select({f"c0_{i}": 5 for i in range(3)}, count=100)
+    assert {pick.id for pick in liked.picks} == {f"c0_{i}" for i in range(3, 12)}
+    assert min(pick.predicted_rating for pick in liked.picks) > 3.5
+    assert selector.select({"unknown": 1}, count=3).remaining == 18
+
+
+class FakeService:
+    """Records whether it was reached from the event loop."""
+
+    def __init__(self):
+        self.calls = []
+        self.vector_store = SimpleNamespace(has_stats=self.record("has_stats", True),
+                                            load_stats=self.record("load_stats", {"ratings": {}}))
+        self.next_calibration_images = self.record(
+            "next_calibration_images", {"images": [], "remaining": 0, "uncertainty": 0.0}
+        )
+        self.get_calibration_images = self.record("get_calibration_images", [])
+
+    def record(self, name, result):
+        def call(*args, **kwargs):
+            self.calls.append((name, on_event_loop()))
+            return result
+        return call
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_calibration_routes_load_the_service_off_the_loop(monkeypatch):
+    service = FakeService()
+
+    def get_visual_service():
+        service.calls.append(("get_visual_service", on_event_loop()))
+        return service
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(calibration, "get_visual_service", get_visual_service)
+    app = FastAPI()
+    app.include_router(calibration.router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="user-1", calibration_complete=True)
+    app.dependency_overrides[get_async_db] = no_db
+    client = TestClient(app)
+
+    assert client.get("/api/calibration/next").status_code == 200
+    assert client.get("/api/calibration/images").status_code == 200
+    assert {name for name, _ in service.calls} == {
+        "get_visual_service", "has_stats", "load_stats", "next_calibration_images", "get_calibration_images"
+    }
+    assert not any(on_loop for _, on_loop in service.calls)
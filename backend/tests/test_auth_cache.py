@@ -0,0 +1,86 @@
+"""Verified-token and user caches on the authentication path."""
+import asyncio
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from auth_cache import LRUCache, token_cache, user_cache
+
+
+def test_lru_evicts_least_recently_used_and_expires(monkeypatch):
+    cache = LRUCache(2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    now = time.monotonic()
+    monkeypatch.setattr("auth_cache.time.monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 2
+
+
+def test_loads_that_raced_an_invalidation_are_not_stored():
+    cache = LRUCache(10)
+    generation = cache.generation
+    cache.invalidate("other")
+    cache.put("a", "stale", generation)
+    assert cache.get("a") is None
+    cache.put("a", "fresh", cache.generation)
+    assert cache.get("a") == "fresh"
+    assert len(LRUCache(0)) == 0
+
+
+def test_tokens_are_verified_once_until_they_expire(monkeypatch):
+    token = auth.create_access_token({"sub": "user-1"})
+    decodes = []
+    decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+
+    assert auth.decode_token(token).user_id == "user-1"
+    assert auth.decode_token(token).user_id == "user-1"
+    assert len(decodes) == 1
+
+    expired = auth.create_access_token({"sub": "user-1"}, expires_delta=timedelta(seconds=-1))
+    token_cache.put(expired, ("user-1", time.time() - 1))
+    with pytest.raises(HTTPException) as excinfo:
+        auth.decode_token(expired)
+    assert excinfo.value.status_code == 401
+    assert token_cache.get(expired) is None
+
+
+def test_cached_users_are_invalidated_by_commits():
+    from database import AsyncSessionLocal, init_db
+    from db_models import User
+
+    init_db()
+    tag = uuid.uuid4().hex[:8]
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            user = User(email=f"{tag}@example.com", username=tag, password_hash="-", gender="female")
+            db.add(user)
+            await db.commit()
+            user_id = user.id
+
+        async with AsyncSessionLocal() as db:
+            assert (await auth.load_user(db, user_id)).gender == "female"
+        hits = user_cache.hits
+        async with AsyncSessionLocal() as db:
+            cached = await auth.load_user(db, user_id)
+            assert user_cache.hits == hits + 1
+            # A cached user can be changed and committed like a loaded one
+            cached.gender = "male"
+            await db.commit()
+        assert user_cache.get(user_id) is None
+
+        async with AsyncSessionLocal() as db:
+            assert (await auth.load_user(db, user_id)).gender == "male"
+            assert await auth.load_user(db, "no-such-user") is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,106 @@
+"""Incremental calibration must match a full recompute exactly."""
+import json
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from services.calibration_stats import CalibrationStats
+
+SECTIONS = (
+    ("self_analysis", "embedding_vector"),
+    ("preference_model", "ideal_vector"),
+    ("preference_model", "calibration_confidence"),
+    ("meta", "images_rated")
+)
+
+
+def random_features(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Unit-scale features, or ones spanning wide exponents with subnormals,
+    with some exact zeros (the int64 and arbitrary-precision paths)."""
+    features = rng.standard_normal((n, dim)).astype(np.float32)
+    features[rng.random((n, dim)) < 0.01] = 0.0
+    if rng.random() < 0.5:
+        features *= np.exp2(rng.integers(-30, 30, size=(n, 1))).astype(np.float32)
+        features[rng.random((n, dim)) < 0.001] = np.float32(1e-42)
+    return features
+
+
+def derived(stats: CalibrationStats):
+    ideal = stats.ideal_vector()
+    return (
+        stats.aggregated().tobytes(),
+        None if ideal is None else ideal.tobytes(),
+        stats.confidence(),
+        len(stats)
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_stats_match_full_rebuild(seed):
+    rng = np.random.default_rng(seed)
+    dim = 32
+    n_images = int(rng.integers(1, 30))
+    features = random_features(n_images, dim, rng)
+    incremental = CalibrationStats(dim=dim, model="test")
+    final: Dict[str, int] = {}
+
+    for _ in range(int(rng.integers(1, 60))):
+        image = int(rng.integers(n_images))
+        image_id = f"img_{image}"
+        if image_id in final and rng.random() < 0.2:
+            incremental.remove(image_id, features[image])
+            del final[image_id]
+        else:
+            rating = int(rng.integers(1, 6))
+            incremental.add(image_id, rating, features[image])
+            final[image_id] = rating
+
+        full = CalibrationStats(dim=dim, model="test")
+        full.add_many(final, features[[int(image_id[4:]) for image_id in final]])
+        assert derived(incremental) == derived(full)
+
+    restored = CalibrationStats.from_dict(json.loads(json.dumps(incremental.to_dict())))
+    assert derived(restored) == derived(incremental)
+    assert restored.ratings == incremental.ratings
+    assert restored.model == "test"
+    for image_id in final:
+        assert restored.matches(image_id, features[int(image_id[4:])])
+
+
+def test_matches_detects_changed_feature():
+    stats = CalibrationStats(dim=4)
+    feature = np.array([1.0, -2.0, 0.5, 0.0], dtype=np.float32)
+    stats.add("a", 5, feature)
+    assert stats.matches("a", feature)
+    assert not stats.matches("a", feature * 2)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_update_calibration_matches_calibrate_user(visual_service, monkeypatch, seed):
+    rng = np.random.default_rng(seed)
+    images = [f"real_{i}" for i in range(12)] + [f"demo_{i}" for i in range(10)]
+    user_id = f"test-incremental-{seed}"
+
+    ratings = {image_id: int(rng.integers(1, 6)) for image_id in rng.choice(images, size=6, replace=False)}
+    visual_service.calibrate_user(user_id, ratings)
+    merged = dict(ratings)
+
+    full_recomputes = []
+    calibrate = visual_service._calibrate
+    monkeypatch.setattr(visual_service, "_calibrate", lambda *args: full_recomputes.append(args) or calibrate(*args))
+
+    for _ in range(4):
+        # Re-rate some already rated images and add some new ones
+        changes = {image_id: int(rng.integers(1, 6))
+                   for image_id in rng.choice(images, size=int(rng.integers(1, 5)), replace=False)}
+        updated = visual_service.update_calibration(user_id, changes)
+        assert not full_recomputes, "update_calibration fell back to a full recompute"
+        merged.update(changes)
+
+        recomputed = visual_service.calibrate_user(f"{user_id}-full", merged)
+        full_recomputes.clear()
+        for section, key in SECTIONS:
+            assert updated[section][key] == recomputed[section][key], f"{section}.{key}"
+        saved = CalibrationStats.from_dict(visual_service.vector_store.load_stats(user_id))
+        assert saved.ratings == merged
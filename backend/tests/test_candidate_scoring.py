@@ -0,0 +1,70 @@
+"""Chunked top-k candidate scoring and the candidate registry cache."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from services.candidate_scoring import FEATURES_FILE, CandidateRegistry, CandidateScorer, CandidateSet
+
+
+def random_set(n: int, dim: int = 16, seed: int = 0) -> CandidateSet:
+    rng = np.random.default_rng(seed)
+    return CandidateSet([f"c{i}" for i in range(n)], rng.standard_normal((n, dim)))
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 50, 1000])
+def test_top_k_matches_brute_force(chunk_rows):
+    candidates = random_set(103)
+    weights = np.random.default_rng(1).standard_normal((4, 16)).astype(np.float32)
+    exclude = ["c3", "c50", "unknown"]
+    results = CandidateScorer(candidates, chunk_rows).top_k_many(weights, k=5, exclude=exclude)
+
+    scores = candidates.features @ weights.T
+    scores[[3, 50]] = -np.inf
+    for user, ranked in enumerate(results):
+        expected = np.argsort(-scores[:, user], kind="stable")[:5]
+        assert [candidate_id for candidate_id, _ in ranked] == [f"c{row}" for row in expected]
+        np.testing.assert_allclose([score for _, score in ranked], scores[expected, user], rtol=1e-5)
+
+
+def test_k_beyond_the_set_and_excluded_rows():
+    candidates = random_set(4)
+    scorer = CandidateScorer(candidates, chunk_rows=3)
+    assert len(scorer.top_k(np.ones(16), k=10)) == 4
+    assert [candidate_id for candidate_id, _ in scorer.top_k(np.ones(16), k=10, exclude=["c0", "c1", "c2"])] == ["c3"]
+    with pytest.raises(ValueError):
+        scorer.top_k(np.ones(8))
+
+
+def test_saved_sets_load_memory_mapped(tmp_path):
+    random_set(10).save(tmp_path / "people")
+    loaded = CandidateSet.load(tmp_path / "people")
+    # A view of the mapped file, not a copy in memory
+    assert not loaded.features.flags.owndata and not loaded.features.flags.writeable
+    np.testing.assert_array_equal(loaded.features, random_set(10).features)
+    assert loaded.ids.tolist() == [f"c{i}" for i in range(10)]
+
+
+def test_registry_reuses_scorers_until_the_set_changes(tmp_path):
+    service = SimpleNamespace(candidates=random_set(5, seed=1))
+    service.calibration_candidates = lambda: service.candidates
+    registry = CandidateRegistry(service, tmp_path)
+
+    images = registry.get("images")
+    assert registry.get("images") is images
+    service.candidates = random_set(6, seed=2)  # new images or backbone
+    assert registry.get("images") is not images
+    assert len(registry.get("images").candidates) == 6
+
+    random_set(3).save(tmp_path / "people")
+    people = registry.get("people")
+    assert registry.get("people") is people
+    random_set(8).save(tmp_path / "people")
+    features = tmp_path / "people" / FEATURES_FILE
+    stat = features.stat()
+    os.utime(features, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert len(registry.get("people").candidates) == 8
+
+    for name in ("missing", "../people", ".hidden"):
+        assert registry.get(name) is None
@@ -0,0 +1,40 @@
+"""DATABASE_URL translation for the asyncpg engine."""
+import ssl
+
+import pytest
+
+from database import _asyncpg_url
+
+
+def test_plain_url_only_swaps_the_driver():
+    assert _asyncpg_url("postgresql://app:pw@db:5432/harmonia") == \
+        ("postgresql+asyncpg://app:pw@db:5432/harmonia", {})
+    assert _asyncpg_url("postgresql+pg8000://app:pw@db/harmonia")[0] == "postgresql+asyncpg://app:pw@db/harmonia"
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("disable", False), ("prefer", "prefer"), ("require", "require"), ("verify-full", "verify-full")
+])
+def test_sslmode_becomes_the_ssl_connect_arg(mode, expected):
+    url, connect_args = _asyncpg_url(f"postgresql://app:pw@db/harmonia?sslmode={mode}")
+    assert url == "postgresql+asyncpg://app:pw@db/harmonia"
+    assert connect_args == {"ssl": expected}
+
+
+def test_root_certificate_builds_a_verifying_context():
+    cafile = ssl.get_default_verify_paths().cafile
+    if not cafile:
+        pytest.skip("no system CA bundle")
+    _, connect_args = _asyncpg_url(f"postgresql://db/harmonia?sslmode=verify-ca&sslrootcert={cafile}")
+    context = connect_args["ssl"]
+    assert isinstance(context, ssl.SSLContext)
+    assert context.verify_mode == ssl.CERT_REQUIRED
+    assert not context.check_hostname
+
+
+def test_other_libpq_params_are_translated_or_dropped():
+    url, connect_args = _asyncpg_url(
+        "postgresql://db/harmonia?connect_timeout=5&application_name=api&keepalives=1&channel_binding=prefer"
+    )
+    assert url == "postgresql+asyncpg://db/harmonia"
+    assert connect_args == {"timeout": 5.0, "server_settings": {"application_name": "api"}}
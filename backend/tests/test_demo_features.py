@@ -0,0 +1,54 @@
+"""Deterministic demo features for images without a file."""
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from services.demo_features import demo_features
+
+
+def test_each_id_gets_its_own_fixed_vector_in_any_batch():
+    ids = [f"demo_{i}" for i in range(50)]
+    features = demo_features(ids)
+    assert features.shape == (50, 512) and features.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(features, axis=1), 1.0, rtol=1e-5)
+    # Independent of the other ids in the call and their order
+    np.testing.assert_array_equal(demo_features(ids[::-1])[::-1], features)
+    np.testing.assert_array_equal(demo_features(["demo_7"])[0], features[7])
+    assert demo_features([]).shape == (0, 512)
+    # Distinct ids don't share a vector (or overlapping counter streams)
+    similarity = features @ features.T
+    assert np.abs(similarity[~np.eye(50, dtype=bool)]).max() < 0.3
+
+
+def test_global_rngs_are_left_alone():
+    np.random.seed(1)
+    torch.manual_seed(1)
+    before = (np.random.get_state()[1].copy(), torch.get_rng_state().clone())
+    demo_features(["demo_0", "demo_1"])
+    assert np.array_equal(np.random.get_state()[1], before[0])
+    assert torch.equal(torch.get_rng_state(), before[1])
+
+
+def test_same_vectors_in_another_process():
+    code = (
+        "import sys; sys.path.insert(0, '.');"
+        "from services.demo_features import demo_features;"
+        "sys.stdout.buffer.write(demo_features(['demo_3', 'x']).tobytes())"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True,
+        cwd=Path(__file__).resolve().parent.parent, env={"PYTHONHASHSEED": "123"}
+    ).stdout
+    np.testing.assert_array_equal(np.frombuffer(output, dtype=np.float32).reshape(2, 512),
+                                  demo_features(["demo_3", "x"]))
+
+
+def test_components_look_gaussian():
+    features = demo_features([f"demo_{i}" for i in range(200)]) * np.sqrt(512)
+    assert abs(features.mean()) < 0.02
+    assert abs(features.std() - 1) < 0.02
+    # Box-Muller tails: about 0.27% of samples beyond 3 sigma
+    assert 0.001 < np.mean(np.abs(features) > 3) < 0.005
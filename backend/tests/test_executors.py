@@ -0,0 +1,99 @@
+"""BoundedExecutor admission control and its 503 mapping."""
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from executors import BoundedExecutor, PoolSaturated
+
+
+async def saturate(executor: BoundedExecutor, release: threading.Event, jobs: int):
+    """Start ``jobs`` runs that block until ``release`` is set."""
+    started = [asyncio.create_task(executor.run(release.wait)) for _ in range(jobs)]
+    await asyncio.sleep(0)  # let every task take its slot
+    return started
+
+
+def test_rejects_beyond_workers_and_queue():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1, retry_after=7)
+        release = threading.Event()
+        try:
+            running = await saturate(executor, release, 2)
+            with pytest.raises(PoolSaturated) as excinfo:
+                await executor.run(lambda: None)
+            assert excinfo.value.retry_after == 7
+            assert executor.stats() == {
+                "name": "test", "max_workers": 1, "max_queue": 1,
+                "in_flight": 2, "queued": 1, "completed": 0, "rejected": 1
+            }
+
+            release.set()
+            assert await asyncio.gather(*running) == [True, True]
+            # Capacity is back once the jobs finish
+            assert await executor.run(sum, [1, 2]) == 3
+            assert executor.stats()["completed"] == 3
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_job_keeps_its_slot_until_it_finishes():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        release = threading.Event()
+        try:
+            running, = await saturate(executor, release, 1)
+            running.cancel()
+            await asyncio.sleep(0)
+            with pytest.raises(PoolSaturated):
+                await executor.run(lambda: None)
+
+            release.set()
+            for _ in range(100):
+                if executor.stats()["in_flight"] == 0:
+                    break
+                await asyncio.sleep(0.01)
+            assert await executor.run(lambda: "ok") == "ok"
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_saturated_hashing_pool_maps_to_503_with_retry_after(monkeypatch):
+    async def scenario():
+        executor = BoundedExecutor("test-hashing", max_workers=1, max_queue=0, retry_after=3)
+        monkeypatch.setattr(auth, "password_executor", executor)
+        release = threading.Event()
+        try:
+            await saturate(executor, release, 1)
+            with pytest.raises(HTTPException) as excinfo:
+                await auth.verify_password_async("password", auth.get_password_hash("password"))
+            assert excinfo.value.status_code == 503
+            assert excinfo.value.headers == {"Retry-After": "3"}
+        finally:
+            release.set()
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_failed_submit_gives_its_slot_back():
+    async def scenario():
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        executor.shutdown()
+        for _ in range(3):
+            # Each attempt fails at submit, not with PoolSaturated
+            with pytest.raises(RuntimeError):
+                await executor.run(lambda: None)
+        assert executor.stats()["in_flight"] == 0
+        assert executor.stats()["completed"] == 0
+        assert executor.stats()["rejected"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+"""FeatureStore: content addressing, versioning and sharing across workers."""
+import os
+
+import numpy as np
+
+from services.feature_store import FeatureStore
+
+
+def write(path, content: bytes):
+    path.write_bytes(content)
+    return path
+
+
+def test_rows_are_keyed_by_content_not_name(tmp_path):
+    store = FeatureStore(tmp_path / "features", "w1", dim=4)
+    a = write(tmp_path / "a.jpg", b"same bytes")
+    b = write(tmp_path / "b.jpg", b"same bytes")
+    store.put_many([a], np.array([[1, 2, 3, 4]]))
+
+    hits = store.get_many([a, b])
+    np.testing.assert_array_equal(hits[str(b)], [1, 2, 3, 4])
+    store.put_many([b], np.array([[9, 9, 9, 9]]))
+    assert len(store) == 1
+
+    # Rewriting a file (new size/mtime) re-hashes it
+    write(a, b"edited bytes")
+    os.utime(a, ns=(0, a.stat().st_mtime_ns + 10**9))
+    assert str(a) not in store.get_many([a])
+
+
+def test_other_weights_version_starts_empty(tmp_path):
+    image = write(tmp_path / "a.jpg", b"x")
+    FeatureStore(tmp_path / "features", "w1", dim=2).put_many([image], np.ones((1, 2)))
+    assert FeatureStore(tmp_path / "features", "w2", dim=2).get_many([image]) == {}
+    assert len(FeatureStore(tmp_path / "features", "w1", dim=2)) == 1
+
+
+def test_rows_span_shards_and_are_seen_by_other_workers(tmp_path):
+    images = [write(tmp_path / f"{i}.jpg", bytes([i])) for i in range(5)]
+    reader = FeatureStore(tmp_path / "features", "w1", dim=3, rows_per_shard=2)
+    writer = FeatureStore(tmp_path / "features", "w1", dim=3, rows_per_shard=2)
+    assert reader.get_many(images) == {}
+
+    features = np.arange(15, dtype=np.float32).reshape(5, 3)
+    writer.put_many(images[:3], features[:3])
+    writer.put_many(images[3:], features[3:])
+    assert sorted(p.name for p in (tmp_path / "features").glob("*/rows-*.bin")) == \
+        ["rows-00000.bin", "rows-00001.bin", "rows-00002.bin"]
+
+    hits = reader.get_many(images)
+    for image, feature in zip(images, features):
+        np.testing.assert_array_equal(hits[str(image)], feature)
+
+
+def test_build_extracts_only_missing_images(tmp_path):
+    images = [write(tmp_path / f"{i}.jpg", bytes([i])) for i in range(5)]
+    store = FeatureStore(tmp_path / "features", "w1", dim=2)
+    store.put_many(images[:2], np.zeros((2, 2)))
+    batches = []
+
+    def extract(paths):
+        batches.append(paths)
+        return np.ones((len(paths), 2))
+
+    assert store.build(images, extract, batch_size=2) == 3
+    assert batches == [[str(images[2]), str(images[3])], [str(images[4])]]
+    assert store.build(images, extract) == 0
+    assert len(store) == 5
+
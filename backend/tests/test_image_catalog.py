@@ -0,0 +1,125 @@
+"""Calibration image catalog: rescans only on change, off the event loop."""
+import asyncio
+import os
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import main
+from services import image_catalog
+from services.image_catalog import ImageCatalog
+
+
+def write_image(directory, name: str, seed: int = 0) -> None:
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(8, 6, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(directory / name)
+    touch(directory)
+
+
+def touch(path) -> None:
+    # Directory mtimes are coarse (a kernel tick); move it on explicitly
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Filenames passed to file_sha256, i.e. the images a scan opened."""
+    names = []
+    original = image_catalog.file_sha256
+    monkeypatch.setattr(image_catalog, "file_sha256", lambda path: names.append(path.name) or original(path))
+    return names
+
+
+@pytest.fixture
+def calibration_dir(tmp_path):
+    directory = tmp_path / "global_calibration"
+    directory.mkdir()
+    write_image(directory, "male_1.jpg", 1)
+    write_image(directory, "female_1.png", 2)
+    return directory
+
+
+def test_lookups_scan_once_and_rescan_only_new_files(calibration_dir, hashed):
+    catalog = ImageCatalog(calibration_dir)
+    assert [image.id for image in catalog.images()] == ["female_1", "male_1"]
+    assert catalog.get("male_1").gender == "male"
+    assert (catalog.get("male_1").width, catalog.get("male_1").height) == (6, 8)
+    assert catalog.scans == 1
+    assert sorted(hashed) == ["female_1.png", "male_1.jpg"]
+
+    version = catalog.version
+    write_image(calibration_dir, "male_2.jpg", 3)
+    assert len(catalog) == 3
+    assert catalog.scans == 2
+    assert hashed[2:] == ["male_2.jpg"]
+    assert catalog.version != version
+
+    (calibration_dir / "female_1.png").unlink()
+    touch(calibration_dir)
+    assert catalog.get("female_1") is None
+    assert len(hashed) == 3
+
+
+def test_restart_reuses_the_persisted_index(calibration_dir, hashed):
+    assert len(ImageCatalog(calibration_dir)) == 2
+    hashed.clear()
+    restarted = ImageCatalog(calibration_dir)
+    assert len(restarted) == 2
+    assert hashed == []
+    assert restarted.content_hash(calibration_dir / "male_1.jpg") == image_catalog.file_sha256(
+        calibration_dir / "male_1.jpg"
+    )
+
+
+def test_tags_file_changes_are_picked_up(calibration_dir):
+    catalog = ImageCatalog(calibration_dir)
+    catalog.set_tags({"male_1": {"cluster": 4}})
+    assert catalog.get("male_1").cluster == 4
+
+    # Edited by hand, outside set_tags
+    catalog.tags_path.write_text('{"male_1": {"gender": "female"}}')
+    touch(catalog.tags_path)
+    assert catalog.get("male_1").gender == "female"
+    assert catalog.get("male_1").cluster is None
+
+
+def test_setup_status_counts_images_off_the_event_loop(monkeypatch, calibration_dir):
+    monkeypatch.setenv("DATA_DIR", str(calibration_dir.parent))
+    threads = []
+
+    def catalog_size(directory):
+        threads.append(threading.current_thread())
+        return len(ImageCatalog(directory))
+
+    monkeypatch.setattr(main, "_catalog_size", catalog_size)
+    assert asyncio.run(main.check_setup_status()) == {"ready": False, "count": 2}
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_stratified_sample_shares_evenly_and_is_reproducible(tmp_path):
+    directory = tmp_path / "global_calibration"
+    directory.mkdir()
+    # 8 male, 3 female, 2 untagged
+    names = [f"male_{i}.png" for i in range(8)] + [f"female_{i}.png" for i in range(3)] + ["x_0.png", "x_1.png"]
+    for seed, name in enumerate(names):
+        write_image(directory, name, seed)
+    catalog = ImageCatalog(directory)
+
+    def genders(sample):
+        return sorted(str(image.gender) for image in sample)
+
+    assert genders(catalog.sample(6, seed=1)) == ["None"] * 2 + ["female"] * 2 + ["male"] * 2
+    # Small strata are used up and their share goes to the others
+    assert genders(catalog.sample(10, seed=1)) == ["None"] * 2 + ["female"] * 3 + ["male"] * 5
+    assert len(catalog.sample(100)) == 13
+    assert [image.id for image in catalog.sample(6, seed=7)] == [image.id for image in catalog.sample(6, seed=7)]
+    assert len({image.id for image in catalog.sample(6, seed=7)}) == 6
+
+    catalog.set_tags({f"male_{i}": {"cluster": i % 2} for i in range(8)})
+    by_cluster = [image.cluster for image in catalog.sample(6, stratify="cluster", seed=0)]
+    assert sorted(by_cluster, key=str) == [0, 0, 1, 1, None, None]
+    with pytest.raises(ValueError):
+        catalog.sample(4, stratify="size")
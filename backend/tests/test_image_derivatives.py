@@ -0,0 +1,75 @@
+"""Width-bucketed calibration image derivatives and their caching headers."""
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from routers import calibration
+from services.image_derivatives import DerivativeCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    source_dir = tmp_path / "global_calibration"
+    source_dir.mkdir()
+    pixels = np.random.default_rng(0).integers(0, 256, size=(600, 800, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(source_dir / "real_0.jpg")
+    (tmp_path / "secret.jpg").write_bytes(b"outside")
+    return DerivativeCache(source_dir, tmp_path / "derivatives")
+
+
+@pytest.fixture
+def client(cache, monkeypatch):
+    monkeypatch.setattr(calibration, "derivative_cache", cache)
+    app = FastAPI()
+    app.include_router(calibration.router)
+    return TestClient(app)
+
+
+def test_widths_snap_up_to_buckets_and_never_upscale(cache):
+    assert [cache.bucket(w) for w in (1, 160, 161, 700, 5000)] == [160, 160, 320, 960, 1280]
+    source = cache.source_path("real_0.jpg")
+    small = cache.get(source, 300, "webp")
+    assert small.path.name == f"real_0.{small.version}.w320.webp"
+    assert Image.open(small.path).size == (320, 240)
+    assert Image.open(cache.get(source, 1000, "jpeg").path).size == (800, 600)
+    # Built once
+    mtime = small.path.stat().st_mtime_ns
+    assert cache.get(source, 320, "webp").path.stat().st_mtime_ns == mtime
+
+
+def test_source_paths_stay_inside_the_calibration_dir(cache):
+    assert cache.source_path("../secret.jpg") is None
+    assert cache.source_path("missing.jpg") is None
+
+
+def test_versioned_urls_are_immutable_and_etags_revalidate(client, cache):
+    version = cache.version(cache.source_path("real_0.jpg"))
+    response = client.get(f"/api/calibration/images/real_0.jpg?w=320&v={version}", headers={"Accept": "image/webp"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == calibration.IMMUTABLE_CACHE
+    assert response.headers["vary"] == "Accept"
+    etag = response.headers["etag"]
+
+    stale = client.get("/api/calibration/images/real_0.jpg?w=320&v=old", headers={"Accept": "image/webp"})
+    assert stale.headers["cache-control"] == calibration.REVALIDATE_CACHE
+
+    again = client.get("/api/calibration/images/real_0.jpg?w=320", headers={"Accept": "image/webp", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    jpeg = client.get("/api/calibration/images/real_0.jpg?w=320&fmt=jpeg")
+    assert jpeg.headers["content-type"] == "image/jpeg"
+    assert "vary" not in jpeg.headers
+    assert jpeg.headers["etag"] != etag
+
+
+def test_originals_and_errors(client):
+    original = client.get("/api/calibration/images/real_0.jpg")
+    assert original.status_code == 200
+    assert original.headers["content-type"] == "image/jpeg"
+    assert client.get("/api/calibration/images/real_0.jpg", headers={"Range": "bytes=0-9"}).status_code == 206
+    assert client.get("/api/calibration/images/missing.jpg").status_code == 404
+    assert client.get("/api/calibration/images/real_0.jpg?w=0").status_code == 400
@@ -0,0 +1,49 @@
+"""The ONNX engine must agree with the torch engine."""
+import importlib
+import os
+
+import pytest
+import torch
+
+from models import DynamicLearner, ResNetBackbone
+from services.inference_engines import OnnxEngine, TorchEngine, export_onnx, verify_onnx
+
+
+@pytest.fixture(scope="module")
+def models():
+    torch.manual_seed(0)
+    backbone = ResNetBackbone(pretrained=False).eval()
+    learner = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).eval()
+    return backbone, learner
+
+
+def require(module: str):
+    """Import an optional ONNX package; CI (REQUIRE_ONNX_TESTS) fails instead of skipping."""
+    if os.getenv("REQUIRE_ONNX_TESTS", "false").lower() == "true":
+        return importlib.import_module(module)
+    return pytest.importorskip(module)
+
+
+@pytest.fixture(scope="module")
+def onnx_engine(models, tmp_path_factory):
+    require("onnxruntime")
+    require("onnx")
+    out_dir = tmp_path_factory.mktemp("onnx")
+    files = export_onnx(*models, out_dir)
+    return OnnxEngine(out_dir / files["backbone"], out_dir / files["generator"])
+
+
+def test_onnx_engine_matches_torch(models, onnx_engine):
+    torch_engine = TorchEngine(*models)
+    generator = torch.Generator().manual_seed(1)
+    # Batch sizes other than the export's, through the dynamic batch axis
+    images = torch.randn(3, 3, 224, 224, generator=generator)
+    signals = torch.randn(5, 512, generator=generator)
+
+    torch.testing.assert_close(onnx_engine.backbone_forward(images), torch_engine.backbone_forward(images),
+                               atol=1e-3, rtol=1e-3)
+    torch.testing.assert_close(onnx_engine.user_weights(signals[:1]), torch_engine.user_weights(signals[:1]),
+                               atol=1e-4, rtol=1e-4)
+    torch.testing.assert_close(onnx_engine.batch_user_weights(signals), torch_engine.batch_user_weights(signals),
+                               atol=1e-4, rtol=1e-4)
+    verify_onnx(*models, onnx_engine)
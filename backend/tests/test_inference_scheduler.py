@@ -0,0 +1,97 @@
+"""BatchScheduler: merging concurrent callers into shared forward passes."""
+import threading
+import time
+
+import pytest
+import torch
+
+from services.inference_scheduler import BatchScheduler
+
+
+class RecordingModel:
+    """Doubles its input and records the batch sizes it was called with."""
+
+    def __init__(self, gate: threading.Event = None):
+        self.gate = gate
+        self.entered = threading.Event()
+        self.batches = []
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        self.entered.set()
+        if self.gate is not None:
+            assert self.gate.wait(timeout=10)
+        self.batches.append(len(batch))
+        return batch * 2
+
+
+def test_concurrent_callers_share_batches_and_get_their_own_rows():
+    gate = threading.Event()
+    model = RecordingModel(gate)
+    scheduler = BatchScheduler(model, max_batch_size=8, max_wait_ms=0)
+    try:
+        # The first item blocks the worker; the rest pile up behind it
+        first = scheduler.submit(torch.tensor([0.0]))
+        assert model.entered.wait(timeout=10)
+        results = {}
+
+        def caller(i):
+            results[i] = scheduler.infer(torch.full((2, 1), float(i)))
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(1, 4)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 10
+        while scheduler.stats()["queue_depth"] < 6 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        assert first.result().item() == 0.0
+        for i in range(1, 4):
+            torch.testing.assert_close(results[i], torch.full((2, 1), 2.0 * i))
+        assert model.batches == [1, 6]
+        stats = scheduler.stats()
+        assert (stats["batches"], stats["items"], stats["mean_batch_size"]) == (2, 7, 3.5)
+        assert stats["batch_size_histogram"] == {"1": 1, "8": 1}
+    finally:
+        gate.set()
+        scheduler.close()
+
+
+def test_batches_are_capped_at_max_batch_size():
+    gate = threading.Event()
+    model = RecordingModel(gate)
+    scheduler = BatchScheduler(model, max_batch_size=4, max_wait_ms=0)
+    try:
+        futures = [scheduler.submit(torch.tensor([float(i)])) for i in range(10)]
+        gate.set()
+        assert [future.result().item() for future in futures] == [2.0 * i for i in range(10)]
+        assert max(model.batches) <= 4 and sum(model.batches) == 10
+    finally:
+        gate.set()
+        scheduler.close()
+
+
+def test_model_errors_reach_every_caller_in_the_batch():
+    def broken(batch):
+        raise ValueError("bad batch")
+
+    scheduler = BatchScheduler(broken, max_wait_ms=0)
+    try:
+        with pytest.raises(ValueError, match="bad batch"):
+            scheduler.infer(torch.zeros(3, 1))
+        # The worker survives a failed batch
+        scheduler.model = lambda batch: batch + 1
+        torch.testing.assert_close(scheduler.infer(torch.zeros(2, 1)), torch.ones(2, 1))
+    finally:
+        scheduler.close()
+
+
+def test_close_finishes_queued_work():
+    model = RecordingModel()
+    scheduler = BatchScheduler(model, max_wait_ms=0)
+    futures = [scheduler.submit(torch.tensor([1.0])) for _ in range(5)]
+    scheduler.close()
+    assert all(future.done() for future in futures)
+    assert not scheduler._thread.is_alive()
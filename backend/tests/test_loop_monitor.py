@@ -0,0 +1,39 @@
+"""LoopMonitor attributes stalls to the request that blocked the loop."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from loop_monitor import LoopMonitor, MonitorMiddleware
+
+
+def test_stall_is_attributed_to_the_blocking_request():
+    async def app(scope, receive, send):
+        if scope["path"] == "/block":
+            time.sleep(0.3)
+        else:
+            await asyncio.sleep(0.5)
+
+    async def scenario():
+        monitor = LoopMonitor(threshold_ms=100, interval_ms=20)
+        stalls = []
+        monitor._report = lambda stall, duration: stalls.append((stall, duration))
+        middleware = MonitorMiddleware(app, monitor)
+        monitor.start()
+        try:
+            requests = [
+                {"type": "http", "method": method, "path": path, "route": SimpleNamespace(path=path)}
+                for method, path in (("GET", "/idle"), ("POST", "/block"))
+            ]
+            await asyncio.gather(*(middleware(scope, None, None) for scope in requests))
+            await asyncio.sleep(0.1)  # let the heartbeat report the stall
+        finally:
+            await monitor.stop()
+        return monitor, stalls
+
+    monitor, stalls = asyncio.run(scenario())
+    assert len(stalls) == 1
+    stall, duration = stalls[0]
+    assert (stall["method"], stall["route"]) == ("POST", "/block")
+    assert duration >= 0.2
+    assert any(frame.name == "app" for frame in stall["stack"])
+    assert monitor.requests == {}
@@ -0,0 +1,130 @@
+"""Match index: exact search, first-open builds and filter re-indexing."""
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from services import match_index
+from services.match_index import MatchIndex, VectorIndex, build_index, get_match_index, update_profile_filters
+from services.vector_store import get_vector_store
+
+
+def profile(seed: int, gender: str, target: str):
+    rng = np.random.default_rng(seed)
+    return {
+        "meta": {"user_id": f"u{seed}", "gender": gender, "preference_target": target},
+        "self_analysis": {"embedding_vector": rng.standard_normal(512).astype(np.float32).tolist()},
+        "preference_model": {"ideal_vector": rng.standard_normal(512).astype(np.float32).tolist()}
+    }
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    store = get_vector_store(tmp_path / "profiles")
+    store.save("alice", profile(1, "female", "male"))
+    store.save("bob", profile(2, "male", "female"))
+    store.save("carl", profile(3, "male", "male"))
+    return tmp_path
+
+
+def test_exact_search_ranks_by_cosine_and_applies_mutual_filter(tmp_path):
+    index = VectorIndex(tmp_path / "index", dim=4)
+    index.upsert("a", [1, 0, 0, 0], "female", "male")
+    index.upsert("b", [0.9, 0.1, 0, 0], "male", "female")
+    index.upsert("c", [0.8, 0.2, 0, 0], "male", "male")
+    index.upsert("d", [0, 1, 0, 0], "male", None)
+
+    ranked = [user_id for user_id, _ in index.search([1, 0, 0, 0], k=4, mutual=False)]
+    assert ranked == ["a", "b", "c", "d"]
+    # A woman looking for men: men who want women or anyone
+    assert [user_id for user_id, _ in index.search([1, 0, 0, 0], k=4, gender="female", target="male",
+                                                    exclude="a")] == ["b", "d"]
+    # Journal replay: a fresh process sees the same rows
+    assert len(VectorIndex(tmp_path / "index", dim=4)) == 4
+
+
+def test_first_open_builds_from_profiles(data_dir, monkeypatch):
+    monkeypatch.setattr(match_index, "_indexes", {})
+    index = get_match_index(data_dir)
+    assert index.stats()["embedding"]["users"] == 3
+    assert [user_id for user_id, _ in index.match("alice", k=5, gender="female", target="male")] == ["bob"]
+    assert not list(data_dir.glob(".match_index.*"))
+
+
+def test_crash_mid_build_leaves_no_index_behind(data_dir, monkeypatch):
+    monkeypatch.setattr(match_index, "_indexes", {})
+
+    def crash(self, profiles_dir):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(MatchIndex, "rebuild", crash)
+        with pytest.raises(KeyboardInterrupt):
+            get_match_index(data_dir)
+    assert not (data_dir / "match_index").exists()
+    assert not list(data_dir.glob(".match_index.*"))
+
+    # The next start builds it from scratch
+    assert get_match_index(data_dir).stats()["embedding"]["users"] == 3
+
+
+def test_concurrent_build_keeps_the_first_index(data_dir):
+    root = data_dir / "match_index"
+    build_index(root, data_dir / "profiles")
+    get_vector_store(data_dir / "profiles").save("dora", profile(4, "female", "female"))
+    build_index(root, data_dir / "profiles")
+    assert MatchIndex(root).stats()["embedding"]["users"] == 3
+
+
+def test_update_profile_filters_reindexes(data_dir, monkeypatch):
+    monkeypatch.setattr(match_index, "_indexes", {})
+    index = get_match_index(data_dir)
+    assert [user_id for user_id, _ in index.match("alice", k=5, gender="female", target="male")] == ["bob"]
+
+    # carl now wants women: alice sees him, and his profile says so
+    assert update_profile_filters(data_dir, "carl", "male", "female")
+    assert sorted(user_id for user_id, _ in index.match("alice", k=5, gender="female", target="male")) == \
+        ["bob", "carl"]
+    store = get_vector_store(data_dir / "profiles")
+    assert store.load("carl")["meta"]["preference_target"] == "female"
+    assert store.load("carl")["self_analysis"] == profile(3, "male", "male")["self_analysis"]
+    # A rebuild from the profiles keeps the new filters
+    assert index.rebuild(data_dir / "profiles") == 3
+    assert "carl" in [user_id for user_id, _ in index.match("alice", k=5, gender="female", target="male")]
+
+    assert not update_profile_filters(data_dir, "nobody", "male", "female")
+    assert not (data_dir / "profiles" / "nobody").exists()
+
+
+def test_editing_a_users_filters_reindexes_them(monkeypatch):
+    from database import SessionLocal, init_db
+    from db_models import User
+    from routers import matches
+
+    init_db()
+    data_dir = Path(matches.DATA_DIR)
+    monkeypatch.setattr(match_index, "_indexes", {})
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        users = [User(email=f"{tag}{i}@example.com", username=f"{tag}{i}", password_hash="-",
+                      gender=gender, preference_target=target, calibration_complete=True)
+                 for i, (gender, target) in enumerate([("female", "male"), ("male", "male")])]
+        db.add_all(users)
+        db.commit()
+        searcher, other = users
+        store = get_vector_store(data_dir / "profiles")
+        for i, user in enumerate(users):
+            store.save(user.id, profile(10 + i, user.gender, user.preference_target))
+            get_match_index(data_dir).add_profile(user.id, store.load(user.id))
+        index = get_match_index(data_dir)
+        assert other.id not in [user_id for user_id, _ in index.match(searcher.id, gender="female", target="male")]
+
+        other.preference_target = "female"
+        db.commit()
+        matches.filter_updates.submit(lambda: None).result()
+        assert other.id in [user_id for user_id, _ in index.match(searcher.id, gender="female", target="male")]
+        assert store.load(other.id)["meta"]["preference_target"] == "female"
+    finally:
+        db.close()
@@ -0,0 +1,84 @@
+"""Metrics registry, exposition format and /api/metrics."""
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+from metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, MetricsMiddleware, Registry
+
+# One sample line of the text format: name{labels} value
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="(\\.|[^"\\])*",?)*\})? '
+                    r'(-?[0-9.e+-]+|\+Inf|-Inf|NaN)$')
+
+
+def test_histogram_text_format():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+    latency.labels('say "hi"\n').observe(0.05)
+    latency.labels('say "hi"\n').observe(0.5)
+    latency.labels("slow").observe(5)
+    registry.counter("jobs_total", "Jobs.", lambda: 3)
+    registry.gauge("skipped", "Not available.", lambda: None)
+    registry.gauge("broken", "Raises.", lambda: 1 / 0)
+
+    assert registry.render() == (
+        "# HELP op_seconds Op latency.\n"
+        "# TYPE op_seconds histogram\n"
+        'op_seconds_bucket{op="say \\"hi\\"\\n",le="0.1"} 1\n'
+        'op_seconds_bucket{op="say \\"hi\\"\\n",le="1.0"} 2\n'
+        'op_seconds_bucket{op="say \\"hi\\"\\n",le="+Inf"} 2\n'
+        'op_seconds_sum{op="say \\"hi\\"\\n"} 0.55\n'
+        'op_seconds_count{op="say \\"hi\\"\\n"} 2\n'
+        'op_seconds_bucket{op="slow",le="0.1"} 0\n'
+        'op_seconds_bucket{op="slow",le="1.0"} 0\n'
+        'op_seconds_bucket{op="slow",le="+Inf"} 1\n'
+        'op_seconds_sum{op="slow"} 5.0\n'
+        'op_seconds_count{op="slow"} 1\n'
+        "# HELP jobs_total Jobs.\n"
+        "# TYPE jobs_total counter\n"
+        "jobs_total 3.0\n"
+        "# HELP skipped Not available.\n"
+        "# TYPE skipped gauge\n"
+    )
+    with pytest.raises(ValueError):
+        registry.gauge("jobs_total", "Again.", lambda: 1)
+    with pytest.raises(ValueError):
+        latency.labels()
+
+
+def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/nowhere")
+
+    samples = HTTP_REQUEST_SECONDS.samples()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 3' in samples
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in samples
+    assert not any("/items/1" in line for line in samples)
+
+
+def test_metrics_endpoint(monkeypatch):
+    client = TestClient(main.app)
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE
+    lines = response.text.splitlines()
+    for name in ("http_request_duration_seconds", "calibration_stage_duration_seconds",
+                 "calibration_pool_in_flight", "password_hash_pool_rejected_total"):
+        assert f"# TYPE {name} " in response.text, name
+    assert all(line.startswith("# ") or SAMPLE.match(line) for line in lines), \
+        [line for line in lines if not line.startswith("# ") and not SAMPLE.match(line)]
+
+    monkeypatch.setattr(main, "METRICS_TOKEN", "scraper")
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer scraper"}).status_code == 200
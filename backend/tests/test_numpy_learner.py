@@ -0,0 +1,38 @@
+"""The NumPy generator must agree with the torch learner."""
+import pytest
+import torch
+
+from models import DynamicLearner
+from services.inference_engines import TorchEngine, verify_numpy_learner
+from services.numpy_learner import NumpyLearner
+
+
+@pytest.fixture(scope="module")
+def learner():
+    torch.manual_seed(0)
+    return DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).eval()
+
+
+def test_numpy_learner_matches_torch(learner):
+    fast_learner = NumpyLearner.from_torch(learner)
+    result = verify_numpy_learner(learner, fast_learner)
+    assert max(result.values()) <= 1e-4
+
+    signals = torch.randn(5, 512, generator=torch.Generator().manual_seed(1))
+    torch.testing.assert_close(
+        TorchEngine(None, learner, fast_learner=fast_learner).user_weights(signals[:1]),
+        TorchEngine(None, learner).user_weights(signals[:1]),
+        atol=1e-4, rtol=1e-4
+    )
+
+
+def test_numpy_learner_save_load_round_trip(learner, tmp_path):
+    fast_learner = NumpyLearner.from_torch(learner)
+    fast_learner.save(tmp_path / "learner.npz")
+    verify_numpy_learner(learner, NumpyLearner.load(tmp_path / "learner.npz"))
+
+
+def test_verify_numpy_learner_rejects_mismatch(learner):
+    other = DynamicLearner(in_dim=512, hidden_dim=256, out_dim=1).eval()
+    with pytest.raises(RuntimeError):
+        verify_numpy_learner(other, NumpyLearner.from_torch(learner))
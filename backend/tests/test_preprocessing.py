@@ -0,0 +1,55 @@
+"""Reduced-scale decode and the resized tensor cache."""
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from services import preprocessing
+from services.feature_store import FeatureStore
+from services.preprocessing import Preprocessor, build_transform, load_image
+
+
+@pytest.fixture
+def images(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i, (size, fmt) in enumerate([((960, 720), "JPEG"), ((300, 400), "PNG"), ((64, 48), "JPEG")]):
+        path = tmp_path / f"img_{i}.{fmt.lower()}"
+        Image.fromarray(rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)).save(path, fmt)
+        paths.append(str(path))
+    return paths
+
+
+def test_jpegs_decode_at_reduced_scale_but_never_below_input_size(images):
+    large, png, small = (load_image(path) for path in images)
+    assert large.size == (480, 360)  # 1/2 scale keeps both sides >= 224
+    assert png.size == (300, 400)
+    assert small.size == (64, 48)
+
+
+def test_matches_the_reference_transform(images):
+    transform = build_transform()
+    expected = torch.stack([transform(load_image(path)) for path in images])
+    torch.testing.assert_close(Preprocessor()(images), expected, atol=1e-6, rtol=0)
+
+
+def test_cached_tensors_skip_decoding(images, tmp_path, monkeypatch):
+    first = Preprocessor(cache_dir=tmp_path / "tensors")(images)
+
+    def no_decode(path, size=preprocessing.INPUT_SIZE):
+        raise AssertionError(f"decoded {path}")
+
+    monkeypatch.setattr(preprocessing, "load_image", no_decode)
+    # A new process reads the tensors the first one stored
+    torch.testing.assert_close(Preprocessor(cache_dir=tmp_path / "tensors")(images), first)
+
+
+def test_feature_store_holds_multidimensional_rows(tmp_path):
+    image = tmp_path / "a.jpg"
+    image.write_bytes(b"x")
+    store = FeatureStore(tmp_path / "tensors", "pre", row_shape=(3, 2, 2), dtype=np.float16)
+    tensor = np.random.default_rng(0).standard_normal((1, 3, 2, 2))
+    store.put_many([image], tensor)
+    hit = store.get_many([image])[str(image)]
+    assert hit.shape == (3, 2, 2) and hit.dtype == np.float16
+    np.testing.assert_allclose(hit, tensor[0], rtol=1e-3, atol=1e-3)
@@ -0,0 +1,84 @@
+"""Live profiling: operator-only access and the stack sampler."""
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+import profiling
+from profiling import ProfilerBusy, sample_stacks
+
+
+def request(headers=None) -> Request:
+    return Request({
+        "type": "http", "method": "POST", "path": "/api/admin/profile/cpu",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    })
+
+
+def status_of(req: Request):
+    try:
+        main._check_profiling_access(req)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def test_profiling_is_off_by_default():
+    assert main.PROFILING_ENABLED is False
+    assert status_of(request({"X-Profiling-Token": ""})) == 404
+
+
+@pytest.mark.parametrize("enabled, token, sent, expected", [
+    (True, "", "", 404),          # enabled without a token stays off
+    (True, "s3cret", None, 403),
+    (True, "s3cret", "wrong", 403),
+    (True, "s3cret", "s3cret", 200),
+    (False, "s3cret", "s3cret", 404)
+])
+def test_profiling_requires_the_operator_token(monkeypatch, enabled, token, sent, expected):
+    monkeypatch.setattr(main, "PROFILING_ENABLED", enabled)
+    monkeypatch.setattr(main, "PROFILING_TOKEN", token)
+    headers = {} if sent is None else {"X-Profiling-Token": sent}
+    assert status_of(request(headers)) == expected
+
+
+def busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_collapses_busy_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        result = sample_stacks(0.2, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result.samples > 0
+    lines = result.collapsed.splitlines()
+    assert any(line.startswith("busy-worker;") and "busy_loop" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_one_profile_at_a_time():
+    started = threading.Event()
+    results = []
+
+    def first():
+        started.set()
+        results.append(sample_stacks(0.3, interval_ms=5))
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    started.wait()
+    time.sleep(0.05)
+    with pytest.raises(ProfilerBusy):
+        sample_stacks(0.05)
+    thread.join()
+    assert results and not profiling._busy.locked()
@@ -0,0 +1,136 @@
+"""Calibration ratings: one upserted row per (user, image)."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, MetaData, String, Table, create_engine, insert, inspect, select
+from sqlalchemy.dialects import postgresql
+
+import database
+import db_models
+from db_models import CalibrationRating, rating_upserts
+from migrations.compact_calibration_ratings import UNIQUE_INDEX, compact, is_compacted
+
+table = CalibrationRating.__table__
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    table.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def upsert(engine, rows):
+    with engine.begin() as conn:
+        for statement in rating_upserts(engine.dialect.name, rows):
+            conn.execute(statement)
+
+
+def stored(engine):
+    with engine.begin() as conn:
+        rows = conn.execute(select(table.c.user_id, table.c.image_id, table.c.rating, table.c.created_at)).all()
+    return {(row.user_id, row.image_id): row for row in rows}
+
+
+def test_last_write_wins_within_one_call(engine):
+    upsert(engine, [
+        {"user_id": "u1", "image_id": "a", "rating": 1},
+        {"user_id": "u1", "image_id": "b", "rating": 2},
+        {"user_id": "u1", "image_id": "a", "rating": 5},
+        {"user_id": "u2", "image_id": "a", "rating": 3}
+    ])
+    assert {key: row.rating for key, row in stored(engine).items()} == {
+        ("u1", "a"): 5, ("u1", "b"): 2, ("u2", "a"): 3
+    }
+
+
+def test_last_write_wins_across_calls(engine):
+    upsert(engine, [{"user_id": "u1", "image_id": "a", "rating": 1}])
+    upsert(engine, [{"user_id": "u1", "image_id": "a", "rating": 4},
+                    {"user_id": "u1", "image_id": "b", "rating": 2}])
+    assert {key: row.rating for key, row in stored(engine).items()} == {("u1", "a"): 4, ("u1", "b"): 2}
+
+
+def test_unchanged_rating_is_not_rewritten(engine, monkeypatch):
+    first = datetime(2024, 1, 1)
+    monkeypatch.setattr(db_models, "utc_now", lambda: first)
+    upsert(engine, [{"user_id": "u1", "image_id": "a", "rating": 3},
+                    {"user_id": "u1", "image_id": "b", "rating": 3}])
+
+    later = first + timedelta(days=1)
+    monkeypatch.setattr(db_models, "utc_now", lambda: later)
+    upsert(engine, [{"user_id": "u1", "image_id": "a", "rating": 3},
+                    {"user_id": "u1", "image_id": "b", "rating": 4}])
+
+    rows = stored(engine)
+    assert (rows[("u1", "a")].rating, rows[("u1", "a")].created_at) == (3, first)
+    assert (rows[("u1", "b")].rating, rows[("u1", "b")].created_at) == (4, later)
+
+
+def test_large_submissions_are_split(engine, monkeypatch):
+    monkeypatch.setattr(db_models, "RATING_UPSERT_ROWS", 3)
+    rows = [{"user_id": "u1", "image_id": f"img{i}", "rating": i % 5 + 1} for i in range(7)]
+    assert len(rating_upserts("sqlite", rows)) == 3
+    upsert(engine, rows)
+    assert len(stored(engine)) == 7
+
+
+def test_postgresql_statement_is_conditional_upsert():
+    statement, = rating_upserts("postgresql", [{"user_id": "u1", "image_id": "a", "rating": 3}])
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (user_id, image_id) DO UPDATE" in sql
+    assert "WHERE calibration_ratings.rating != excluded.rating" in sql
+
+
+def legacy_table(engine) -> Table:
+    """calibration_ratings as it was before the upsert: VARCHAR ratings, no unique index."""
+    legacy = Table(
+        "calibration_ratings", MetaData(),
+        Column("id", String(36), primary_key=True),
+        Column("user_id", String(36), nullable=False),
+        Column("image_id", String(100), nullable=False),
+        Column("rating", String(1), nullable=False),
+        Column("created_at", DateTime(timezone=True))
+    )
+    legacy.create(engine)
+    return legacy
+
+
+def test_compaction_keeps_latest_rating_per_image():
+    engine = create_engine("sqlite://")
+    legacy = legacy_table(engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(legacy), [
+            {"id": "1", "user_id": "u1", "image_id": "a", "rating": "2", "created_at": start},
+            {"id": "2", "user_id": "u1", "image_id": "a", "rating": "5", "created_at": start + timedelta(hours=1)},
+            {"id": "3", "user_id": "u1", "image_id": "b", "rating": "1", "created_at": start},
+            # Same created_at: the larger id wins
+            {"id": "4", "user_id": "u2", "image_id": "a", "rating": "3", "created_at": start},
+            {"id": "5", "user_id": "u2", "image_id": "a", "rating": "4", "created_at": start}
+        ])
+
+    assert not is_compacted(engine)
+    assert compact(engine, dry_run=True) == {"migrated": False, "rows_before": 5, "rows_after": 3}
+    assert compact(engine) == {"migrated": True, "rows_before": 5, "rows_after": 3}
+    assert is_compacted(engine)
+    assert any(index["name"] == UNIQUE_INDEX for index in inspect(engine).get_indexes("calibration_ratings"))
+    assert {key: row.rating for key, row in stored(engine).items()} == {
+        ("u1", "a"): 5, ("u1", "b"): 1, ("u2", "a"): 4
+    }
+    assert compact(engine)["migrated"] is False
+    engine.dispose()
+
+
+def test_startup_refuses_uncompacted_ratings(monkeypatch):
+    engine = create_engine("sqlite://")
+    legacy_table(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    with pytest.raises(RuntimeError, match="compact_calibration_ratings"):
+        database.init_db()
+
+    compact(engine)
+    database.init_db()
+    assert inspect(engine).has_table("users")
+    engine.dispose()
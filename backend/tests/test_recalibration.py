@@ -0,0 +1,88 @@
+"""Bulk recalibration: batched profiles, checkpoints and rating imports."""
+import json
+import uuid
+
+import numpy as np
+
+from services.recalibration import RecalibrationJob, dump_rating_groups
+
+
+def write_dump(path, users):
+    with open(path, "w") as f:
+        for user_id, ratings in users.items():
+            f.write(json.dumps({"user_id": user_id, "ratings": ratings, "gender": "female",
+                                "preference_target": "male"}) + "\n")
+    return path
+
+
+def test_dump_groups_adjacent_rows(tmp_path):
+    csv_path = tmp_path / "ratings.csv"
+    csv_path.write_text(
+        "user_id,image_id,rating,gender\n"
+        "a,real_0,5,female\na,real_1,2,\nb,real_0,1,male\n"
+    )
+    groups = list(dump_rating_groups(csv_path))
+    assert [(g.user_id, g.ratings, g.gender) for g in groups] == [
+        ("a", {"real_0": 5, "real_1": 2}, "female"), ("b", {"real_0": 1}, "male")
+    ]
+
+    ndjson = write_dump(tmp_path / "ratings.ndjson", {"c": {"real_3": 4}})
+    group, = dump_rating_groups(ndjson)
+    assert (group.user_id, group.ratings, group.preference_target) == ("c", {"real_3": 4}, "male")
+
+
+def test_batched_profiles_match_single_user_calibration(visual_service, tmp_path):
+    rng = np.random.default_rng(0)
+    tag = uuid.uuid4().hex[:8]
+    users = {
+        f"recal-{tag}-{i}": {f"real_{j}": int(rng.integers(1, 6)) for j in rng.choice(12, size=5, replace=False)}
+        for i in range(5)
+    }
+    users[f"recal-{tag}-empty"] = {}
+    dump = write_dump(tmp_path / "ratings.ndjson", users)
+
+    job = RecalibrationJob(visual_service, tmp_path / "checkpoint.json", batch_users=2, workers=0)
+    stats = job.run(dump_rating_groups(dump), "dump:test")
+    assert (stats["users"], stats["skipped"]) == (6, 1)
+    checkpoint = job.load_checkpoint("dump:test")
+    assert checkpoint["completed"] and checkpoint["users_done"] == 6
+    assert job.load_checkpoint("database") is None
+
+    for user_id, ratings in list(users.items())[:5]:
+        saved = visual_service.vector_store.load(user_id)
+        expected = visual_service.calibrate_user(f"{user_id}-single", ratings, "female", "male")
+        np.testing.assert_allclose(saved["self_analysis"]["embedding_vector"],
+                                   expected["self_analysis"]["embedding_vector"], atol=1e-5)
+        assert saved["preference_model"]["ideal_vector"] == expected["preference_model"]["ideal_vector"]
+        assert visual_service.vector_store.load_stats(user_id)["ratings"] == ratings
+        assert visual_service.match_index.match(user_id, mutual=False) is not None
+    assert visual_service.vector_store.load(f"recal-{tag}-empty") is None
+
+
+def test_import_marks_calibrated_users_complete(visual_service, tmp_path):
+    from database import SessionLocal, init_db
+    from db_models import CalibrationRating, User
+
+    init_db()
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        users = [User(email=f"{tag}{i}@example.com", username=f"{tag}{i}", password_hash="-") for i in range(2)]
+        db.add_all(users)
+        db.commit()
+        calibrated, empty = users
+        dump = write_dump(tmp_path / "ratings.ndjson", {calibrated.id: {"real_0": 5, "real_1": 1}, empty.id: {}})
+
+        job = RecalibrationJob(visual_service, tmp_path / "checkpoint.json", workers=0)
+        job.run(dump_rating_groups(dump), "dump:test", import_ratings=True)
+        # Re-running replaces the imported ratings instead of duplicating them
+        job.run(dump_rating_groups(dump), "dump:test", import_ratings=True)
+
+        db.expire_all()
+        assert db.get(User, calibrated.id).calibration_complete
+        assert not db.get(User, empty.id).calibration_complete
+        rows = db.query(CalibrationRating.image_id, CalibrationRating.rating) \
+            .filter(CalibrationRating.user_id == calibrated.id).order_by(CalibrationRating.image_id).all()
+        assert [tuple(row) for row in rows] == [("real_0", 5), ("real_1", 1)]
+    finally:
+        db.close()
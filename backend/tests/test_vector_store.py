@@ -0,0 +1,76 @@
+"""Packed p1_visual_vector storage and the admin profile endpoints."""
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import main
+from services import vector_store
+from services.vector_store import LEGACY_FILE, VectorStore
+
+
+def vector_data(seed: int, dtype=np.float32):
+    rng = np.random.default_rng(seed)
+    return {
+        "meta": {"user_id": f"u{seed}", "images_rated": 10, "calibration_timestamp": "2024-01-01T00:00:00Z"},
+        "self_analysis": {"embedding_vector": rng.standard_normal(512).astype(dtype).tolist(),
+                          "detected_traits": {}},
+        "preference_model": {"ideal_vector": rng.standard_normal(512).astype(dtype).tolist(),
+                             "attraction_triggers": {}, "calibration_confidence": 0.5}
+    }
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_load_returns_exactly_what_was_saved(tmp_path, dtype):
+    store = VectorStore(tmp_path)
+    data = vector_data(0, dtype)
+    store.save("u0", data)
+    assert json.dumps(store.load("u0")) == json.dumps(data)
+    assert VectorStore(tmp_path).load("u0") == data
+
+
+def test_cache_hits_and_save_invalidates(tmp_path):
+    store = VectorStore(tmp_path)
+    store.save("u0", vector_data(0))
+    store.load("u0")
+    loaded = store.load("u0")
+    assert store.stats()["hits"] == 1
+
+    # Callers get their own copy
+    loaded["meta"]["images_rated"] = 99
+    assert store.load("u0")["meta"]["images_rated"] == 10
+
+    store.save("u0", vector_data(1))
+    assert store.load("u0") == vector_data(1)
+    assert len(list((tmp_path / "u0").glob("*.bin"))) == 1
+
+
+def test_legacy_profiles_are_read_and_migrated(tmp_path):
+    (tmp_path / "u0").mkdir()
+    (tmp_path / "u0" / LEGACY_FILE).write_text(json.dumps(vector_data(0)))
+    store = VectorStore(tmp_path)
+    assert store.load("u0") == vector_data(0)
+    assert store.migrate() == 1
+    assert not (tmp_path / "u0" / LEGACY_FILE).exists()
+    assert store.load("u0") == vector_data(0)
+
+
+def test_admin_profile_endpoints_read_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path))
+    store = vector_store.get_vector_store(tmp_path / "profiles")
+    store.save("u0", vector_data(0))
+
+    threads = []
+    load = store.load
+    monkeypatch.setattr(store, "load", lambda user_id: threads.append(threading.current_thread()) or load(user_id))
+
+    listing = asyncio.run(main.list_profiles(current_user=None))
+    assert listing["total"] == 1
+    assert listing["profiles"][0]["vector_summary"]["embedding_dim"] == 512
+
+    detail = asyncio.run(main.get_profile_detail("u0", current_user=None))
+    assert detail["data"] == vector_data(0)
+    assert len(threads) == 2
+    assert all(thread is not threading.main_thread() for thread in threads)